@@ -1,22 +1,24 @@
 from crewai import Agent
-from crewai_tools import SerperDevTool, ScrapeWebsiteTool, WebsiteSearchTool
 from setup import setup_crewai_config, check_gemini_status, get_llm
+from deadlines import TASK_NAMES
+from model_routing import uses_gemini
+from tools import (DomainReputationTool, CanonicalScrapeWebsiteTool, RateLimitedSerperDevTool, NewsAPISearchTool,
+                   ArticleSearchTool)
 import streamlit as st
-from tenacity import retry, stop_after_attempt, wait_exponential
 
-def create_news_analysis_agents():
+def create_news_analysis_agents(token_budget=None):
     # Setup CrewAI configuration first
     setup_crewai_config()
     
-    # Check Gemini status
+    # Check Gemini status (not needed when every task runs on the local model)
     gemini_ok, gemini_msg = check_gemini_status()
-    if not gemini_ok:
+    if not gemini_ok and uses_gemini():
         st.error(f"Gemini issue: {gemini_msg}")
         return None
     
-    # Initialize LLM with proper error handling
-    llm = get_llm()
-    if not llm:
+    # One LLM per task, on the model tier routed to it, all counting against the run's token budget
+    llms = {name: get_llm(name, token_budget) for name in TASK_NAMES}
+    if not all(llms.values()):
         if 'st' in globals():
             st.error("Failed to initialize LLM")
         else:
@@ -25,29 +27,32 @@ def create_news_analysis_agents():
 
     try:
         # Initialize tools with error handling and timeout configurations
-        serper_tool = SerperDevTool()
-        scrape_tool = ScrapeWebsiteTool()
-        search_tool = WebsiteSearchTool()
+        serper_tool = RateLimitedSerperDevTool()
+        scrape_tool = CanonicalScrapeWebsiteTool()
+        # Searches the persistent local index of scraped articles; works offline and needs no embedder
+        search_tool = ArticleSearchTool()
+        reputation_tool = DomainReputationTool()
+        news_api_tool = NewsAPISearchTool()
         
         return [
             Agent(
                 role="Web Crawler",
                 goal="Quickly find 3-5 recent news articles about the query using search tools only",
                 backstory="An efficient web crawler that focuses on finding the most relevant recent articles quickly without deep scraping.",
-                tools=[serper_tool, scrape_tool, search_tool],
-                llm=llm,
+                tools=[news_api_tool, serper_tool, scrape_tool, search_tool, reputation_tool],
+                llm=llms["crawler"],
                 verbose=True,
                 allow_delegation=False,
                 memory=False,
                 step_callback=None,
-                system_message="Focus only on finding article titles, URLs, and sources. Do not analyze content deeply. Limit to 3-5 articles maximum."
+                system_message="Focus only on finding article titles, URLs, and sources. Do not analyze content deeply. Limit to 3-5 articles maximum. Try the News API Search tool first and only use web search and scraping when it finds nothing. Rate sources with the Domain Reputation Lookup tool; only judge domains it does not know."
             ),
             Agent(
                 role="News Content Analyst",
                 goal="Quickly analyze the main themes from article titles and summaries only",
                 backstory="A fast content analyst who works with article titles, headlines, and brief summaries to extract key themes without deep content analysis.",
                 tools=[serper_tool, scrape_tool, search_tool],
-                llm=llm,
+                llm=llms["content"],
                 verbose=True,
                 allow_delegation=False,
                 memory=False,
@@ -59,7 +64,7 @@ def create_news_analysis_agents():
                 goal="Quickly identify trending hashtags and basic sentiment using search only",
                 backstory="A social media expert who uses search tools to quickly identify popular hashtags and general sentiment without deep analysis.",
                 tools=[serper_tool, scrape_tool, search_tool],
-                llm=llm,
+                llm=llms["social"],
                 verbose=True,
                 allow_delegation=False,
                 memory=False,
@@ -70,7 +75,7 @@ def create_news_analysis_agents():
                 role="Data Organizer",
                 goal="Organize the collected information into structured format", 
                 backstory="A data organization specialist who structures information efficiently without additional research.",
-                llm=llm,
+                llm=llms["organizer"],
                 verbose=True,
                 allow_delegation=False,
                 memory=False,
@@ -81,19 +86,19 @@ def create_news_analysis_agents():
                 role="Basic Reliability Assessor",
                 goal="Provide basic reliability assessment of sources without deep investigation",
                 backstory="A reliability assessor who provides quick, basic credibility checks based on well-known source reputations.",
-                tools=[serper_tool, scrape_tool, search_tool],
-                llm=llm,
+                tools=[reputation_tool, serper_tool, scrape_tool, search_tool],
+                llm=llms["reliability"],
                 verbose=True,
                 allow_delegation=False,
                 memory=False,
                 step_callback=None,
-                system_message="Provide basic reliability scores based on common knowledge of source credibility. Do not conduct deep verification research."
+                system_message="Look up every source with the Domain Reputation Lookup tool first and use its ratings as given. Only use common knowledge of source credibility for domains it reports as UNKNOWN. Do not conduct deep verification research."
             ),
             Agent(
                 role="Report Compiler",
                 goal="Compile all findings into the required JSON report format",
                 backstory="A report writer who efficiently compiles analysis into structured JSON format without additional research.",
-                llm=llm,
+                llm=llms["compiler"],
                 verbose=True,
                 allow_delegation=False,
                 memory=False,
@@ -107,18 +112,3 @@ def create_news_analysis_agents():
         else:
             print(f"Failed to create agents: {e}")
         return None
-
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def fetch_news_api(query):
-    try:
-        response = requests.get(API_ENDPOINT, 
-            params={'q': query},
-            headers={'Authorization': f'Bearer {os.getenv("API_KEY")}'},
-            timeout=15
-        )
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logging.error(f"API Error: {str(e)}", exc_info=True)
-        return None
\ No newline at end of file
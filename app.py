@@ -4,28 +4,51 @@ from agents import create_news_analysis_agents
 from tasks import create_news_analysis_tasks
 from setup import setup_crewai_config, setup_api_keys, check_gemini_status
 import time
-import traceback
 import json
-from models import NewsAnalysisReport
+import traceback
+import re
+from models import report_from_json
+from report_store import archive_report
+from reputation import apply_reputation
+from canonical import dedupe_urls, dedupe_articles, get_article_index
+from coordination import measure_coordination
+from bot_metrics import apply_bot_metrics
+from deadlines import TaskDeadlines, AnalysisTimeout, TASK_LABELS
+from token_budget import TokenBudget, TokenBudgetExceeded
+from model_routing import uses_gemini
+from partial_report import build_partial_report
+from checkpoints import get_checkpoint_store, input_hash
+from sentiment import measure_comment_sentiment, measure_report_sentiment, format_measured_sentiment
+from text_metrics import apply_text_metrics
+from thread_analytics import apply_thread_analytics
+from spread import apply_spread
+from profiler import TOP_HOTSPOTS, profile_run, profiling_enabled
+from social_tags import apply_social_tags, count_tags, format_tag_counts, iter_documents
+from singleflight import get_single_flight
 import os
 
 os.environ["STREAMLIT_SERVER_ENABLE_FILE_WATCHER"] = "false"
 
-def create_news_analysis_crew(user_query, urls=None, hashtags=None, keywords=None):
+def create_news_analysis_crew(user_query, urls=None, hashtags=None, keywords=None, deadlines=None,
+                              measured_sentiment=None, measured_hashtags=None, token_budget=None):
     # Setup CrewAI configuration
     setup_crewai_config()
 
     # Check Gemini API key
     gemini_ok, gemini_msg = check_gemini_status()
-    if not gemini_ok:
+    if not gemini_ok and uses_gemini():
         st.error(f"Gemini API Key Error: {gemini_msg}")
     
-    agents = create_news_analysis_agents()
+    # Each agent gets the model routed to its task; all of them spend the run's token budget
+    agents = create_news_analysis_agents(token_budget)
     if not agents:
         st.error("Failed to create agents")
         return None
         
-    tasks = create_news_analysis_tasks(agents, user_query, urls, hashtags, keywords)
+    # A resumed run only creates the tasks its checkpoint does not already cover
+    completed_outputs = dict(deadlines.outputs) if deadlines else None
+    tasks = create_news_analysis_tasks(agents, user_query, urls, hashtags, keywords, completed_outputs,
+                                       measured_sentiment, measured_hashtags)
     if not tasks:
         st.error("Failed to create tasks")
         return None
@@ -37,8 +60,9 @@ def create_news_analysis_crew(user_query, urls=None, hashtags=None, keywords=Non
             process=Process.sequential,
             memory=False,  # Disable memory to avoid potential issues
             verbose=True,
-            # Reduced timeout - optimized tasks should complete faster
-            max_execution_time=600,  # 10 minutes max (reduced from 15)
+            # Per-task budgets replace the crew-wide 10 minute timeout so completed work survives a stall
+            step_callback=deadlines.check if deadlines else None,
+            task_callback=deadlines.task_completed if deadlines else None,
             # Disable planning which can cause issues with Ollama
             # planning=False,
             # Disable embedder which can cause issues
@@ -48,7 +72,184 @@ def create_news_analysis_crew(user_query, urls=None, hashtags=None, keywords=Non
         st.error(f"Failed to create crew: {e}")
         return None
 
-def run_news_analysis(user_query, urls=None, hashtags=None, keywords=None):
+def extract_json_from_response(raw_result):
+    """Return the outermost JSON object in an LLM response, ignoring markdown fences and surrounding text."""
+    text = re.sub(r"```(?:json)?", "", str(raw_result or ""))
+    start, end = text.find("{"), text.rfind("}")
+    return text[start:end + 1] if start != -1 and end > start else ""
+
+def clean_json_string(json_string):
+    """Remove trailing commas and control characters that LLMs commonly leave in JSON."""
+    json_string = re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f]", "", json_string)
+    return re.sub(r",\s*([}\]])", r"\1", json_string)
+
+def parse_crew_result(result, user_query, task_outputs):
+    """
+    Parse the compiler's output into a NewsAnalysisReport.
+    
+    If the output is not valid report JSON, the report is assembled from the other tasks' outputs
+    instead, so their work is not lost.
+    
+    Returns:
+        tuple: (report, whether the compiler's output itself was parsed)
+    """
+    try:
+        # Get the raw result
+        if hasattr(result, 'raw'):
+            raw_result = result.raw
+        elif hasattr(result, 'json'):
+            raw_result = result.json
+        else:
+            raw_result = str(result)
+
+        # Extract JSON from potentially markdown-wrapped response
+        json_string = extract_json_from_response(raw_result)
+        
+        if not json_string:
+            raise ValueError("No JSON content found in response")
+        
+        # Clean the JSON string
+        json_string = clean_json_string(json_string)
+        
+        # Debug: Show what we're trying to parse
+        with st.expander("Debug: Raw JSON being parsed"):
+            st.code(json_string[:500] + "..." if len(json_string) > 500 else json_string)
+        
+        # Parse and validate in one pass with the prebuilt report validator
+        final_result = report_from_json(json_string)
+        st.success("✅ Successfully parsed structured report!")
+        return final_result, True
+        
+    except Exception as e:
+        st.warning(f"Could not parse report into structured format: {e}")
+        st.info("Building the report from the completed task outputs...")
+        
+        # Show the raw result for debugging
+        with st.expander("Debug: Raw Result"):
+            st.text(str(result)[:1000] + "..." if len(str(result)) > 1000 else str(result))
+        
+        return build_partial_report(user_query, task_outputs, f"the compiled report could not be parsed ({e})"), False
+
+def enrich_report(final_result, reddit_data=None):
+    """Replace LLM-estimated fields of a report with locally measured values."""
+    final_result.related_articles = dedupe_articles(final_result.related_articles)
+    article_index = get_article_index()
+    for article in final_result.related_articles:
+        article_index.add(article.url, title=article.title)
+    
+    article_texts = [article_index.get_content(article.url) for article in final_result.related_articles]
+    
+    # Overall sentiment is measured over the scraped article text and the Reddit thread
+    measured = measure_report_sentiment(article_texts, reddit_data)
+    if measured:
+        final_result.content_analysis.sentiment = measured["sentiment"]
+    # Readability, language mix and key entities are measured from the same text
+    apply_text_metrics(final_result, article_texts, reddit_data)
+    # Hashtags, mentions and cashtags are counted over the same text
+    apply_social_tags(final_result, article_texts, reddit_data)
+    
+    # Known domains get their scores from the local reputation table rather than the LLM's guess
+    scored = apply_reputation(final_result)
+    if scored:
+        st.info(f"Scored {scored} source(s) from the local reputation table.")
+    
+    # Coordination evidence is measured from the scraped text instead of taken from the LLM
+    final_result.propaganda_analysis.coordination_patterns = measure_coordination(final_result, reddit_data)
+    apply_bot_metrics(final_result, reddit_data)
+    # Thread-level statistics over every loaded comment feed the platform facts and bot indicators
+    apply_thread_analytics(final_result, reddit_data)
+    # Cross-posts of the link across subreddits add measured spread patterns and the propagation timeline
+    apply_spread(final_result, reddit_data)
+    if reddit_data and reddit_data.get("similar_posts_time_series"):
+        final_result.similar_posts_time_series = reddit_data["similar_posts_time_series"]
+
+class _PublishedElement:
+    """A Streamlit progress bar or status line whose updates are also published to the run's followers."""
+
+    def __init__(self, element, publish):
+        self._element = element
+        self._publish = publish or (lambda event: None)
+
+    def progress(self, value):
+        self._element.progress(value)
+        self._publish(("progress", value))
+
+    def text(self, value):
+        self._element.text(value)
+        self._publish(("status", value))
+
+    def empty(self):
+        self._element.empty()
+
+def analysis_key(user_query, urls=None, hashtags=None, keywords=None, reddit_data=None):
+    """Canonical identity of an analysis: the hash of its inputs, including the Reddit post it enriches, if any."""
+    reddit_data = reddit_data or {}
+    return input_hash(user_query, dedupe_urls(urls) if urls else None, hashtags, keywords,
+                      reddit_post=reddit_data.get("permalink") or reddit_data.get("id"))
+
+def show_profile(profiled):
+    """Hotspot table and profile downloads for a profiled run."""
+    profile = profiled["profile"]
+    with st.expander("Debug: Profile of this analysis"):
+        st.caption(f"{profile.samples} samples every {profile.interval * 1000:.0f} ms over {profile.duration:.1f} s "
+                   f"(wall clock, all threads of the run)")
+        if profiled.get("paths"):
+            st.caption(f"Saved to {profiled['paths']['speedscope']}")
+        st.dataframe(profile.hotspots(TOP_HOTSPOTS))
+        st.download_button("Download speedscope profile", data=json.dumps(profile.speedscope()),
+                           file_name="analysis.speedscope.json", mime="application/json")
+        st.download_button("Download collapsed stacks (flamegraph)", data=profile.collapsed(),
+                           file_name="analysis.collapsed.txt", mime="text/plain")
+
+def run_news_analysis(user_query, urls=None, hashtags=None, keywords=None, reddit_data=None, resume=True,
+                      shared_outputs=None, on_task_outputs=None, profile=False):
+    """
+    Run the news analysis crew and return the enriched report (None on failure).
+    
+    Identical analyses requested while one is already running, from this or any other Streamlit
+    session, attach to the running one: they follow its progress and receive the same report
+    instead of starting a second crew.
+    
+    on_task_outputs, if given, is called with the raw outputs of the tasks completed so far
+    (task name -> text) each time another task finishes, so a view can update as sections land.
+    
+    With profile (or VERIFAI_PROFILE set) the run is sampled by profiler.py; the profile is saved
+    under db/profiles/ and its hotspots and downloads are shown in a debug expander.
+    """
+    progress = {}
+    
+    def follow(event):
+        if not progress:
+            st.info("An identical analysis is already running; following its progress.")
+            progress["bar"], progress["status"] = st.progress(0), st.empty()
+        kind, value = event
+        if kind == "progress":
+            progress["bar"].progress(value)
+        elif kind == "status":
+            progress["status"].text(value)
+        elif kind == "task_outputs" and on_task_outputs:
+            on_task_outputs(value)
+    
+    def run(publish):
+        with profile_run(profile or profiling_enabled(), label=user_query) as profiled:
+            report = _run_news_analysis(user_query, urls, hashtags, keywords, reddit_data, resume,
+                                        shared_outputs, publish, on_task_outputs)
+        if profiled:
+            show_profile(profiled)
+        return report
+    
+    report, shared = get_single_flight("analysis").run(
+        analysis_key(user_query, urls, hashtags, keywords, reddit_data), run, on_event=follow,
+    )
+    if progress:
+        progress["bar"].empty()
+        progress["status"].empty()
+    if shared and report is not None:
+        st.success("Received the report of the identical analysis that was already running.")
+    return report
+
+def _run_news_analysis(user_query, urls=None, hashtags=None, keywords=None, reddit_data=None, resume=True,
+                       shared_outputs=None, publish=None, on_task_outputs=None):
     try:
         # Ensure configuration is set up
         setup_crewai_config()
@@ -58,18 +259,51 @@ def run_news_analysis(user_query, urls=None, hashtags=None, keywords=None):
             st.error("Please provide a valid query (at least 3 characters)")
             return None
         
+        # Collapse AMP/mobile/tracking/shortener variants so each article is scraped and prompted once
+        if urls:
+            unique_urls = dedupe_urls(urls)
+            if len(unique_urls) < len(urls):
+                st.info(f"Removed {len(urls) - len(unique_urls)} duplicate URL(s) from the input.")
+            urls = unique_urls
+        
         # Show progress with more detailed steps
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        # Followers of this run (see run_news_analysis) receive the same progress updates
+        progress_bar = _PublishedElement(st.progress(0), publish)
+        status_text = _PublishedElement(st.empty(), publish)
         
         status_text.text("Initializing analysis system...")
         progress_bar.progress(5)
         
-        # Create crew with timeout handling
-        crew = create_news_analysis_crew(user_query, urls, hashtags, keywords)
-        if not crew:
-            st.error("Failed to create analysis crew")
-            return None
+        # Pick up where an interrupted run with the same inputs stopped; each task is checkpointed as it completes
+        checkpoints = get_checkpoint_store()
+        run_id, completed = checkpoints.start(analysis_key(user_query, urls, hashtags, keywords, reddit_data),
+                                              user_query, resume=resume)
+        if completed:
+            st.info(f"Resuming a previous run: reusing {len(completed)} completed step(s).")
+        # Outputs computed outside the crew (e.g. a batch's shared crawl) replace those tasks
+        if shared_outputs:
+            completed = {**shared_outputs, **completed}
+        
+        # Create crew with per-task time budgets
+        deadlines = TaskDeadlines(
+            completed=completed,
+            on_task_completed=lambda name, output: checkpoints.save_output(run_id, name, output),
+        )
+        # Token budgets for the remaining tasks; spending one ends the run like a timeout, with a partial report
+        token_budget = TokenBudget(task_names=deadlines.remaining_tasks, on_exhausted=deadlines.cancel)
+        crew = None
+        if deadlines.remaining_tasks:
+            comment_sentiment = measure_comment_sentiment(reddit_data)
+            thread_tags = count_tags(iter_documents(reddit_data))
+            crew = create_news_analysis_crew(
+                user_query, urls, hashtags, keywords, deadlines=deadlines,
+                measured_sentiment=format_measured_sentiment(comment_sentiment) if comment_sentiment else None,
+                measured_hashtags=format_tag_counts(thread_tags) or None,
+                token_budget=token_budget,
+            )
+            if not crew:
+                st.error("Failed to create analysis crew")
+                return None
         
         status_text.text("Crew created successfully. Starting analysis...")
         progress_bar.progress(15)
@@ -90,20 +324,40 @@ def run_news_analysis(user_query, urls=None, hashtags=None, keywords=None):
         start_time = time.time()
         
         # Add progress updates during execution
+        timeout = None
+        result = None
         try:
             st.info("🔍 Phase 1: Searching for news articles...")
             progress_bar.progress(30)
             
-            result = crew.kickoff(inputs=inputs)
+            def show_progress(completed):
+                progress_bar.progress(30 + completed * 8)
+                if deadlines.current_task:
+                    status_text.text(f"Running {TASK_LABELS[deadlines.current_task]} ({completed}/{len(deadlines.task_names)} steps done)...")
+                if completed:
+                    outputs = dict(deadlines.outputs)
+                    if publish:
+                        publish(("task_outputs", outputs))
+                    if on_task_outputs:
+                        on_task_outputs(outputs)
+            
+            if deadlines.remaining_tasks:
+                result = deadlines.run(crew.kickoff, inputs=inputs, on_progress=show_progress)
+            else:
+                # Every task, including the compiler, finished before the previous run was interrupted
+                result = deadlines.outputs["compiler"]
             
             elapsed_time = time.time() - start_time
             st.success(f"Analysis completed in {elapsed_time:.1f} seconds!")
             
-        except TimeoutError as te:
-            st.error("Analysis timed out. This can happen with complex queries or network issues.")
-            st.info("Try simplifying your query or checking your internet connection.")
+        except AnalysisTimeout as te:
+            timeout = te
+            if isinstance(te, TokenBudgetExceeded):
+                st.warning(f"Analysis stopped at its token budget: {te}")
+            else:
+                st.warning(f"Analysis timed out: {te}")
+            st.info(f"Building a partial report from the {len(deadlines.outputs)} completed step(s)...")
             
-            # Provide partial results if possible
             with st.expander("Troubleshooting Tips"):
                 st.write("""
                 **Common timeout causes:**
@@ -116,98 +370,30 @@ def run_news_analysis(user_query, urls=None, hashtags=None, keywords=None):
                 - Check internet connection
                 - Try again in a few minutes
                 """)
-            return None
+        
+        if token_budget.total:
+            st.caption(f"Token usage: {token_budget.summary()}")
         
         progress_bar.progress(80)
         status_text.text("Processing and formatting results...")
         
         # Handle the result with improved error handling and JSON extraction
-        try:
-            # Get the raw result
-            if hasattr(result, 'raw'):
-                raw_result = result.raw
-            elif hasattr(result, 'json'):
-                raw_result = result.json
+        if timeout is not None:
+            final_result = build_partial_report(user_query, deadlines.outputs, str(timeout).rstrip("."))
+            checkpoints.finish(run_id, "failed")
+        else:
+            final_result, parsed = parse_crew_result(result, user_query, deadlines.outputs)
+            if parsed:
+                checkpoints.finish(run_id)
             else:
-                raw_result = str(result)
-
-            # Extract JSON from potentially markdown-wrapped response
-            json_string = extract_json_from_response(raw_result)
-            
-            if not json_string:
-                raise ValueError("No JSON content found in response")
-            
-            # Clean the JSON string
-            json_string = clean_json_string(json_string)
-            
-            # Debug: Show what we're trying to parse
-            with st.expander("Debug: Raw JSON being parsed"):
-                st.code(json_string[:500] + "..." if len(json_string) > 500 else json_string)
-            
-            # Try to parse as JSON
-            try:
-                parsed_json = json.loads(json_string)
-                final_result = NewsAnalysisReport.model_validate(parsed_json)
-                st.success("✅ Successfully parsed structured report!")
-                
-            except json.JSONDecodeError as je:
-                st.warning(f"JSON parsing failed: {je}")
-                st.info("Attempting alternative parsing methods...")
-                
-                # Try using model_validate_json directly
-                try:
-                    final_result = NewsAnalysisReport.model_validate_json(json_string)
-                    st.success("✅ Successfully parsed with alternative method!")
-                except Exception as e2:
-                    st.warning(f"Alternative parsing also failed: {e2}")
-                    raise e2
-            
-        except Exception as e:
-            st.warning(f"Could not parse report into structured format: {e}")
-            st.info("Creating fallback report from raw analysis results...")
-            
-            # Show the raw result for debugging
-            with st.expander("Debug: Raw Result"):
-                st.text(str(result)[:1000] + "..." if len(str(result)) > 1000 else str(result))
-            
-            # Create a simple fallback report structure
-            final_result = {
-                'query_summary': f"Analysis for: {user_query}",
-                'key_findings': str(result)[:500] + "..." if len(str(result)) > 500 else str(result),
-                'related_articles': [],
-                'related_words': user_query.split(),
-                'topic_clusters': [{'topic': 'General Analysis', 'size': 1, 'related_narratives': ['Raw analysis output']}],
-                'top_sources': [],
-                'top_hashtags': [],
-                'similar_posts_time_series': [],
-                'fake_news_sites': [],
-                'content_analysis': {
-                    'language_percentage': 0.0,
-                    'coordination_percentage': 0.0,
-                    'source_percentage': 0.0,
-                    'bot_like_activity_percentage': 0.0
-                },
-                'propaganda_analysis': {
-                    'overall_reliability_score': 50.0,
-                    'propaganda_techniques': [],
-                    'misinformation_indicators': [],
-                    'coordination_patterns': [],
-                    'bot_activity_metrics': {
-                        'bot_likelihood_score': 0.0,
-                        'account_creation_patterns': 'Unknown',
-                        'behavioral_indicators': [],
-                        'network_analysis': 'Analysis incomplete'
-                    },
-                    'fake_news_sites': [],
-                    'manipulation_timeline': [],
-                    'narrative_fingerprint': {},
-                    'cross_verification_results': {},
-                    'recommended_verification_steps': ['Check multiple sources', 'Verify with fact-checkers']
-                },
-                'platform_facts': ['Analysis incomplete due to parsing issues'],
-                'cross_source_facts': ['Please refer to raw output above'],
-                'analysis_note': f'Raw output due to parsing issues: {str(e)}'
-            }
+                # Retrying the same inputs then re-runs only the compiler
+                checkpoints.discard_output(run_id, "compiler")
+                checkpoints.finish(run_id, "failed")
+        
+        enrich_report(final_result, reddit_data)
+        
+        # Keep every report in the local archive so past analyses can be searched instead of re-run
+        archive_report(final_result, user_query)
         
         progress_bar.progress(100)
         status_text.text("Analysis complete!")
@@ -0,0 +1,213 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app import run_news_analysis
+from canonical import canonicalize_url, dedupe_urls, get_article_index
+from profiler import propagate
+from rate_limit import get_limiter
+from report_store import normalize_domain
+from reputation import get_reputation_index, reliability_level
+from singleflight import get_single_flight
+from save_report import save_report_to_file
+from setup import setup_api_keys
+from tools import CanonicalScrapeWebsiteTool
+
+logger = logging.getLogger(__name__)
+
+SERPER_NEWS_URL = "https://google.serper.dev/news"
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def search_news(query: str, num_results: int = 10, timeout: int = 15) -> list:
+    """
+    Search Serper's news endpoint for one query.
+
+    A search for the same normalized query that is already in flight is joined rather than repeated.
+
+    Returns:
+        list: Dicts with title, url, source, snippet and date (empty on error)
+    """
+    key = (_normalize_query(query), num_results)
+    results, _ = get_single_flight("serper_news").run(key, lambda _: _search_news(query, num_results, timeout))
+    return list(results)
+
+
+def _search_news(query: str, num_results: int, timeout: int) -> list:
+    try:
+        response = get_limiter("serper").call(
+            requests.post,
+            SERPER_NEWS_URL,
+            json={"q": query, "num": num_results},
+            headers={"X-API-KEY": os.getenv("SERPER_API_KEY", ""), "Content-Type": "application/json"},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return [
+            {
+                "title": item.get("title", ""),
+                "url": item.get("link", ""),
+                "source": item.get("source") or normalize_domain(item.get("link", "")),
+                "snippet": item.get("snippet", ""),
+                "date": item.get("date", ""),
+            }
+            for item in response.json().get("news", [])
+            if item.get("link")
+        ]
+    except Exception as e:
+        logger.warning("News search failed for '%s': %s", query, e)
+        return []
+
+
+def shared_crawl(queries: list, urls: list = None, results_per_query: int = 10, max_scrape_workers: int = 6) -> dict:
+    """
+    Search every query once and scrape each unique article once.
+
+    Search results are merged by canonical URL, so an article returned for several queries is
+    scraped a single time; its content lands in the article index, where the per-query crews'
+    scrape tool finds it without another fetch.
+
+    Args:
+        queries (list): Queries to search (already deduplicated)
+        urls (list): Extra article URLs to include in the pool
+        results_per_query (int): Search results requested per query
+        max_scrape_workers (int): Concurrent page fetches (the web rate limiter applies as well)
+
+    Returns:
+        dict: canonical URL -> article dict with title, url, source, snippet, date and the set of
+            queries that found it
+    """
+    pool = {}
+    with ThreadPoolExecutor(max_workers=min(4, len(queries)) or 1) as executor:
+        for query, results in zip(queries, executor.map(propagate(lambda q: search_news(q, results_per_query)), queries)):
+            for article in results:
+                entry = pool.setdefault(canonicalize_url(article["url"]), {**article, "queries": set()})
+                entry["queries"].add(query)
+    for url in dedupe_urls(urls or []):
+        pool.setdefault(canonicalize_url(url), {
+            "title": "", "url": url, "source": normalize_domain(url), "snippet": "", "date": "", "queries": set(queries),
+        })
+
+    index = get_article_index()
+    to_scrape = [article["url"] for key, article in pool.items() if index.get_content(key) is None]
+    scraper = CanonicalScrapeWebsiteTool()
+    with ThreadPoolExecutor(max_workers=max_scrape_workers) as executor:
+        list(executor.map(propagate(lambda url: _scrape(scraper, url)), to_scrape))
+    logger.info("Shared crawl: %d queries, %d unique articles, %d scraped", len(queries), len(pool), len(to_scrape))
+    return pool
+
+
+def _scrape(scraper, url: str) -> None:
+    try:
+        scraper._run(website_url=url)
+    except Exception as e:
+        logger.warning("Could not scrape %s: %s", url, e)
+
+
+def _relevance(article: dict, query: str) -> tuple:
+    terms = {t for t in query.split() if len(t) > 2}
+    text = f"{article['title']} {article['snippet']}".lower()
+    overlap = sum(1 for t in terms if t in text)
+    return (query in article["queries"], overlap, len(article["queries"]))
+
+
+def format_crawler_output(articles: list, query_count: int) -> str:
+    """Render pool articles in the Web Crawler task's output format, with reputation-based ratings."""
+    index = get_reputation_index()
+    lines = ["ARTICLES FOUND:"]
+    for i, article in enumerate(articles, 1):
+        entry = index.lookup(article["url"])
+        reliability = reliability_level(entry) if entry else "Unknown"
+        lines.append(f"{i}. Title: {article['title'] or article['url']} | Source: {article['source']} | "
+                     f"URL: {article['url']} | Reliability: {reliability}")
+    lines.append("")
+    lines.append(f"SUMMARY: A shared search for {query_count} related queries found these {len(articles)} articles.")
+    return "\n".join(lines)
+
+
+def run_batch_analysis(queries: list, urls: list = None, hashtags: list = None, keywords: list = None,
+                       articles_per_query: int = 8, max_concurrent: int = 3, reddit_data: dict = None) -> dict:
+    """
+    Analyze several related queries with one shared search-and-scrape phase.
+
+    The shared crawl stands in for each query's Web Crawler task (it is passed as that task's
+    completed output), and the remaining analysis and compile tasks run for each query
+    concurrently. Search and scrape I/O therefore scales with unique articles rather than with
+    queries times articles.
+
+    Args:
+        queries (list): The queries to analyze; duplicates (ignoring case and spacing) are dropped
+        urls (list): Article URLs to add to the shared pool
+        hashtags (list): Hashtags passed to every query's analysis
+        keywords (list): Keywords passed to every query's analysis
+        articles_per_query (int): Most relevant pool articles handed to each query
+        max_concurrent (int): Queries analyzed at the same time
+        reddit_data (dict): Output of scrape_reddit_data when the queries come from one Reddit post
+
+    Returns:
+        dict: query -> NewsAnalysisReport (or None if that query's analysis failed)
+    """
+    by_normalized = {}
+    for query in queries:
+        if query and query.strip():
+            by_normalized.setdefault(_normalize_query(query), query.strip())
+    unique = list(by_normalized.values())
+    if not unique:
+        return {}
+    pool = shared_crawl([_normalize_query(q) for q in unique], urls)
+
+    def analyze(query):
+        normalized = _normalize_query(query)
+        articles = sorted(pool.values(), key=lambda a: _relevance(a, normalized), reverse=True)[:articles_per_query]
+        try:
+            return run_news_analysis(
+                user_query=query,
+                urls=[a["url"] for a in articles] or None,
+                hashtags=hashtags,
+                keywords=keywords,
+                reddit_data=reddit_data,
+                shared_outputs={"crawler": format_crawler_output(articles, len(unique))},
+            )
+        except Exception as e:
+            logger.error("Batch analysis failed for '%s': %s", query, e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrent, len(unique)))) as executor:
+        reports = dict(zip(unique, executor.map(propagate(analyze), unique)))
+    logger.info("Batch complete: %d of %d queries produced a report", sum(1 for r in reports.values() if r), len(unique))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze several related news queries with one shared crawl.")
+    parser.add_argument("queries", nargs="+", help="Queries to analyze")
+    parser.add_argument("--urls", default="", help="Comma-separated article URLs to include")
+    parser.add_argument("--max-concurrent", type=int, default=3, help="Queries analyzed at the same time")
+    parser.add_argument("--articles-per-query", type=int, default=8, help="Pool articles handed to each query")
+    args = parser.parse_args()
+
+    if not setup_api_keys():
+        print("Invalid API keys. Exiting.")
+        return
+    reports = run_batch_analysis(
+        args.queries,
+        urls=[u.strip() for u in args.urls.split(",") if u.strip()],
+        articles_per_query=args.articles_per_query,
+        max_concurrent=args.max_concurrent,
+    )
+    for i, (query, report) in enumerate(reports.items(), 1):
+        if report:
+            save_report_to_file(report, f"news_analysis_report_{i}.md")
+            print(f"Saved report for: {query}")
+        else:
+            print(f"No report for: {query}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import json
+import time
+
+from models import NewsAnalysisReport, report_from_json, report_to_json
+
+
+def build_report_dict(articles: int, timeline: int) -> dict:
+    """A synthetic report with the given number of related articles and time-series entries."""
+    return {
+        "query_summary": "Benchmark report",
+        "key_findings": "Synthetic findings " * 20,
+        "related_articles": [
+            {
+                "title": f"Article {i} about the topic",
+                "url": f"https://news{i % 50}.example.com/2024/story-{i}",
+                "source": f"news{i % 50}.example.com",
+                "published_date": "2024-05-01",
+            }
+            for i in range(articles)
+        ],
+        "related_words": [f"word{i}" for i in range(50)],
+        "topic_clusters": [{"cluster_name": f"Cluster {i}", "keywords": ["a", "b"], "article_count": 3} for i in range(10)],
+        "top_sources": [{"name": f"news{i}", "url": f"https://news{i}.example.com", "reliability_score": 70.0} for i in range(20)],
+        "similar_posts_time_series": [{"date": f"2024-05-01T{i % 24:02d}:00", "count": i % 97} for i in range(timeline)],
+        "content_analysis": {"sentiment": "Neutral", "bias": "Neutral", "readability_score": 55.0},
+        "propaganda_analysis": {"overall_risk_score": 30.0},
+    }
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run_benchmark(articles: int = 10000, timeline: int = 10000, repeat: int = 5) -> list:
+    """
+    Time the report validation and serialization paths.
+
+    Returns:
+        list: (name, milliseconds) pairs, best of repeat runs each
+    """
+    data = build_report_dict(articles, timeline)
+    indented = json.dumps(data, indent=2)
+    report = NewsAnalysisReport.model_validate(data)
+    compact = report_to_json(report)
+
+    cases = [
+        ("json.loads + model_validate (old parse)", lambda: NewsAnalysisReport.model_validate(json.loads(indented))),
+        ("report_from_json (adapter, one pass)", lambda: report_from_json(indented)),
+        ("model_dump_json(indent=2) (old storage)", lambda: report.model_dump_json(indent=2).encode("utf-8")),
+        ("report_to_json (compact bytes)", lambda: report_to_json(report)),
+        ("report_from_json(lazy=True), len only", lambda: len(report_from_json(compact, lazy=True).related_articles)),
+        ("report_from_json(lazy=True), full use", lambda: report_from_json(compact, lazy=True).materialize()),
+        ("report_from_json(lazy=False)", lambda: report_from_json(compact)),
+    ]
+    results = [(name, _best_of(fn, repeat)) for name, fn in cases]
+    results.append(("indented JSON size (KB)", len(report.model_dump_json(indent=2)) / 1024))
+    results.append(("compact JSON size (KB)", len(compact) / 1024))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark for report validation and serialization.")
+    parser.add_argument("--articles", type=int, default=10000, help="Related articles in the synthetic report")
+    parser.add_argument("--timeline", type=int, default=10000, help="Time-series entries in the synthetic report")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case; the best is reported")
+    args = parser.parse_args()
+
+    print(f"Report with {args.articles} articles and {args.timeline} time-series entries (best of {args.repeat}):")
+    for name, value in run_benchmark(args.articles, args.timeline, args.repeat):
+        print(f"  {name:<45} {value:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from models import BotActivityMetrics
+from setup import get_db_path
+from shared_state import ThreadLocalConnection, process_singleton
+
+logger = logging.getLogger(__name__)
+
+AUTHOR_CACHE_TTL = 24 * 3600
+LOOKUP_BATCH_SIZE = 100
+# Reddit's auto-generated usernames look like Adjective_Noun1234
+DEFAULT_USERNAME_RE = r"^[A-Z][a-z]+[-_]?[A-Z][a-z]+[-_]?\d{2,4}$"
+BOT_THRESHOLD = 0.5
+
+# Weights of each indicator in the per-author logit, and the bias applied when none fire
+INDICATOR_WEIGHTS = {
+    "young_account": 1.6,
+    "low_karma": 1.0,
+    "default_username": 0.8,
+    "burst_posting": 1.4,
+    "duplicate_text": 2.0,
+    "uniform_length": 0.7,
+}
+BIAS = -3.0
+
+
+class AuthorCache:
+    """Per-username cache of Reddit account metadata in SQLite, with an in-memory layer."""
+
+    def __init__(self, path: str = None, ttl: int = AUTHOR_CACHE_TTL):
+        self.path = path or get_db_path("authors.db")
+        self.ttl = ttl
+        self._memory = {}
+        self._connection = ThreadLocalConnection(self.path)
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS authors (
+                name TEXT PRIMARY KEY,
+                fullname TEXT,
+                created_utc REAL,
+                link_karma INTEGER,
+                comment_karma INTEGER,
+                fetched_at REAL NOT NULL
+            )
+        """)
+
+    def get_many(self, names) -> dict:
+        """Return cached, unexpired metadata for the given usernames."""
+        cutoff = time.time() - self.ttl
+        found = {n: self._memory[n] for n in names if n in self._memory and self._memory[n]["fetched_at"] >= cutoff}
+        missing = [n for n in names if n not in found]
+        conn = self._connection()
+        # SQLite limits bound parameters per statement, so query in slices
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            rows = conn.execute(
+                f"SELECT name, fullname, created_utc, link_karma, comment_karma, fetched_at FROM authors "
+                f"WHERE fetched_at >= ? AND name IN ({','.join('?' * len(chunk))})",
+                [cutoff] + chunk,
+            ).fetchall()
+            for name, fullname, created_utc, link_karma, comment_karma, fetched_at in rows:
+                meta = {"fullname": fullname, "created_utc": created_utc, "link_karma": link_karma,
+                        "comment_karma": comment_karma, "fetched_at": fetched_at}
+                self._memory[name] = meta
+                found[name] = meta
+        return found
+
+    def put_many(self, metadata: dict) -> None:
+        now = time.time()
+        rows = []
+        for name, meta in metadata.items():
+            meta = {**meta, "fetched_at": now}
+            self._memory[name] = meta
+            rows.append((name, meta.get("fullname"), meta.get("created_utc"), meta.get("link_karma"),
+                         meta.get("comment_karma"), now))
+        conn = self._connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO authors VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+@process_singleton
+def get_author_cache() -> AuthorCache:
+    """Return the process-wide author cache."""
+    return AuthorCache()
+
+
+def fetch_author_metadata(reddit, comments: list, max_individual_lookups: int = 25) -> dict:
+    """
+    Look up account metadata for every commenter, in batches and through the cache.
+
+    Authors with a known fullname (t2_...) are fetched 100 at a time through Reddit's
+    user_data_by_account_ids endpoint. Authors without one fall back to individual profile
+    fetches, capped by max_individual_lookups.
+
+    Args:
+        reddit: A PRAW Reddit client
+        comments (list): Comment records from collect_comments
+        max_individual_lookups (int): Cap on one-request-per-author fallbacks
+
+    Returns:
+        dict: username -> {created_utc, link_karma, comment_karma, ...}
+    """
+    fullnames = {}
+    for comment in comments:
+        name = comment.get("author")
+        if name and name != "None" and not comment.get("is_deleted"):
+            fullnames.setdefault(name, comment.get("author_fullname"))
+
+    cache = get_author_cache()
+    metadata = cache.get_many(list(fullnames))
+    missing = [name for name in fullnames if name not in metadata]
+    if not missing:
+        return metadata
+
+    fetched = {}
+    by_id = [fullnames[name] for name in missing if fullnames[name]]
+    for i in range(0, len(by_id), LOOKUP_BATCH_SIZE):
+        try:
+            for partial in reddit.redditors.partial_redditors(by_id[i:i + LOOKUP_BATCH_SIZE]):
+                fetched[partial.name] = {
+                    "fullname": getattr(partial, "fullname", None),
+                    "created_utc": getattr(partial, "created_utc", None),
+                    "link_karma": getattr(partial, "link_karma", None),
+                    "comment_karma": getattr(partial, "comment_karma", None),
+                }
+        except Exception as e:
+            logger.warning("Batch author lookup failed: %s", e)
+
+    for name in [n for n in missing if n not in fetched][:max_individual_lookups]:
+        try:
+            redditor = reddit.redditor(name)
+            fetched[name] = {
+                "fullname": redditor.fullname,
+                "created_utc": redditor.created_utc,
+                "link_karma": redditor.link_karma,
+                "comment_karma": redditor.comment_karma,
+            }
+        except Exception as e:
+            # Suspended or shadow-banned accounts raise here; remember that they have no metadata
+            logger.debug("Author lookup failed for %s: %s", name, e)
+            fetched[name] = {"fullname": None, "created_utc": None, "link_karma": None, "comment_karma": None}
+
+    if fetched:
+        cache.put_many(fetched)
+        metadata.update(fetched)
+    logger.info("Author metadata: %d cached, %d fetched", len(fullnames) - len(missing), len(fetched))
+    return metadata
+
+
+def author_features(comments: list, authors: dict, reference_time: float = None) -> pd.DataFrame:
+    """
+    Compute per-author features as columns.
+
+    Args:
+        comments (list): Comment records from collect_comments
+        authors (dict): Output of fetch_author_metadata
+        reference_time (float): Epoch seconds used for account age (defaults to now)
+
+    Returns:
+        pd.DataFrame: One row per author, indexed by username
+    """
+    df = pd.DataFrame(comments, columns=["author", "body", "created_utc", "is_deleted"])
+    df = df[(df["author"] != "None") & ~df["is_deleted"].fillna(False).astype(bool)]
+    if df.empty:
+        return pd.DataFrame()
+
+    body = df["body"].fillna("").astype(str)
+    df = df.assign(
+        length=body.str.len(),
+        normalized=body.str.lower().str.replace(r"\W+", " ", regex=True).str.strip(),
+    )
+    # A comment is a duplicate if the same normalized text appears more than once in the thread
+    df["is_duplicate"] = df.duplicated("normalized", keep=False) & (df["length"] >= 20)
+    df = df.sort_values(["author", "created_utc"])
+    df["gap"] = df.groupby("author")["created_utc"].diff()
+
+    grouped = df.groupby("author")
+    features = pd.DataFrame({
+        "comments": grouped.size(),
+        "mean_length": grouped["length"].mean(),
+        "length_std": grouped["length"].std().fillna(0.0),
+        "duplicate_ratio": grouped["is_duplicate"].mean(),
+        "min_gap": grouped["gap"].min(),
+        "median_gap": grouped["gap"].median(),
+    })
+
+    meta = pd.DataFrame.from_dict(authors, orient="index").reindex(features.index)
+    for column in ("created_utc", "link_karma", "comment_karma"):
+        if column not in meta:
+            meta[column] = np.nan
+    reference_time = reference_time or time.time()
+    features["account_age_days"] = (reference_time - meta["created_utc"].astype(float)) / 86400.0
+    features["karma"] = meta["link_karma"].astype(float) + meta["comment_karma"].astype(float)
+    features["default_username"] = features.index.to_series().str.match(DEFAULT_USERNAME_RE)
+    return features
+
+
+def score_authors(features: pd.DataFrame) -> pd.DataFrame:
+    """Add boolean indicator columns and a bot_probability column to the author features."""
+    if features.empty:
+        return features
+    indicators = pd.DataFrame({
+        "young_account": features["account_age_days"] < 30,
+        "low_karma": features["karma"] < 100,
+        "default_username": features["default_username"].astype(bool),
+        "burst_posting": (features["comments"] >= 3) & (features["min_gap"] < 30),
+        "duplicate_text": features["duplicate_ratio"] >= 0.5,
+        "uniform_length": (features["comments"] >= 4) & (features["length_std"] < 0.1 * features["mean_length"] + 5),
+    }, index=features.index).fillna(False)
+    weights = np.array([INDICATOR_WEIGHTS[name] for name in indicators.columns])
+    logits = indicators.to_numpy(dtype=float) @ weights + BIAS
+    return features.join(indicators.add_prefix("is_")).assign(bot_probability=1.0 / (1.0 + np.exp(-logits)))
+
+
+def _creation_times(scored: pd.DataFrame, authors: dict) -> np.ndarray:
+    """Creation timestamps of scored authors that have metadata."""
+    created = [authors.get(name, {}).get("created_utc") for name in scored.index]
+    return np.array([c for c in created if c is not None], dtype=float)
+
+
+def compute_bot_metrics(reddit_data: dict) -> tuple:
+    """
+    Score commenters in a scraped thread and summarize them.
+
+    Args:
+        reddit_data (dict): Output of scrape_reddit_data, with "comments" and "authors"
+
+    Returns:
+        tuple: (BotActivityMetrics, percentage of comments written by likely bots)
+    """
+    comments = reddit_data.get("comments") or reddit_data.get("top_comments") or []
+    scored = score_authors(author_features(comments, reddit_data.get("authors") or {}, reddit_data.get("created_utc")))
+    if scored.empty:
+        return BotActivityMetrics(account_creation_patterns="No commenter data available"), 0.0
+
+    weights = scored["comments"].to_numpy(dtype=float)
+    probability = scored["bot_probability"].to_numpy()
+    likely_bot = probability >= BOT_THRESHOLD
+    bot_comment_share = float(weights[likely_bot].sum() / weights.sum() * 100)
+
+    indicators = []
+    labels = {
+        "young_account": "accounts younger than 30 days",
+        "low_karma": "accounts with under 100 karma",
+        "default_username": "auto-generated style usernames",
+        "burst_posting": "authors posting 3+ comments less than 30 s apart",
+        "duplicate_text": "authors mostly repeating text seen elsewhere in the thread",
+        "uniform_length": "authors with near-constant comment length",
+    }
+    for name, label in labels.items():
+        count = int(scored[f"is_{name}"].sum())
+        if count:
+            indicators.append(f"{count} of {len(scored)} {label}")
+
+    created = np.sort(_creation_times(scored, reddit_data.get("authors") or {}))
+    if len(created):
+        # Largest number of commenter accounts created within any 7-day window
+        window_counts = np.searchsorted(created, created + 7 * 86400, side="right") - np.arange(len(created))
+        peak = int(window_counts.max())
+        creation_patterns = (
+            f"{int((scored['account_age_days'] < 30).sum())} of {len(created)} commenter accounts are under 30 days old; "
+            f"up to {peak} were created within the same 7-day window"
+        )
+    else:
+        creation_patterns = "Account creation dates unavailable"
+
+    top_n = max(1, int(np.ceil(len(scored) * 0.05)))
+    top_share = float(np.sort(weights)[::-1][:top_n].sum() / weights.sum() * 100)
+    network = (
+        f"{len(scored)} distinct commenters; the top {top_n} wrote {top_share:.1f}% of comments; "
+        f"{int(likely_bot.sum())} scored as likely automated"
+    )
+
+    metrics = BotActivityMetrics(
+        bot_likelihood_score=round(float(np.average(probability, weights=weights)), 3),
+        account_creation_patterns=creation_patterns,
+        behavioral_indicators=indicators,
+        network_analysis=network,
+    )
+    return metrics, round(bot_comment_share, 1)
+
+
+def apply_bot_metrics(report, reddit_data: dict) -> None:
+    """Fill the report's bot activity metrics and bot-like activity percentage from the thread."""
+    if not reddit_data or "error" in reddit_data:
+        return
+    metrics, bot_percentage = compute_bot_metrics(reddit_data)
+    report.propaganda_analysis.bot_activity_metrics = metrics
+    report.content_analysis.metrics.bot_like_activity_percentage = bot_percentage
@@ -0,0 +1,372 @@
+import atexit
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+
+import requests
+
+from setup import get_db_path
+from shared_state import ThreadLocalConnection, process_singleton
+
+logger = logging.getLogger(__name__)
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_ga", "_gl",
+    "ref", "ref_src", "ref_url", "referrer", "cmpid", "cmp", "ocid", "smid", "smtyp",
+    "share", "via", "at_medium", "at_campaign", "at_custom1", "at_custom2", "at_custom3",
+    "at_custom4", "sr_share", "ito", "mbid", "wt.mc_id", "ns_mchannel", "ns_source", "ns_campaign",
+    "ns_linkname", "ns_fee", "taid", "amp", "outputtype", "__twitter_impression",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_", "oly_", "vero_", "__hs")
+
+# Host prefixes that serve the same article as the bare host
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.", "amp-", "edition.", "touch.")
+
+# Hosts whose links only redirect elsewhere; only these are resolved over the network by default
+SHORTENER_HOSTS = {
+    "t.co", "bit.ly", "ow.ly", "buff.ly", "tinyurl.com", "goo.gl", "lnkd.in", "dlvr.it", "fb.me",
+    "trib.al", "apple.news", "flip.it", "shorturl.at", "rebrand.ly", "is.gd", "tiny.cc", "wp.me",
+    "reut.rs", "nyti.ms", "wapo.st", "bbc.in", "cnn.it", "n.pr", "econ.st", "on.ft.com", "bloom.bg",
+}
+
+AMP_PATH_RE = re.compile(r"(/amp(?=/|$)|\.amp(?=$|\.html?$))", re.IGNORECASE)
+GOOGLE_AMP_RE = re.compile(r"^/amp/(s/)?(?P<rest>.+)$")
+AMP_CACHE_RE = re.compile(r"^/[cv]/(?P<secure>s/)?(?P<rest>.+)$")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Reduce a URL to a canonical form so variants of the same article compare equal.
+
+    Strips tracking parameters and fragments, sorts the remaining query string, unwraps Google AMP
+    and AMP-cache URLs, drops AMP path markers and mirror host prefixes (www., m., amp., ...),
+    and removes default ports and trailing slashes.
+
+    Args:
+        url (str): The URL to canonicalize
+
+    Returns:
+        str: The canonical URL, or the stripped input if it cannot be parsed as http(s)
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        return url
+    host = (parts.hostname or "").lower().rstrip(".")
+    path = parts.path or "/"
+
+    # https://www.google.com/amp/s/example.com/story -> https://example.com/story
+    if host.endswith("google.com") and GOOGLE_AMP_RE.match(path):
+        return canonicalize_url("https://" + GOOGLE_AMP_RE.match(path).group("rest"))
+    # https://example-com.cdn.ampproject.org/c/s/example.com/story -> https://example.com/story
+    if host.endswith(".cdn.ampproject.org") and AMP_CACHE_RE.match(path):
+        return canonicalize_url("https://" + AMP_CACHE_RE.match(path).group("rest"))
+
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") >= 2:
+            host = host[len(prefix):]
+            break
+
+    port = parts.port
+    netloc = host if port in (None, 80, 443) else f"{host}:{port}"
+
+    path = AMP_PATH_RE.sub("", unquote(path)) or "/"
+    path = re.sub(r"/{2,}", "/", path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+        for index_page in ("/index.html", "/index.htm", "/index.php"):
+            if path.endswith(index_page):
+                path = path[: -len(index_page)] or "/"
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+    return urlunsplit(("https", netloc, path, urlencode(query), ""))
+
+
+def url_key(url: str) -> str:
+    """Stable short hash of the canonical URL, used as a storage key."""
+    return hashlib.blake2b(canonicalize_url(url).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over a bytearray, using double hashing of one blake2b digest."""
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01, data: bytes = None):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray(data) if data and len(data) == (self.num_bits + 7) // 8 else bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class ArticleIndex:
+    """
+    Persistent index of articles seen across runs, keyed by canonical URL.
+
+    A Bloom filter answers "never seen" without touching SQLite; positives are confirmed against
+    the seen_articles table, which also keeps the compressed scraped text so repeat URLs are not
+    fetched again. Resolved redirects are cached in the same database.
+    """
+
+    MAX_CONTENT_BYTES = 256 * 1024
+    BLOOM_SAVE_EVERY = 200
+
+    def __init__(self, path: str = None, bloom_path: str = None, capacity: int = 1_000_000):
+        self.path = path or get_db_path("articles.db")
+        self.bloom_path = bloom_path or get_db_path("articles.bloom")
+        self._connection = ThreadLocalConnection(self.path, synchronous="NORMAL")
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        with self._connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS seen_articles (
+                    canonical_url TEXT PRIMARY KEY,
+                    title TEXT NOT NULL DEFAULT '',
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    times_seen INTEGER NOT NULL DEFAULT 1,
+                    content BLOB
+                );
+                CREATE TABLE IF NOT EXISTS redirects (
+                    url TEXT PRIMARY KEY,
+                    target TEXT NOT NULL,
+                    resolved_at REAL NOT NULL
+                );
+            """)
+        self.bloom = self._load_bloom(capacity)
+        atexit.register(self.save_bloom)
+
+    def _load_bloom(self, capacity: int) -> BloomFilter:
+        bloom = BloomFilter(capacity)
+        self._bloom_rowid = 0
+        if os.path.exists(self.bloom_path):
+            with open(self.bloom_path, "rb") as f:
+                data = f.read()
+            # An 8-byte watermark (the highest seen_articles rowid the bits cover), then the bits. Files
+            # of any other size, or whose watermark row is missing from the bits (the database was
+            # replaced since), are rebuilt
+            watermark = int.from_bytes(data[:8], "little")
+            row = self._connection().execute(
+                "SELECT canonical_url FROM seen_articles WHERE rowid = ?", (watermark,)
+            ).fetchone()
+            if len(data) == 8 + len(bloom.bits):
+                bloom.bits[:] = data[8:]
+                if watermark == 0 or (row and row[0] in bloom):
+                    self._bloom_rowid = watermark
+                else:
+                    bloom = BloomFilter(capacity)
+        self.bloom = bloom
+        self._catch_up_bloom()
+        return bloom
+
+    def _catch_up_bloom(self) -> None:
+        """Add the rows written past the watermark, by this or any other process, to the filter."""
+        rows = self._connection().execute(
+            "SELECT rowid, canonical_url FROM seen_articles WHERE rowid > ? ORDER BY rowid", (self._bloom_rowid,)
+        ).fetchall()
+        with self._lock:
+            for _, canonical_url in rows:
+                self.bloom.add(canonical_url)
+            if rows:
+                self._bloom_rowid = max(self._bloom_rowid, rows[-1][0])
+
+    def save_bloom(self) -> None:
+        # Rows never leave seen_articles, so rowids only grow; catching up first means a process that
+        # missed other processes' rows cannot overwrite the file with a filter that hides them
+        self._catch_up_bloom()
+        with self._lock:
+            tmp_path = f"{self.bloom_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self._bloom_rowid.to_bytes(8, "little"))
+                f.write(self.bloom.bits)
+            os.replace(tmp_path, self.bloom_path)
+            self._unsaved = 0
+
+    def seen(self, url: str) -> bool:
+        """Return True if the canonical form of url was recorded by any earlier run."""
+        canonical = canonicalize_url(url)
+        if canonical not in self.bloom:
+            return False
+        row = self._connection().execute(
+            "SELECT 1 FROM seen_articles WHERE canonical_url = ?", (canonical,)
+        ).fetchone()
+        return row is not None
+
+    def add(self, url: str, title: str = "", content: str = None) -> str:
+        """Record an article (and optionally its scraped text). Returns its canonical URL."""
+        canonical = canonicalize_url(url)
+        now = time.time()
+        blob = None
+        if content:
+            blob = zlib.compress(content.encode("utf-8")[: self.MAX_CONTENT_BYTES], 6)
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO seen_articles (canonical_url, title, first_seen, last_seen, content) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(canonical_url) DO UPDATE SET last_seen = excluded.last_seen, "
+                "times_seen = times_seen + 1, title = COALESCE(NULLIF(excluded.title, ''), title), "
+                "content = COALESCE(excluded.content, content)",
+                (canonical, title or "", now, now, blob),
+            )
+        with self._lock:
+            self.bloom.add(canonical)
+            self._unsaved += 1
+            save = self._unsaved >= self.BLOOM_SAVE_EVERY
+        if save:
+            self.save_bloom()
+        return canonical
+
+    def get_content(self, url: str):
+        """Return previously scraped text for url, or None."""
+        canonical = canonicalize_url(url)
+        if canonical not in self.bloom:
+            return None
+        row = self._connection().execute(
+            "SELECT content FROM seen_articles WHERE canonical_url = ?", (canonical,)
+        ).fetchone()
+        if not row or row[0] is None:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8", errors="replace")
+
+    def get_redirect(self, url: str):
+        row = self._connection().execute("SELECT target FROM redirects WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def set_redirect(self, url: str, target: str) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO redirects (url, target, resolved_at) VALUES (?, ?, ?)",
+                (url, target, time.time()),
+            )
+
+
+@process_singleton
+def get_article_index() -> ArticleIndex:
+    """Return the process-wide article index."""
+    return ArticleIndex()
+
+
+_redirect_cache = OrderedDict()
+_redirect_cache_lock = threading.Lock()
+REDIRECT_CACHE_SIZE = 4096
+
+
+def resolve_redirects(url: str, timeout: float = 5.0, shorteners_only: bool = True) -> str:
+    """
+    Follow HTTP redirects and return the canonical final URL, caching results in memory and on disk.
+
+    Args:
+        url (str): The URL to resolve
+        timeout (float): Per-request timeout in seconds
+        shorteners_only (bool): Only hit the network for known link-shortener hosts
+
+    Returns:
+        str: Canonical URL of the redirect target (or of url itself if it could not be resolved)
+    """
+    canonical = canonicalize_url(url)
+    host = urlsplit(canonical).hostname or ""
+    if shorteners_only and host not in SHORTENER_HOSTS:
+        return canonical
+
+    with _redirect_cache_lock:
+        if canonical in _redirect_cache:
+            _redirect_cache.move_to_end(canonical)
+            return _redirect_cache[canonical]
+
+    index = get_article_index()
+    target = index.get_redirect(canonical)
+    if target is None:
+        try:
+            response = requests.head(url, allow_redirects=True, timeout=timeout)
+            if response.status_code >= 400:
+                # Some servers reject HEAD; a streamed GET does not download the body
+                response = requests.get(url, allow_redirects=True, timeout=timeout, stream=True)
+                response.close()
+            target = canonicalize_url(response.url)
+        except requests.RequestException as e:
+            logger.warning("Could not resolve redirects for %s: %s", url, e)
+            target = canonical
+        index.set_redirect(canonical, target)
+
+    with _redirect_cache_lock:
+        _redirect_cache[canonical] = target
+        if len(_redirect_cache) > REDIRECT_CACHE_SIZE:
+            _redirect_cache.popitem(last=False)
+    return target
+
+
+def dedupe_urls(urls, resolve: bool = True) -> list:
+    """Collapse URL variants of the same article, keeping the first occurrence in order."""
+    seen, result = set(), []
+    for url in urls or []:
+        if not url or not url.strip():
+            continue
+        key = resolve_redirects(url) if resolve else canonicalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            result.append(url.strip())
+    return result
+
+
+def _title_key(title: str) -> str:
+    return " ".join(re.findall(r"\w+", (title or "").lower()))
+
+
+def dedupe_articles(articles, resolve: bool = False) -> list:
+    """
+    Collapse related articles that point to the same story under different URLs or identical titles.
+
+    Args:
+        articles (list): RelatedArticle models or dicts with url/title keys
+        resolve (bool): Also follow shortener redirects when comparing URLs
+
+    Returns:
+        list: The articles with duplicates removed, in their original order
+    """
+    seen_urls, seen_titles, result = set(), set(), []
+    for article in articles or []:
+        url = article.get("url", "") if isinstance(article, dict) else getattr(article, "url", "")
+        title = article.get("title", "") if isinstance(article, dict) else getattr(article, "title", "")
+        url_id = (resolve_redirects(url) if resolve else canonicalize_url(url)) if url else None
+        title_id = _title_key(title)
+        if (url_id and url_id in seen_urls) or (title_id and title_id in seen_titles):
+            continue
+        if url_id:
+            seen_urls.add(url_id)
+        if title_id:
+            seen_titles.add(title_id)
+        result.append(article)
+    return result
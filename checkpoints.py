@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+from deadlines import TASK_BUDGETS
+from setup import get_db_path
+from shared_state import ThreadLocalConnection, process_singleton
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_MAX_AGE = 24 * 3600
+# A live run saves a checkpoint at least once per overall deadline, so a 'running' run untouched for
+# longer than that (plus setup and report time) was abandoned by a process that died
+RUN_ABANDONED_AFTER = sum(TASK_BUDGETS.values()) + 120
+
+
+def input_hash(user_query: str, urls=None, hashtags=None, keywords=None, reddit_post: str = None) -> str:
+    """
+    Stable hash of the analysis inputs; runs with the same hash can resume each other.
+
+    reddit_post (the permalink or id of the post being analyzed) keeps two posts whose titles give
+    the same query and keywords apart.
+    """
+    inputs = {
+        "query": (user_query or "").strip().lower(),
+        "urls": sorted(urls or []),
+        "hashtags": sorted(hashtags or []),
+        "keywords": sorted(keywords or []),
+    }
+    if reddit_post:
+        inputs["reddit_post"] = reddit_post
+    payload = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """Task outputs of analysis runs in SQLite, saved as each task completes."""
+
+    def __init__(self, path: str = None, max_age: int = CHECKPOINT_MAX_AGE,
+                 abandoned_after: float = RUN_ABANDONED_AFTER):
+        self.path = path or get_db_path("checkpoints.db")
+        self.max_age = max_age
+        self.abandoned_after = abandoned_after
+        self._connection = ThreadLocalConnection(self.path)
+        conn = self._connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    input_hash TEXT NOT NULL,
+                    user_query TEXT,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_input ON runs(input_hash, status, updated_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS task_outputs (
+                    run_id TEXT NOT NULL,
+                    task_name TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    completed_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, task_name)
+                ) WITHOUT ROWID
+            """)
+
+    def start(self, key: str, user_query: str = None, resume: bool = True) -> tuple:
+        """
+        Start a run for the given input hash, resuming the latest unfinished one if there is one.
+
+        Only failed runs and 'running' runs abandoned for abandoned_after seconds are resumed, so a
+        run still executing in another session or process never gets a second writer; the claim
+        is one conditional UPDATE, so two starts cannot both take the same run.
+
+        Args:
+            key (str): Output of input_hash
+            user_query (str): Stored for reference
+            resume (bool): Set to False to always start from scratch
+
+        Returns:
+            tuple: (run_id, dict of task name -> output already completed)
+        """
+        self.prune()
+        conn = self._connection()
+        if resume:
+            resumable = "(status = 'failed' OR (status = 'running' AND updated_at < ?))"
+            abandoned = time.time() - self.abandoned_after
+            row = conn.execute(
+                f"SELECT run_id FROM runs WHERE input_hash = ? AND {resumable} "
+                "ORDER BY updated_at DESC LIMIT 1", (key, abandoned)
+            ).fetchone()
+            if row:
+                outputs = self.outputs(row[0])
+                if outputs:
+                    with conn:
+                        claimed = conn.execute(
+                            f"UPDATE runs SET status = 'running', updated_at = ? WHERE run_id = ? AND {resumable}",
+                            (time.time(), row[0], abandoned),
+                        ).rowcount
+                    if claimed:
+                        logger.info("Resuming run %s with %d completed task(s)", row[0], len(outputs))
+                        return row[0], outputs
+
+        run_id = uuid.uuid4().hex
+        now = time.time()
+        with conn:
+            conn.execute("INSERT INTO runs (run_id, input_hash, user_query, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                         (run_id, key, user_query, now, now))
+        return run_id, {}
+
+    def save_output(self, run_id: str, task_name: str, output: str) -> None:
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO task_outputs VALUES (?, ?, ?, ?)", (run_id, task_name, output, now))
+            conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+
+    def discard_output(self, run_id: str, task_name: str) -> None:
+        """Forget one task's output so that a resumed run executes the task again."""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM task_outputs WHERE run_id = ? AND task_name = ?", (run_id, task_name))
+
+    def outputs(self, run_id: str) -> dict:
+        rows = self._connection().execute(
+            "SELECT task_name, output FROM task_outputs WHERE run_id = ? ORDER BY completed_at", (run_id,)
+        ).fetchall()
+        return dict(rows)
+
+    def finish(self, run_id: str, status: str = "complete") -> None:
+        """Mark a run complete (never resumed again) or failed (resumable)."""
+        conn = self._connection()
+        with conn:
+            conn.execute("UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?", (status, time.time(), run_id))
+
+    def prune(self) -> None:
+        """Delete runs, and their outputs, not touched within max_age."""
+        cutoff = time.time() - self.max_age
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM task_outputs WHERE run_id IN (SELECT run_id FROM runs WHERE updated_at < ?)", (cutoff,))
+            conn.execute("DELETE FROM runs WHERE updated_at < ?", (cutoff,))
+
+
+@process_singleton
+def get_checkpoint_store() -> CheckpointStore:
+    """Return the process-wide checkpoint store."""
+    return CheckpointStore()
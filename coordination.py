@@ -0,0 +1,291 @@
+import logging
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+from canonical import get_article_index
+from models import CoordinationPattern
+from report_store import normalize_domain
+
+logger = logging.getLogger(__name__)
+
+EMPTY_SLOT = np.uint32((1 << 32) - 1)
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class MinHashLSH:
+    """
+    Near-duplicate detector over word shingles.
+
+    Documents are tokenized once into a flat array of token ids; k-word shingles are hashed with a
+    vectorized polynomial hash, permuted with multiply-shift hashing, reduced to per-document
+    MinHash signatures with np.minimum.reduceat, and candidate pairs come from LSH banding.
+    Each band bucket is verified against a handful of representatives rather than pair by pair,
+    so large buckets of identical text stay linear.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 3,
+                 threshold: float = 0.5, seed: int = 1, chunk_size: int = 1 << 16,
+                 max_representatives: int = 8):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.max_representatives = max_representatives
+        rng = np.random.default_rng(seed)
+        # Multiply-shift permutations: high 32 bits of (a * h + b) mod 2^64, with odd a
+        self._a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self._band_weights = rng.integers(1, 1 << 62, size=self.rows, dtype=np.uint64)
+
+    def _shingle_hashes(self, texts):
+        """Return (shingle hashes, owning document index) for texts given as strings or token lists."""
+        vocab = {}
+        token_ids, doc_ids = [], []
+        for doc, text in enumerate(texts):
+            tokens = TOKEN_RE.findall(text.lower()) if isinstance(text, str) else text
+            ids = [vocab.setdefault(tok, len(vocab)) for tok in tokens]
+            token_ids.extend(ids)
+            doc_ids.extend([doc] * len(ids))
+        tokens = np.asarray(token_ids, dtype=np.uint64)
+        owners = np.asarray(doc_ids, dtype=np.int64)
+        k = self.shingle_size
+        if len(tokens) < k:
+            return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+
+        n = len(tokens) - k + 1
+        hashes = np.zeros(n, dtype=np.uint64)
+        for offset in range(k):
+            hashes = hashes * np.uint64(1000003) + tokens[offset:offset + n]
+        # Drop shingles that straddle two documents
+        valid = owners[:n] == owners[k - 1:k - 1 + n]
+        hashes = hashes[valid] ^ (hashes[valid] >> np.uint64(29))
+        return hashes, owners[:n][valid]
+
+    def signatures(self, texts) -> tuple:
+        """
+        Compute MinHash signatures.
+
+        Args:
+            texts (list): Document texts, or lists of lowercase tokens
+
+        Returns:
+            tuple: (uint32 array of shape (n_docs, num_perm), boolean mask of documents that had shingles)
+        """
+        hashes, owners = self._shingle_hashes(texts)
+        signatures = np.full((len(texts), self.num_perm), EMPTY_SLOT, dtype=np.uint32)
+        if len(hashes) == 0:
+            return signatures, np.zeros(len(texts), dtype=bool)
+
+        # Process whole documents per chunk so memory stays at chunk_size * num_perm
+        boundaries = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        start = 0
+        while start < len(boundaries):
+            first = boundaries[start]
+            end = np.searchsorted(boundaries, first + self.chunk_size, side="left")
+            end = max(end, start + 1)
+            last = boundaries[end] if end < len(boundaries) else len(hashes)
+            chunk = hashes[first:last, None]
+            permuted = ((chunk * self._a + self._b) >> np.uint64(32)).astype(np.uint32)
+            starts = boundaries[start:end] - first
+            signatures[owners[boundaries[start:end]]] = np.minimum.reduceat(permuted, starts, axis=0)
+            start = end
+        has_shingles = np.zeros(len(texts), dtype=bool)
+        has_shingles[owners[boundaries]] = True
+        return signatures, has_shingles
+
+    def clusters(self, texts) -> list:
+        """
+        Group near-duplicate texts.
+
+        Args:
+            texts (list): Document texts, or lists of lowercase tokens
+
+        Returns:
+            list: Clusters as (member indices, mean estimated Jaccard similarity to the most repeated text)
+        """
+        signatures, has_shingles = self.signatures(texts)
+        n = len(texts)
+        parent = np.arange(n)
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        candidates = np.flatnonzero(has_shingles)
+        if len(candidates) < 2:
+            return []
+        sigs = signatures[candidates]
+        for band in range(self.bands):
+            rows = sigs[:, band * self.rows:(band + 1) * self.rows]
+            keys = rows.astype(np.uint64) @ self._band_weights  # wrapping uint64 arithmetic is fine for bucketing
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            bucket_starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            bucket_ends = np.r_[bucket_starts[1:], len(order)]
+            shared = (bucket_ends - bucket_starts) >= 2
+            for s, e in zip(bucket_starts[shared], bucket_ends[shared]):
+                members = candidates[order[s:e]]
+                # Compare every member with a few representatives; a member matching none becomes one
+                representatives = [members[0]]
+                for member in members[1:]:
+                    rep_sigs = signatures[representatives]
+                    similarity = (rep_sigs == signatures[member]).mean(axis=1)
+                    best = int(np.argmax(similarity))
+                    if similarity[best] >= self.threshold:
+                        ra, rb = find(representatives[best]), find(member)
+                        if ra != rb:
+                            parent[rb] = ra
+                    elif len(representatives) < self.max_representatives:
+                        representatives.append(member)
+
+        roots = np.array([find(i) for i in candidates])
+        result = []
+        for root in np.unique(roots):
+            members = candidates[roots == root]
+            if len(members) < 2:
+                continue
+            # Measure against the most repeated signature in the cluster, i.e. the copy-pasted original
+            unique_sigs, counts = np.unique(signatures[members], axis=0, return_counts=True)
+            reference = unique_sigs[np.argmax(counts)]
+            similarity = (signatures[members] == reference).mean(axis=1)
+            result.append((members.tolist(), float(similarity.mean())))
+        return result
+
+
+def documents_from_reddit(reddit_data: dict) -> list:
+    """Turn scraped Reddit data into coordination documents (one per post/comment, entity = author)."""
+    if not reddit_data or "error" in reddit_data:
+        return []
+    documents = [{
+        "text": f"{reddit_data.get('title', '')} {reddit_data.get('selftext', '')}",
+        "entity": f"u/{reddit_data.get('author')}",
+        "timestamp": reddit_data.get("created_utc"),
+        "source": "reddit post",
+    }]
+    for comment in reddit_data.get("comments") or reddit_data.get("top_comments", []):
+        if comment.get("is_deleted"):
+            continue
+        documents.append({
+            "text": comment.get("body", ""),
+            "entity": f"u/{comment.get('author')}",
+            "timestamp": comment.get("created_utc"),
+            "source": "reddit comment",
+        })
+    return documents
+
+
+def documents_from_articles(articles) -> list:
+    """
+    Turn scraped articles into coordination documents (entity = domain).
+
+    Args:
+        articles (list): Tuples of (url, text) or (url, text, timestamp)
+    """
+    documents = []
+    for article in articles:
+        url, text = article[0], article[1]
+        timestamp = article[2] if len(article) > 2 else None
+        if text:
+            documents.append({"text": text, "entity": normalize_domain(url), "timestamp": timestamp, "source": "article"})
+    return documents
+
+
+def _format_time(timestamp) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+
+
+def detect_coordination(documents: list, min_tokens: int = 8, min_entities: int = 2,
+                        sync_window_seconds: int = 3600, max_entities_listed: int = 20,
+                        detector: MinHashLSH = None) -> list:
+    """
+    Find copy-pasted or near-identical text posted by different accounts or domains.
+
+    Args:
+        documents (list): Dicts with text, entity, timestamp (epoch seconds or None) and source
+        min_tokens (int): Ignore texts shorter than this many words (short replies match trivially)
+        min_entities (int): Minimum distinct entities in a cluster for it to count as coordination
+        sync_window_seconds (int): Clusters whose posts all fall inside this window are reported as
+            synchronized publishing
+        max_entities_listed (int): Cap on entities_involved per pattern
+        detector (MinHashLSH): Detector to use; a default one is created if omitted
+
+    Returns:
+        list: CoordinationPattern objects ordered by strength
+    """
+    tokenized = [(d, TOKEN_RE.findall((d.get("text") or "").lower())) for d in documents]
+    tokenized = [(d, tokens) for d, tokens in tokenized if len(tokens) >= min_tokens]
+    if len(tokenized) < 2:
+        return []
+    documents = [d for d, _ in tokenized]
+    detector = detector or MinHashLSH()
+    clusters = detector.clusters([tokens for _, tokens in tokenized])
+
+    patterns = []
+    for members, similarity in clusters:
+        docs = [documents[i] for i in members]
+        entities = list(dict.fromkeys(d["entity"] for d in docs if d.get("entity")))
+        if len(entities) < min_entities:
+            continue
+        timestamps = sorted(d["timestamp"] for d in docs if d.get("timestamp"))
+        span = timestamps[-1] - timestamps[0] if len(timestamps) >= 2 else None
+
+        if span is not None and span <= sync_window_seconds and len(entities) >= 3:
+            pattern_type = "Synchronized publishing"
+        elif similarity >= 0.9:
+            pattern_type = "Identical phrasing"
+        else:
+            pattern_type = "Near-duplicate phrasing"
+        if len({d.get("source") for d in docs}) > 1:
+            pattern_type += " (cross-platform)"
+
+        # Similarity scaled by how many independent entities repeat the text: 2 entities -> 0.5x, 10 -> 0.9x
+        strength = round(similarity * (1 - 1 / len(entities)), 3)
+
+        if timestamps:
+            timeline = (
+                f"{len(docs)} near-identical posts by {len(entities)} entities between "
+                f"{_format_time(timestamps[0])} and {_format_time(timestamps[-1])}"
+            )
+            if span is not None:
+                timeline += f" (span {span / 60:.0f} min)"
+        else:
+            timeline = f"{len(docs)} near-identical texts across {len(entities)} entities (no timestamps available)"
+        first = min((d for d in docs if d.get("timestamp")), key=lambda d: d["timestamp"], default=None)
+        if first:
+            timeline += f"; first seen from {first['entity']}"
+
+        patterns.append(CoordinationPattern(
+            pattern_type=pattern_type,
+            strength=strength,
+            entities_involved=entities[:max_entities_listed],
+            timeline=timeline,
+        ))
+
+    patterns.sort(key=lambda p: p.strength, reverse=True)
+    logger.info("Detected %d coordination pattern(s) across %d documents", len(patterns), len(documents))
+    return patterns
+
+
+def measure_coordination(report, reddit_data: dict = None) -> list:
+    """
+    Run coordination detection over the Reddit thread and every scraped article in a report.
+
+    Args:
+        report: A NewsAnalysisReport whose related_articles were scraped during the run
+        reddit_data (dict): Output of scrape_reddit_data, if the analysis started from a Reddit post
+
+    Returns:
+        list: CoordinationPattern objects
+    """
+    article_index = get_article_index()
+    articles = [(a.url, article_index.get_content(a.url)) for a in report.related_articles]
+    documents = documents_from_reddit(reddit_data) + documents_from_articles(articles)
+    return detect_coordination(documents)
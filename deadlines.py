@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+
+from profiler import propagate
+
+logger = logging.getLogger(__name__)
+
+# Task order matches create_news_analysis_tasks
+TASK_NAMES = ["crawler", "content", "social", "organizer", "reliability", "compiler"]
+TASK_LABELS = {
+    "crawler": "article search",
+    "content": "content analysis",
+    "social": "social media search",
+    "organizer": "data organization",
+    "reliability": "reliability assessment",
+    "compiler": "report compilation",
+}
+# Seconds each task may run; together they replace the crew-wide 10 minute timeout
+TASK_BUDGETS = {
+    "crawler": 150,
+    "content": 60,
+    "social": 90,
+    "organizer": 60,
+    "reliability": 90,
+    "compiler": 150,
+}
+
+
+class AnalysisTimeout(Exception):
+    """Raised when a task runs past its budget or the whole run past its deadline."""
+
+    def __init__(self, task_name: str, message: str):
+        super().__init__(message)
+        self.task_name = task_name
+
+
+class TaskDeadlines:
+    """
+    Per-task time budgets for one sequential crew run, enforced cooperatively.
+
+    Pass check as the crew's step_callback and task_completed as its task_callback. Each completed
+    task's raw output is kept in outputs, and the next task's clock starts when the previous one
+    finishes. check raises AnalysisTimeout at the first agent step past the current task's budget;
+    run additionally stops waiting at the overall deadline, so an LLM call that hangs between steps
+    cannot hold the caller past it.
+
+    A resumed run passes the outputs of the tasks it skips as completed; on_task_completed is
+    called with (task name, raw output) as each remaining task finishes.
+    """
+
+    def __init__(self, budgets: dict = None, task_names: list = None, completed: dict = None,
+                 on_task_completed=None):
+        self.budgets = dict(budgets or TASK_BUDGETS)
+        self.task_names = list(task_names or TASK_NAMES)
+        # Tasks run in order, so only a leading run of completed tasks can be skipped
+        self.outputs = {}
+        for name in self.task_names:
+            if not completed or name not in completed:
+                break
+            self.outputs[name] = completed[name]
+        self.resumed = list(self.outputs)
+        self.on_task_completed = on_task_completed
+        self.task_seconds = {}
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._task_started = None
+
+    @property
+    def current_task(self):
+        """Name of the task currently running, or None once all have completed."""
+        index = len(self.outputs)
+        return self.task_names[index] if index < len(self.task_names) else None
+
+    @property
+    def remaining_tasks(self) -> list:
+        return [name for name in self.task_names if name not in self.outputs]
+
+    @property
+    def total_budget(self) -> float:
+        return sum(self.budgets.get(name, 0) for name in self.remaining_tasks)
+
+    def start(self) -> None:
+        self._task_started = time.monotonic()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def task_completed(self, output) -> None:
+        """Task callback: record the finished task's raw output and start the next task's clock."""
+        if self._cancelled.is_set():
+            return
+        with self._lock:
+            name = self.current_task
+            if name is None:
+                return
+            now = time.monotonic()
+            self.outputs[name] = getattr(output, "raw", None) or str(output)
+            self.task_seconds[name] = now - (self._task_started or now)
+            self._task_started = now
+        logger.info("Task '%s' completed in %.1fs", name, self.task_seconds[name])
+        if self.on_task_completed:
+            try:
+                self.on_task_completed(name, self.outputs[name])
+            except Exception as e:
+                logger.warning("Could not checkpoint task '%s': %s", name, e)
+
+    def check(self, step=None) -> None:
+        """Step callback: raise AnalysisTimeout if the run was cancelled or the current task is over budget."""
+        name = self.current_task
+        if self._cancelled.is_set():
+            raise AnalysisTimeout(name, "Analysis was cancelled")
+        if name is None or self._task_started is None:
+            return
+        elapsed = time.monotonic() - self._task_started
+        if elapsed > self.budgets.get(name, float("inf")):
+            self.cancel()
+            raise AnalysisTimeout(name, f"The {TASK_LABELS.get(name, name)} step exceeded its {self.budgets[name]}s budget")
+
+    def run(self, fn, *args, on_progress=None, deadline: float = None, **kwargs):
+        """
+        Run fn (normally crew.kickoff) in a worker thread under the budgets.
+
+        Args:
+            fn: The function to run
+            *args, **kwargs: Passed to fn
+            on_progress: Optional callable(completed task count), called from this thread
+            deadline (float): Overall limit in seconds (defaults to the sum of the task budgets)
+
+        Returns:
+            The result of fn
+
+        Raises:
+            AnalysisTimeout: A task exceeded its budget or the run exceeded the overall deadline
+        """
+        deadline = deadline or self.total_budget
+        outcome = {}
+
+        def target():
+            try:
+                outcome["result"] = fn(*args, **kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+
+        self.start()
+        worker = threading.Thread(target=propagate(target), name="crew-run", daemon=True)
+        started = time.monotonic()
+        worker.start()
+        reported = -1
+        while worker.is_alive():
+            worker.join(timeout=0.5)
+            if on_progress and len(self.outputs) != reported:
+                reported = len(self.outputs)
+                on_progress(reported)
+            if time.monotonic() - started > deadline and worker.is_alive():
+                # The worker notices at its next step and stops; its late output is ignored
+                name = self.current_task
+                self.cancel()
+                raise AnalysisTimeout(name, f"Analysis exceeded the {deadline:.0f}s deadline during the {TASK_LABELS.get(name, name)} step")
+
+        error = outcome.get("error")
+        if error is not None:
+            # Frameworks may wrap the exception raised from the step callback
+            if not isinstance(error, AnalysisTimeout) and self._cancelled.is_set():
+                raise AnalysisTimeout(self.current_task, str(error)) from error
+            raise error
+        return outcome.get("result")
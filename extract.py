@@ -0,0 +1,280 @@
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import requests
+from lxml import etree
+
+from shared_state import process_singleton
+
+logger = logging.getLogger(__name__)
+
+# Bytes of HTML read per page; anything past this is never downloaded or parsed
+MAX_HTML_BYTES = 2 * 1024 * 1024
+# Article text handed to agents, in approximate LLM tokens (about 4 characters each)
+MAX_DOC_TOKENS = 3000
+CHARS_PER_TOKEN = 4
+FEED_CHUNK_BYTES = 64 * 1024
+EXTRACTION_WORKERS = int(os.getenv("VERIFAI_EXTRACT_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+EXTRACTION_TIMEOUT = 60
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/124.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5",
+    "Accept-Language": "en-US,en;q=0.8",
+}
+
+BOILERPLATE_TAGS = frozenset([
+    "script", "style", "noscript", "nav", "header", "footer", "aside", "form", "iframe", "svg", "button",
+    "select", "template", "object", "embed", "canvas", "dialog", "menu",
+])
+# class/id tokens of ads, comment sections, share bars, related-article rails and other page furniture
+BOILERPLATE_RE = re.compile(
+    r"(?:^|[\s_-])(?:ads?|advert\w*|sponsor\w*|promo\w*|comments?|disqus|share|sharing|social|related|"
+    r"recommend\w*|newsletter|subscribe|subscription|paywall|cookie\w*|consent|sidebar|breadcrumbs?|"
+    r"nav|navbar|navigation|menu|footer|masthead|popup|modal|outbrain|taboola|widget)(?:$|[\s_-])",
+    re.IGNORECASE,
+)
+BYLINE_RE = re.compile(r"byline|author", re.IGNORECASE)
+PARAGRAPH_TAGS = frozenset(["p", "blockquote", "pre"])
+HEADING_TAGS = frozenset(["h1", "h2", "h3", "h4"])
+CONTAINER_TAGS = frozenset(["div", "section", "article", "main", "td"])
+# Finished block elements are cleared so the partial tree stays small. Inline elements (span, a, em ...)
+# must stay: their text is part of the enclosing paragraph, which is collected when it ends
+CLEARED_TAGS = PARAGRAPH_TAGS | HEADING_TAGS | CONTAINER_TAGS | frozenset(["li", "ul", "ol", "table"])
+MIN_CHARS = {"p": 25, "blockquote": 25, "pre": 25, "li": 60, "container": 80}
+DATE_META = frozenset([
+    "article:published_time", "og:published_time", "date", "pubdate", "publishdate", "publish-date",
+    "dc.date", "dc.date.issued", "parsely-pub-date", "sailthru.date", "datepublished",
+])
+AUTHOR_META = frozenset(["author", "article:author", "byl", "parsely-author", "sailthru.author", "dc.creator"])
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _clean(text) -> str:
+    return WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def _is_boilerplate(element) -> bool:
+    marker = f"{element.get('class', '')} {element.get('id', '')} {element.get('role', '')}"
+    return marker.strip() != "" and BOILERPLATE_RE.search(marker) is not None
+
+
+class _ArticleState:
+    """Collects the article record from pull-parser events, one chunk at a time."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.meta = {}
+        self.html_title = ""
+        self.first_heading = ""
+        self.byline = ""
+        self.time_datetime = ""
+        self.blocks = []
+        self.seen = set()
+        self.chars = 0
+        self.truncated = False
+        self._stack = []
+        self._boilerplate_depth = 0
+
+    def _add_block(self, text: str) -> None:
+        if text in self.seen:
+            return
+        self.seen.add(text)
+        room = self.max_chars - self.chars
+        if len(text) > room:
+            text = text[:room].rsplit(" ", 1)[0] + " …"
+            self.truncated = True
+        self.blocks.append(text)
+        self.chars += len(text) + 2
+
+    def consume(self, events) -> bool:
+        """Process parser events; returns True once the text cap is reached."""
+        for event, element in events:
+            tag = element.tag.lower() if isinstance(element.tag, str) else ""
+            if event == "start":
+                boilerplate = tag in BOILERPLATE_TAGS or _is_boilerplate(element)
+                self._stack.append(boilerplate)
+                self._boilerplate_depth += boilerplate
+                if tag == "meta":
+                    key = (element.get("property") or element.get("name") or element.get("itemprop") or "").lower()
+                    if key and element.get("content"):
+                        self.meta.setdefault(key, _clean(element.get("content")))
+                elif tag == "time" and not self.time_datetime:
+                    self.time_datetime = element.get("datetime", "")
+                continue
+
+            boilerplate = self._stack.pop() if self._stack else False
+            if tag == "title" and not self.html_title:
+                self.html_title = _clean(element.text)
+            elif not self.byline and (BYLINE_RE.search(element.get("class", "")) or element.get("rel") == "author"
+                                      or element.get("itemprop") == "author"):
+                # Bylines often sit in headers that are otherwise boilerplate
+                self.byline = _clean(" ".join(element.itertext()))[:200]
+            elif self._boilerplate_depth == 0 and tag:
+                self._collect(tag, element)
+            self._boilerplate_depth -= boilerplate
+            if tag in CLEARED_TAGS or boilerplate:
+                element.clear(keep_tail=True)
+            if self.chars >= self.max_chars:
+                self.truncated = True
+                return True
+        return False
+
+    def _collect(self, tag: str, element) -> None:
+        if tag in HEADING_TAGS:
+            text = _clean(" ".join(element.itertext()))
+            if tag == "h1" and not self.first_heading:
+                self.first_heading = text
+            elif text:
+                self._add_block(text)
+            return
+        kind = "container" if tag in CONTAINER_TAGS else tag
+        if kind not in MIN_CHARS:
+            return
+        # Block children were cleared when they ended, so this is the element's own remaining text
+        text = _clean(" ".join(element.itertext()))
+        if len(text) < MIN_CHARS[kind]:
+            return
+        link_chars = sum(len(_clean(" ".join(a.itertext()))) for a in element.iter("a"))
+        if link_chars > 0.5 * len(text):
+            return
+        self._add_block(text)
+
+    def record(self, url: str) -> dict:
+        meta = self.meta
+        byline = next((meta[k] for k in AUTHOR_META if k in meta and not meta[k].startswith("http")), "") or self.byline
+        return {
+            "url": url,
+            "title": meta.get("og:title") or self.html_title or self.first_heading,
+            "byline": re.sub(r"^by\s+", "", byline, flags=re.IGNORECASE),
+            "published_date": next((meta[k] for k in DATE_META if k in meta), "") or self.time_datetime,
+            "text": "\n\n".join(self.blocks),
+            "truncated": self.truncated,
+        }
+
+
+def extract_article(html, url: str = "", max_tokens: int = MAX_DOC_TOKENS, max_bytes: int = MAX_HTML_BYTES) -> dict:
+    """
+    Extract the main text and metadata of an article page.
+
+    The HTML is fed to an lxml pull parser in chunks; finished elements are cleared as their end
+    tags arrive, boilerplate subtrees (navigation, ads, comments, scripts, share bars) are skipped,
+    and parsing stops as soon as the text cap is reached, so memory stays bounded by the cap and
+    the chunk size rather than by the page size.
+
+    Args:
+        html (bytes | str): Page HTML
+        url (str): Page URL, copied into the record
+        max_tokens (int): Approximate cap on the extracted text, in LLM tokens
+        max_bytes (int): Cap on the HTML parsed
+
+    Returns:
+        dict: url, title, byline, published_date, text and truncated
+
+    Text inside inline elements stays part of its paragraph:
+
+    >>> extract_article("<p>Hello <span>world, this is a long sentence</span> at the end of the paragraph.</p>")["text"]
+    'Hello world, this is a long sentence at the end of the paragraph.'
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8", errors="replace")
+    state = _ArticleState(max_tokens * CHARS_PER_TOKEN)
+    parser = etree.HTMLPullParser(events=("start", "end"), remove_comments=True, remove_pis=True)
+    limit = min(len(html), max_bytes)
+    try:
+        for offset in range(0, limit, FEED_CHUNK_BYTES):
+            parser.feed(html[offset:min(offset + FEED_CHUNK_BYTES, limit)])
+            if state.consume(parser.read_events()):
+                break
+        else:
+            parser.close()
+            state.consume(parser.read_events())
+    except etree.LxmlError as e:
+        logger.warning("Could not fully parse %s: %s", url or "page", e)
+    if len(html) > max_bytes:
+        state.truncated = True
+    return state.record(url)
+
+
+def format_article(record: dict) -> str:
+    """Render an extracted article as compact text for agent context."""
+    lines = [f"Title: {record['title'] or 'Unknown'}"]
+    if record["byline"]:
+        lines.append(f"By: {record['byline']}")
+    if record["published_date"]:
+        lines.append(f"Published: {record['published_date']}")
+    lines.append(f"URL: {record['url']}")
+    lines.append("")
+    lines.append(record["text"] or "(No article text could be extracted.)")
+    if record["truncated"]:
+        lines.append("")
+        lines.append("[Article truncated]")
+    return "\n".join(lines)
+
+
+def fetch_html(url: str, timeout: float = 15, max_bytes: int = MAX_HTML_BYTES) -> tuple:
+    """
+    Download a page, reading at most max_bytes of it.
+
+    Returns:
+        tuple: (final URL after redirects, HTML bytes)
+
+    Raises:
+        requests.RequestException: The request failed or returned an error status
+        ValueError: The response is not HTML
+    """
+    with requests.get(url, headers=FETCH_HEADERS, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "text/html")
+        if "html" not in content_type and "xml" not in content_type:
+            raise ValueError(f"{url} is not an HTML page ({content_type})")
+        chunks, size = [], 0
+        for chunk in response.iter_content(FEED_CHUNK_BYTES):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+        return response.url, b"".join(chunks)[:max_bytes]
+
+
+@process_singleton
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Return the process-wide extraction pool (spawned workers, so they do not inherit app threads)."""
+    return ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def reset_extraction_pool() -> None:
+    """Shut down the extraction pool (after it broke); the next get_extraction_pool starts a new one."""
+    pool = get_extraction_pool.discard()
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_in_pool(html, url: str = "", max_tokens: int = MAX_DOC_TOKENS) -> dict:
+    """
+    extract_article on the process pool; falls back to this process if the pool is unavailable.
+
+    Raises:
+        TimeoutError: The page took longer than EXTRACTION_TIMEOUT; the pool is left running for
+            the other callers and the page is not retried in-process
+    """
+    try:
+        future = get_extraction_pool().submit(extract_article, html, url, max_tokens)
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        logger.warning("Extraction pool unavailable (%s); extracting in-process", e)
+        reset_extraction_pool()
+        return extract_article(html, url, max_tokens)
+    try:
+        return future.result(timeout=EXTRACTION_TIMEOUT)
+    except FutureTimeoutError:
+        # Checked first: on Python 3.11+ this is an OSError, and one slow page must not tear down the shared pool
+        future.cancel()
+        raise TimeoutError(f"Extracting {url or 'page'} took longer than {EXTRACTION_TIMEOUT}s") from None
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        logger.warning("Extraction pool unavailable (%s); extracting in-process", e)
+        reset_extraction_pool()
+        return extract_article(html, url, max_tokens)
@@ -0,0 +1,146 @@
+import logging
+
+from batch import search_news
+from bot_metrics import apply_bot_metrics
+from canonical import dedupe_articles
+from coordination import measure_coordination
+from deadlines import TASK_NAMES
+from models import ContentAnalysis, NewsAnalysisReport, PropagandaAnalysis, RelatedArticle, SourceInfo
+from partial_report import NO_FINDINGS, build_partial_report
+from report_store import normalize_domain
+from reputation import apply_reputation
+from sentiment import measure_report_sentiment
+from text_metrics import apply_text_metrics
+from thread_analytics import apply_thread_analytics
+from spread import apply_spread
+from social_tags import apply_social_tags, merge_hashtags
+
+logger = logging.getLogger(__name__)
+
+FAST_SEARCH_RESULTS = 10
+DEFAULT_RELIABILITY = 50.0
+PRELIMINARY_NOTE = "Preliminary report from local analysis and one news search; the full analysis is still running."
+
+
+def build_fast_report(user_query: str, keywords: list, reddit_data: dict = None, search=search_news) -> NewsAnalysisReport:
+    """
+    Build a preliminary report from local work only: one news search plus local scoring.
+
+    Related articles and sources come from a single Serper news search for the top keywords;
+    source scores and known-fake flags from the reputation table; sentiment, readability,
+    entities, hashtags, coordination, bot and thread metrics are measured over the Reddit thread and the search
+    snippets. No LLM is called, so the report is ready in seconds.
+
+    Args:
+        user_query (str): The analysis query
+        keywords (list): Keyword strings, most important first
+        reddit_data (dict): Output of scrape_reddit_data, if the analysis started from a Reddit post
+        search: callable(query, num_results) returning news results (batch.search_news)
+
+    Returns:
+        NewsAnalysisReport: The preliminary report, marked as such in analysis_note
+    """
+    query = " ".join(keywords[:5]) or user_query
+    results = search(query, FAST_SEARCH_RESULTS)
+
+    report = NewsAnalysisReport(
+        query_summary=f"Analysis for: {user_query}",
+        key_findings="",
+        related_words=list(keywords[:20]),
+        content_analysis=ContentAnalysis(sentiment="Unknown", bias="Unknown", readability_score=0.0),
+        propaganda_analysis=PropagandaAnalysis(overall_risk_score=0.0),
+        analysis_note=PRELIMINARY_NOTE,
+    )
+    report.related_articles = dedupe_articles([
+        RelatedArticle(title=item["title"], url=item["url"], source=item["source"],
+                       published_date=item["date"] or "Unknown")
+        for item in results
+    ])
+    domains = dict.fromkeys(normalize_domain(article.url) for article in report.related_articles)
+    report.top_sources = [
+        SourceInfo(name=domain, url=f"https://{domain}", reliability_score=DEFAULT_RELIABILITY)
+        for domain in domains if domain
+    ]
+    scored = apply_reputation(report)
+
+    snippets = [f"{item['title']}. {item['snippet']}".strip() for item in results]
+    measured = measure_report_sentiment(snippets, reddit_data)
+    if measured:
+        report.content_analysis.sentiment = measured["sentiment"]
+    apply_text_metrics(report, snippets, reddit_data)
+    apply_social_tags(report, (), reddit_data, snippets)
+    report.propaganda_analysis.coordination_patterns = measure_coordination(report, reddit_data)
+    apply_bot_metrics(report, reddit_data)
+    apply_thread_analytics(report, reddit_data)
+    apply_spread(report, reddit_data)
+    if reddit_data and reddit_data.get("similar_posts_time_series"):
+        report.similar_posts_time_series = reddit_data["similar_posts_time_series"]
+
+    report.key_findings = _summarize(report, measured, scored, reddit_data)
+    logger.info("Built preliminary report with %d article(s) for '%s'", len(report.related_articles), user_query)
+    return report
+
+
+def _summarize(report: NewsAnalysisReport, measured: dict, scored: int, reddit_data: dict) -> str:
+    findings = []
+    if reddit_data and "error" not in reddit_data:
+        findings.append(f"The post in r/{reddit_data.get('subreddit', '?')} has {reddit_data.get('num_comments', 0)} comments.")
+    if measured:
+        findings.append(f"Measured sentiment is {measured['sentiment']} (compound {measured['compound']:+.2f} "
+                        f"over {measured['count']} texts).")
+    if report.related_articles:
+        findings.append(f"A news search found {len(report.related_articles)} related article(s) from "
+                        f"{len(report.top_sources)} source(s), {scored} of them in the reputation table.")
+    else:
+        findings.append("A news search found no related articles yet.")
+    if report.fake_news_sites:
+        findings.append(f"Known unreliable domains among them: {', '.join(report.fake_news_sites)}.")
+    patterns = report.propaganda_analysis.coordination_patterns
+    if patterns:
+        findings.append(f"{len(patterns)} coordinated posting pattern(s) detected in the thread.")
+    bot_score = report.propaganda_analysis.bot_activity_metrics.bot_likelihood_score
+    if bot_score:
+        findings.append(f"Bot likelihood among commenters: {bot_score * 100:.0f}%.")
+    return " ".join(findings)
+
+
+def merge_task_outputs(preliminary: NewsAnalysisReport, user_query: str, task_outputs: dict) -> NewsAnalysisReport:
+    """
+    Overlay the sections parsed from completed crew tasks on a preliminary report.
+
+    Sections a task has produced replace the preliminary ones (articles and sources are merged);
+    locally measured fields (sentiment, text metrics, coordination, bot metrics) are kept.
+
+    Args:
+        preliminary (NewsAnalysisReport): Output of build_fast_report; not modified
+        user_query (str): The analysis query
+        task_outputs (dict): Task name (see deadlines.TASK_NAMES) -> raw output text
+
+    Returns:
+        NewsAnalysisReport: A new report
+    """
+    partial = build_partial_report(user_query, task_outputs, "the full analysis is still running")
+    report = preliminary.model_copy(deep=True)
+
+    report.related_articles = dedupe_articles(list(partial.related_articles) + list(report.related_articles))
+    known = {source.name for source in partial.top_sources}
+    report.top_sources = list(partial.top_sources) + [s for s in report.top_sources if s.name not in known]
+    apply_reputation(report)
+    for field in ("related_words", "topic_clusters", "cross_source_facts"):
+        value = getattr(partial, field)
+        if value:
+            setattr(report, field, value)
+    report.top_hashtags = merge_hashtags(report.top_hashtags, partial.top_hashtags)
+    # Measured thread facts stay alongside those the social task reports
+    report.platform_facts = list(partial.platform_facts) + report.platform_facts
+    report.fake_news_sites = list(dict.fromkeys(report.fake_news_sites + partial.fake_news_sites))
+    if partial.key_findings != NO_FINDINGS:
+        report.key_findings = f"{partial.key_findings} {report.key_findings}".strip()
+    if task_outputs.get("reliability"):
+        analysis = partial.propaganda_analysis
+        report.propaganda_analysis.overall_risk_score = analysis.overall_risk_score
+        report.propaganda_analysis.misinformation_indicators_detected = analysis.misinformation_indicators_detected
+
+    done = sum(1 for name in TASK_NAMES if task_outputs.get(name))
+    report.analysis_note = f"Preliminary report with {done} of {len(TASK_NAMES)} analysis steps merged; the full analysis is still running."
+    return report
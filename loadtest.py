@@ -0,0 +1,533 @@
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+import app
+from app import run_news_analysis
+from bench_models import build_report_dict
+from canonical import canonicalize_url
+from fast_tier import build_fast_report, merge_task_outputs
+from rate_limit import get_limiter
+from reddit import extract_keywords
+from singleflight import get_single_flight
+from time_series import bin_timestamps
+
+logger = logging.getLogger(__name__)
+
+LEVELS = [1, 2, 4, 8, 16]
+PERCENTILES = [50, 95, 99]
+SEARCH_TASKS = ("crawler", "content", "social")
+VOCABULARY = (
+    "election senate vote ballot court ruling policy economy inflation market climate report officials "
+    "investigation protest campaign governor budget tariff energy border health vaccine study agency"
+).split()
+HASHTAGS = ["#breaking", "#news", "#election2024", "#climate", "#economy"]
+RSS_SAMPLE_INTERVAL = 0.25
+# A level is saturated when adding users raises throughput by less than this fraction ...
+MIN_THROUGHPUT_GAIN = 0.10
+# ... or its p95 latency exceeds this multiple of the first level's ...
+MAX_LATENCY_FACTOR = 3.0
+# ... or more than this share of its analyses fail
+MAX_ERROR_RATE = 0.05
+
+
+class StubBackendError(Exception):
+    """Failure injected by a stub backend."""
+
+
+class StubBackend:
+    """
+    A fake external service with log-normal latency and a failure rate.
+
+    Each call sleeps median * exp(sigma * N(0, 1)) * time_scale seconds and then fails with
+    probability error_rate. With a provider name the call goes through that provider's shared
+    rate limiter, as the real client's calls do.
+    """
+
+    def __init__(self, name: str, median: float, sigma: float = 0.5, error_rate: float = 0.0,
+                 time_scale: float = 1.0, provider: str = None, seed: int = None):
+        self.name = name
+        self.median = median
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.time_scale = time_scale
+        self.provider = provider
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def call(self, fn=None, *args, **kwargs):
+        """Wait one sampled latency, then raise StubBackendError or return fn(*args, **kwargs)."""
+        def request():
+            with self._lock:
+                self.calls += 1
+                latency = self.median * math.exp(self.sigma * self._random.gauss(0.0, 1.0)) * self.time_scale
+                failed = self._random.random() < self.error_rate
+                if failed:
+                    self.failures += 1
+            time.sleep(latency)
+            if failed:
+                raise StubBackendError(f"{self.name}: injected failure")
+            return fn(*args, **kwargs) if fn else None
+
+        if self.provider:
+            return get_limiter(self.provider).call(request)
+        return request()
+
+
+class StubTaskOutput:
+    """The part of a CrewAI task output that deadlines and parse_crew_result read."""
+
+    def __init__(self, raw: str):
+        self.raw = raw
+
+    def __str__(self):
+        return self.raw
+
+
+def task_output(name: str, query: str) -> str:
+    """Canned output of one crew task, in the format its prompt asks for (see partial_report)."""
+    index = abs(hash(query)) % 10000
+    if name == "crawler":
+        articles = "\n".join(
+            f"Title: {query} - report {i} | Source: news{i}.example.com | "
+            f"URL: https://news{i}.example.com/{index}/story-{i} | Reliability: {('High', 'Medium', 'Low')[i % 3]}"
+            for i in range(5)
+        )
+        return f"ARTICLES:\n{articles}\nSUMMARY: Five outlets covered {query}."
+    if name == "content":
+        return (f"THEMES: {', '.join(VOCABULARY[index % 10:index % 10 + 5])}\n"
+                f"KEYWORDS: {', '.join(VOCABULARY[:8])}\nCONFLICTS: None\nQUALITY: Consistent headlines")
+    if name == "social":
+        return f"HASHTAGS: {', '.join(HASHTAGS[:3])}\nSENTIMENT: Neutral\nENGAGEMENT: Moderate\nTRENDING: Yes"
+    if name == "organizer":
+        return "LOW RELIABILITY: None\nPATTERNS: Coverage follows the original wire story."
+    if name == "reliability":
+        return "RELIABILITY SCORE: 7/10\nRED FLAGS: None\nVERIFICATION STEPS: Compare with the primary source, Check the dates"
+    report = build_report_dict(articles=10, timeline=48)
+    report["query_summary"] = f"Analysis for: {query}"
+    return json.dumps(report)
+
+
+class StubCrew:
+    """
+    Stands in for the CrewAI crew of one analysis.
+
+    kickoff walks the tasks the run still has to do in order; every task makes llm_calls stub LLM
+    calls (plus one stub search for the tool-using tasks), reports each step to the deadlines'
+    step callback and completes with a canned output through its task callback, as the real crew
+    does. The compiler's canned output is a valid report.
+    """
+
+    def __init__(self, backends: dict, deadlines, query: str, llm_calls: int):
+        self.backends = backends
+        self.deadlines = deadlines
+        self.query = query
+        self.llm_calls = llm_calls
+
+    def kickoff(self, inputs: dict = None):
+        for name in list(self.deadlines.remaining_tasks):
+            for step in range(self.llm_calls):
+                self.backends["llm"].call()
+                if name in SEARCH_TASKS and step == 0:
+                    self.backends["search"].call()
+                self.deadlines.check(step)
+            self.deadlines.task_completed(StubTaskOutput(task_output(name, self.query)))
+        return StubTaskOutput(self.deadlines.outputs.get("compiler", ""))
+
+
+@contextmanager
+def stub_backends(backends: dict, llm_calls: int):
+    """Make app.run_news_analysis build StubCrews instead of real crews while the block runs."""
+    original = app.create_news_analysis_crew
+
+    def create_crew(user_query, urls=None, hashtags=None, keywords=None, deadlines=None, **kwargs):
+        return StubCrew(backends, deadlines, user_query, llm_calls)
+
+    app.create_news_analysis_crew = create_crew
+    try:
+        yield
+    finally:
+        app.create_news_analysis_crew = original
+
+
+def synthetic_thread(comments: int, seed: int = 0) -> list:
+    """Comment records shaped like reddit.collect_comments output, with replies, hashtags and deleted comments."""
+    rng = random.Random(seed)
+    started = time.time() - 6 * 3600
+    records = []
+    for i in range(comments):
+        parent = rng.randrange(i) if i and rng.random() < 0.6 else None
+        deleted = rng.random() < 0.03
+        words = rng.choices(VOCABULARY, k=rng.randint(8, 40))
+        if rng.random() < 0.1:
+            words.append(rng.choice(HASHTAGS))
+        records.append({
+            "id": f"c{i}",
+            "parent_id": f"t1_c{parent}" if parent is not None else "t3_post",
+            "author": "None" if deleted else f"user{rng.randrange(max(comments // 3, 1))}",
+            "author_fullname": None,
+            "body": "[deleted]" if deleted else " ".join(words),
+            "score": int(rng.lognormvariate(1.0, 1.2)) - 1,
+            "created_utc": started + rng.expovariate(1 / 3600),
+            "depth": records[parent]["depth"] + 1 if parent is not None else 0,
+            "edited": rng.random() < 0.05,
+            "is_deleted": deleted,
+        })
+    return records
+
+
+def stub_reddit_post(thread: list, post_index: int) -> dict:
+    """A scrape_reddit_data result for a synthetic post carrying a copy of thread."""
+    comments = [dict(comment) for comment in thread]
+    topic = " ".join(VOCABULARY[post_index % 20:post_index % 20 + 3])
+    return {
+        "id": f"lt{post_index}",
+        "title": f"Load test post {post_index}: {topic}",
+        "selftext": f"Discussion of the {topic} story.",
+        "author": "loadtest",
+        "subreddit": "loadtest",
+        "score": 1200,
+        "upvote_ratio": 0.91,
+        "created_utc": min(c["created_utc"] for c in comments) - 60 if comments else time.time(),
+        "url": f"https://news{post_index % 7}.example.com/story-{post_index}",
+        "permalink": f"/r/loadtest/comments/lt{post_index}/load_test_post_{post_index}/",
+        "num_comments": len(comments),
+        "is_original_content": False,
+        "comments": comments,
+        "top_comments": [c for c in comments if c["depth"] == 0][:10],
+        "authors": {},
+        "spread": [],
+    }
+
+
+def stub_search(backends: dict, query: str, num_results: int = 10) -> list:
+    """batch.search_news against the stub search backend: empty on failure, like the real one."""
+    try:
+        backends["search"].call()
+    except StubBackendError as e:
+        logger.debug("News search failed for '%s': %s", query, e)
+        return []
+    return [
+        {"title": f"{query} - coverage {i}", "url": f"https://news{i}.example.com/{abs(hash(query)) % 10000}/story-{i}",
+         "source": f"news{i}.example.com", "snippet": f"Reporting on {query} #news", "date": "1 hour ago"}
+        for i in range(num_results)
+    ]
+
+
+def reddit_flow(backends: dict, thread: list, post_index: int) -> dict:
+    """
+    The Reddit-URL flow of streamlit.analyze_reddit_post: prepare the post (coalesced per URL),
+    build the preliminary report, then run the analysis and merge task outputs as they land.
+
+    Returns:
+        dict: ok, and preliminary (seconds until the preliminary report was ready)
+    """
+    started = time.perf_counter()
+    url = f"https://www.reddit.com/r/loadtest/comments/lt{post_index}/load_test_post_{post_index}/"
+
+    def prepare(publish):
+        try:
+            reddit_data = backends["reddit"].call(stub_reddit_post, thread, post_index)
+        except StubBackendError as e:
+            return {"error": str(e)}, None
+        keywords = extract_keywords(reddit_data)
+        if keywords:
+            times = [c["created_utc"] for c in reddit_data["comments"]]
+            try:
+                reddit_data["similar_posts_time_series"] = backends["reddit"].call(bin_timestamps, times)
+            except StubBackendError:
+                reddit_data["similar_posts_time_series"] = []
+        return reddit_data, keywords
+
+    (reddit_data, keywords), _ = get_single_flight("reddit_post").run(canonicalize_url(url), prepare)
+    if "error" in reddit_data or not keywords:
+        return {"ok": False, "error": reddit_data.get("error", "no keywords")}
+
+    keyword_list = [kw["text"] for kw in keywords]
+    user_query = f"News analysis for: {reddit_data['title']}"
+    preliminary = build_fast_report(user_query, keyword_list, reddit_data,
+                                    search=lambda query, num: stub_search(backends, query, num))
+    preliminary_seconds = time.perf_counter() - started
+
+    report = run_news_analysis(
+        user_query=user_query,
+        keywords=keyword_list[:5],
+        reddit_data=reddit_data,
+        resume=False,
+        on_task_outputs=lambda outputs: merge_task_outputs(preliminary, user_query, outputs),
+    )
+    return {"ok": report is not None, "preliminary": preliminary_seconds}
+
+
+def manual_flow(backends: dict, query_index: int) -> dict:
+    """The manual-query flow of streamlit.manual_analysis."""
+    topic = " ".join(VOCABULARY[query_index % 20:query_index % 20 + 3])
+    report = run_news_analysis(
+        user_query=f"Load test query {query_index}: {topic}",
+        urls=[f"https://news{i}.example.com/{query_index}/story" for i in range(2)],
+        hashtags=HASHTAGS[:2],
+        keywords=topic.split(),
+        resume=False,
+    )
+    return {"ok": report is not None}
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (the peak so far where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LoadTest:
+    """
+    Closed-loop load generator: each simulated user runs analyses back to back.
+
+    Every analysis picks the Reddit flow with probability reddit_share, otherwise the manual flow.
+    Queries are unique unless distinct_queries is set, in which case they are drawn from that many
+    topics and concurrent identical analyses coalesce as they do in the app.
+    """
+
+    def __init__(self, backends: dict, comments: int = 500, reddit_share: float = 0.5,
+                 distinct_queries: int = 0, seed: int = 0):
+        self.backends = backends
+        self.thread = synthetic_thread(comments, seed)
+        self.reddit_share = reddit_share
+        self.distinct_queries = distinct_queries
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_query = 0
+
+    def _pick(self) -> tuple:
+        with self._lock:
+            self._next_query += 1
+            index = self._random.randrange(self.distinct_queries) if self.distinct_queries else self._next_query
+            return self._random.random() < self.reddit_share, index
+
+    def analyze_once(self) -> dict:
+        reddit, index = self._pick()
+        started = time.perf_counter()
+        try:
+            sample = reddit_flow(self.backends, self.thread, index) if reddit else manual_flow(self.backends, index)
+        except Exception as e:
+            logger.debug("Analysis failed: %s", e, exc_info=True)
+            sample = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        sample.setdefault("error", None if sample["ok"] else "no report")
+        sample["flow"] = "reddit" if reddit else "manual"
+        sample["latency"] = time.perf_counter() - started
+        return sample
+
+    def run_level(self, users: int, duration: float) -> dict:
+        """
+        Run users simulated users for duration seconds; analyses in flight at the end are awaited.
+
+        Returns:
+            dict: The level's statistics (see summarize)
+        """
+        samples, lock = [], threading.Lock()
+        stop_at = time.monotonic() + duration
+        stop_sampling = threading.Event()
+        baseline = current_rss()
+        peak = {"rss": baseline, "threads": threading.active_count()}
+
+        def sample_memory():
+            while not stop_sampling.wait(RSS_SAMPLE_INTERVAL):
+                peak["rss"] = max(peak["rss"], current_rss())
+                peak["threads"] = max(peak["threads"], threading.active_count())
+
+        def user():
+            while time.monotonic() < stop_at:
+                sample = self.analyze_once()
+                with lock:
+                    samples.append(sample)
+
+        sampler = threading.Thread(target=sample_memory, name="loadtest-memory", daemon=True)
+        sampler.start()
+        started = time.perf_counter()
+        workers = [threading.Thread(target=user, name=f"loadtest-user-{i}", daemon=True) for i in range(users)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        stop_sampling.set()
+        sampler.join()
+        return summarize(users, samples, elapsed, baseline, peak)
+
+
+def summarize(users: int, samples: list, elapsed: float, baseline_rss: int, peak: dict) -> dict:
+    """Throughput, latency percentiles, error rate and memory of one concurrency level."""
+    done = [s for s in samples if s["ok"]]
+    latencies = np.array([s["latency"] for s in done]) if done else np.array([np.nan])
+    preliminary = [s["preliminary"] for s in samples if s.get("preliminary") is not None]
+    return {
+        "users": users,
+        "analyses": len(samples),
+        "completed": len(done),
+        "error_rate": round(1 - len(done) / len(samples), 3) if samples else 0.0,
+        "errors": dict(Counter(s["error"] for s in samples if not s["ok"]).most_common(3)),
+        "throughput_per_min": round(len(done) / elapsed * 60, 2),
+        "latency": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(latencies, PERCENTILES))},
+        "preliminary_p50": round(float(np.median(preliminary)), 2) if preliminary else None,
+        "elapsed": round(elapsed, 1),
+        "peak_rss_mb": round(peak["rss"] / 2**20, 1),
+        "mb_per_user": round(max(peak["rss"] - baseline_rss, 0) / 2**20 / users, 2),
+        "peak_threads": peak["threads"],
+    }
+
+
+def find_saturation(levels: list) -> dict:
+    """
+    The first level at which throughput stops scaling, latency collapses or errors climb.
+
+    Returns:
+        dict: users and reason for the saturated level plus the last sustainable level's users,
+        or None when no level saturated
+    """
+    if not levels:
+        return None
+    base_p95 = levels[0]["latency"]["p95"]
+    best = levels[0]["throughput_per_min"]
+    for previous, level in zip(levels, levels[1:]):
+        reasons = []
+        if level["throughput_per_min"] < best * (1 + MIN_THROUGHPUT_GAIN):
+            reasons.append(f"throughput {level['throughput_per_min']:.1f}/min vs best {best:.1f}/min")
+        if not math.isnan(base_p95) and level["latency"]["p95"] > base_p95 * MAX_LATENCY_FACTOR:
+            reasons.append(f"p95 {level['latency']['p95']:.1f}s > {MAX_LATENCY_FACTOR:g}x the single-user p95")
+        if level["error_rate"] > MAX_ERROR_RATE:
+            reasons.append(f"error rate {level['error_rate'] * 100:.0f}%")
+        if reasons:
+            return {"users": level["users"], "sustainable_users": previous["users"], "reason": "; ".join(reasons)}
+        best = max(best, level["throughput_per_min"])
+    return None
+
+
+def run_load_test(levels: list = None, duration: float = 60.0, backends: dict = None, llm_calls: int = 2,
+                  comments: int = 500, reddit_share: float = 0.5, distinct_queries: int = 0,
+                  stop_at_saturation: bool = False, seed: int = 0, on_level=None) -> dict:
+    """
+    Ramp concurrency through levels and measure each one.
+
+    A warm-up analysis runs first so one-time loading is not charged to the first level.
+
+    Args:
+        levels (list): Concurrent simulated users per level
+        duration (float): Seconds new analyses are started at each level
+        backends (dict): "llm", "search" and "reddit" StubBackends
+        llm_calls (int): Stub LLM calls per crew task
+        comments (int): Comments in each synthetic Reddit thread
+        reddit_share (float): Share of analyses using the Reddit-URL flow
+        distinct_queries (int): Number of distinct queries to draw from (0 for all unique)
+        stop_at_saturation (bool): Stop ramping at the first saturated level
+        seed (int): Seed for the synthetic data and query mix
+        on_level: Optional callable(level statistics), called after each level
+
+    Returns:
+        dict: "levels" (statistics per level), "saturation" (see find_saturation) and "backends"
+        (calls and injected failures per backend)
+    """
+    levels = levels or LEVELS
+    load = LoadTest(backends, comments, reddit_share, distinct_queries, seed)
+    results = []
+    with stub_backends(backends, llm_calls):
+        load.analyze_once()
+        for users in levels:
+            results.append(load.run_level(users, duration))
+            if on_level:
+                on_level(results[-1])
+            if stop_at_saturation and find_saturation(results):
+                break
+    return {
+        "levels": results,
+        "saturation": find_saturation(results),
+        "backends": {name: {"calls": b.calls, "failures": b.failures} for name, b in backends.items()},
+    }
+
+
+def print_level(level: dict) -> None:
+    latency = level["latency"]
+    preliminary = f"{level['preliminary_p50']:.1f}" if level["preliminary_p50"] is not None else "-"
+    print(f"  {level['users']:>5} {level['completed']:>6} {level['error_rate'] * 100:>6.1f}% "
+          f"{level['throughput_per_min']:>8.1f} {latency['p50']:>7.1f} {latency['p95']:>7.1f} {latency['p99']:>7.1f} "
+          f"{preliminary:>7} {level['peak_rss_mb']:>8.0f} {level['mb_per_user']:>7.1f} {level['peak_threads']:>7}")
+    for error, count in level["errors"].items():
+        print(f"        {count} x {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test of the analysis flows against stub LLM, search and Reddit backends (no external services)."
+    )
+    parser.add_argument("--levels", default=",".join(map(str, LEVELS)), help="Comma-separated concurrent users per level")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds new analyses are started at each level")
+    parser.add_argument("--reddit-share", type=float, default=0.5, help="Share of analyses using the Reddit-URL flow")
+    parser.add_argument("--comments", type=int, default=500, help="Comments in each synthetic Reddit thread")
+    parser.add_argument("--distinct-queries", type=int, default=0,
+                        help="Draw queries from this many topics so identical analyses coalesce (0: all unique)")
+    parser.add_argument("--llm-calls", type=int, default=2, help="Stub LLM calls per crew task")
+    for name, latency, errors in (("llm", 1.5, 0.0), ("search", 0.6, 0.0), ("reddit", 0.8, 0.0)):
+        parser.add_argument(f"--{name}-latency", type=float, default=latency, help=f"Median {name} latency in seconds")
+        parser.add_argument(f"--{name}-sigma", type=float, default=0.5, help=f"Log-normal spread of the {name} latency")
+        parser.add_argument(f"--{name}-errors", type=float, default=errors, help=f"Share of {name} calls that fail")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Multiply every stub latency (0.1 runs ten times faster but overweights local work)")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="Route stub calls through the real per-provider rate limiters")
+    parser.add_argument("--stop-at-saturation", action="store_true", help="Stop ramping at the first saturated level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # Keep the run's archive, checkpoints and caches out of the real db/ directory
+    os.environ["VERIFAI_DB_DIR"] = tempfile.mkdtemp(prefix="verifai-loadtest-")
+    os.environ.setdefault("GEMINI_API_KEY", "stub-key-for-load-testing")
+    # Streamlit calls outside `streamlit run` warn about the missing script context on every call
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    providers = {"llm": "gemini", "search": "serper", "reddit": "reddit"}
+    backends = {
+        name: StubBackend(name, getattr(args, f"{name}_latency"), getattr(args, f"{name}_sigma"),
+                          getattr(args, f"{name}_errors"), args.time_scale,
+                          provider=providers[name] if args.rate_limits else None, seed=args.seed + i)
+        for i, name in enumerate(providers)
+    }
+    levels = [int(n) for n in args.levels.split(",") if n.strip()]
+
+    print(f"Ramping {levels} users, {args.duration:.0f}s per level, {args.reddit_share * 100:.0f}% Reddit flow "
+          f"(data in {os.environ['VERIFAI_DB_DIR']}):")
+    print(f"  {'users':>5} {'done':>6} {'errors':>7} {'per min':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+          f"{'prelim':>7} {'RSS MB':>8} {'MB/user':>7} {'threads':>7}")
+    results = run_load_test(levels, args.duration, backends, args.llm_calls, args.comments, args.reddit_share,
+                            args.distinct_queries, args.stop_at_saturation, args.seed, on_level=print_level)
+
+    saturation = results["saturation"]
+    if saturation:
+        print(f"Saturated at {saturation['users']} users ({saturation['reason']}); "
+              f"sustainable up to {saturation['sustainable_users']}.")
+    else:
+        print(f"No saturation up to {results['levels'][-1]['users']} users; add higher levels.")
+    print("Backend calls: " + ", ".join(f"{name} {b['calls']} ({b['failures']} failed)" for name, b in results["backends"].items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MODEL_TIERS = {
+    "fast": "gemini/gemini-2.5-flash-lite",
+    "strong": "gemini/gemini-2.5-flash",
+    # Stand-in for tests and offline development; served by a local Ollama
+    "local": "ollama/llama3.2",
+}
+# Tier of the model each task's agent uses (task names as in deadlines.TASK_NAMES)
+TASK_TIERS = {
+    "crawler": "fast",
+    "content": "fast",
+    "social": "fast",
+    "organizer": "fast",
+    "reliability": "fast",
+    "compiler": "strong",
+}
+DEFAULT_TIER = "fast"
+# USD per million prompt and completion tokens, for the per-report cost estimate
+MODEL_PRICES = {
+    "gemini/gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini/gemini-2.5-flash": (0.30, 2.50),
+}
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+
+def tier_for(task_name: str = None) -> str:
+    """The model tier of a task's agent; VERIFAI_MODEL_TIER forces one tier for every task."""
+    tier = os.getenv("VERIFAI_MODEL_TIER") or TASK_TIERS.get(task_name, DEFAULT_TIER)
+    if tier not in MODEL_TIERS:
+        raise ValueError(f"Unknown model tier '{tier}'; expected one of {', '.join(MODEL_TIERS)}")
+    return tier
+
+
+def model_for(task_name: str = None) -> str:
+    """
+    The LiteLLM model name for a task's agent.
+
+    VERIFAI_MODEL_<TIER> (e.g. VERIFAI_MODEL_STRONG) replaces a tier's default model.
+    """
+    tier = tier_for(task_name)
+    return os.getenv(f"VERIFAI_MODEL_{tier.upper()}") or MODEL_TIERS[tier]
+
+
+def provider_of(model: str) -> str:
+    """The provider prefix of a LiteLLM model name ("gemini/..." -> "gemini")."""
+    return model.split("/", 1)[0] if "/" in model else ""
+
+
+def uses_gemini() -> bool:
+    """Whether any task is routed to a Gemini model (and so needs GEMINI_API_KEY)."""
+    return any(provider_of(model_for(name)) == "gemini" for name in TASK_TIERS)
+
+
+def model_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of tokens on a model; 0 for local and unpriced models."""
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field, ConfigDict, model_serializer
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, model_serializer
+from pydantic_core import from_json
 from typing import List, Dict, Any
 from datetime import datetime
 import json
@@ -10,13 +11,15 @@ class SourceReliability(BaseModel):
     engagement: int = 0
 
 class SocialMediaMetrics(BaseModel):
-    hashtag: str = ""
+    hashtag: str = ""  # Also @mentions and $cashtags when measured locally
+    count: int = 0  # Occurrences in the analyzed text
     engagement_rate: float = 0.0  # Percentage
     reach: int = 0
     sentiment: str = "Neutral"  # Positive, Negative, Neutral
 
 class ContentAnalysisMetrics(BaseModel):
-    language_percentage: float = 0.0
+    language_percentage: float = 0.0  # Share of the text in the dominant language
+    dominant_language: str = ""
     coordination_percentage: float = 0.0
     source_percentage: float = 0.0
     bot_like_activity_percentage: float = 0.0
@@ -25,6 +28,23 @@ class TimeSeriesData(BaseModel):
     date: str = ""
     count: int = 0
 
+class ThreadAnalytics(BaseModel):
+    comment_count: int = 0
+    author_count: int = 0
+    score_mean: float = 0.0
+    score_percentiles: Dict[str, float] = Field(default_factory=dict)  # "p10" ... "p99" -> comment score
+    score_histogram: Dict[str, int] = Field(default_factory=dict)  # Score range -> number of comments
+    depth_histogram: List[int] = Field(default_factory=list)  # Comments at each reply depth (0 = top level)
+    mean_depth: float = 0.0
+    reply_velocity: List[TimeSeriesData] = Field(default_factory=list)  # Comments per hour (or day)
+    half_life_hours: float = 0.0  # Hours from the post until half of the comments were written
+    peak_comments_per_minute: int = 0
+    median_reply_delay_minutes: float = 0.0  # Time from the parent post/comment to each reply
+    author_gini: float = 0.0  # 0 = comments evenly spread over authors, 1 = one author wrote them all
+    top_author_share: Dict[str, float] = Field(default_factory=dict)  # "top 1", "top 10", "top 1%" -> % of comments
+    edited_percentage: float = 0.0
+    deleted_percentage: float = 0.0
+
 class PropagandaTechnique(BaseModel):
     technique_name: str = ""  # e.g., "Appeal to fear", "False equivalence", "Strawman"
     frequency: int = 0  # How many instances detected
@@ -36,18 +56,18 @@ class MisinformationIndicator(BaseModel):
     indicator_type: str = ""  # e.g., "Factual error", "Missing context", "Manipulated content"
     confidence: float = 0.0  # 0-1 scale of confidence in detection
     correction: str = ""  # The factual correction or missing context
-    source_verification: List[str] = []  # Sources that verify/contradict
+    source_verification: List[str] = Field(default_factory=list)  # Sources that verify/contradict
 
 class CoordinationPattern(BaseModel):
     pattern_type: str = ""  # e.g., "Identical phrasing", "Synchronized publishing", "Cross-platform amplification"
     strength: float = 0.0  # 0-1 scale of coordination strength
-    entities_involved: List[str] = []  # Websites, accounts, networks involved
+    entities_involved: List[str] = Field(default_factory=list)  # Websites, accounts, networks involved
     timeline: str = ""  # Brief description of coordination timeline
 
 class BotActivityMetrics(BaseModel):
     bot_likelihood_score: float = 0.0  # 0-1 scale 
     account_creation_patterns: str = ""  # Description of suspicious patterns
-    behavioral_indicators: List[str] = []  # List of indicators suggesting bot activity
+    behavioral_indicators: List[str] = Field(default_factory=list)  # List of indicators suggesting bot activity
     network_analysis: str = ""  # Brief description of network behavior
 
 class FakeNewsSite(BaseModel):
@@ -55,21 +75,21 @@ class FakeNewsSite(BaseModel):
     shares: int = 0
     engagement: int = 0
     known_false_stories: int = 0
-    verification_failures: List[str] = []  # List of fact-checking failures
-    deceptive_practices: List[str] = []  # Deceptive practices employed
-    network_connections: List[str] = []  # Connected entities in disinformation network
+    verification_failures: List[str] = Field(default_factory=list)  # List of fact-checking failures
+    deceptive_practices: List[str] = Field(default_factory=list)  # Deceptive practices employed
+    network_connections: List[str] = Field(default_factory=list)  # Connected entities in disinformation network
 
 class EnhancedPropagandaAnalysis(BaseModel):
     overall_reliability_score: float = 0.0  # 0-100 scale
-    propaganda_techniques: List[PropagandaTechnique] = []
-    misinformation_indicators: List[MisinformationIndicator] = []
-    coordination_patterns: List[CoordinationPattern] = []
-    bot_activity_metrics: BotActivityMetrics = BotActivityMetrics()
-    fake_news_sites: List[FakeNewsSite] = []
-    manipulation_timeline: List[Dict[str, Any]] = []  # Timeline of information manipulation
-    narrative_fingerprint: Dict[str, float] = {}  # Distinct narrative patterns and their strength
-    cross_verification_results: Dict[str, Any] = {}  # Results of cross-verification with reliable sources
-    recommended_verification_steps: List[str] = []  # Recommended steps for readers to verify content
+    propaganda_techniques: List[PropagandaTechnique] = Field(default_factory=list)
+    misinformation_indicators: List[MisinformationIndicator] = Field(default_factory=list)
+    coordination_patterns: List[CoordinationPattern] = Field(default_factory=list)
+    bot_activity_metrics: BotActivityMetrics = Field(default_factory=BotActivityMetrics)
+    fake_news_sites: List[FakeNewsSite] = Field(default_factory=list)
+    manipulation_timeline: List[Dict[str, Any]] = Field(default_factory=list)  # Timeline of information manipulation
+    narrative_fingerprint: Dict[str, float] = Field(default_factory=dict)  # Distinct narrative patterns and their strength
+    cross_verification_results: Dict[str, Any] = Field(default_factory=dict)  # Results of cross-verification with reliable sources
+    recommended_verification_steps: List[str] = Field(default_factory=list)  # Recommended steps for readers to verify content
 
 class RelatedArticle(BaseModel):
     title: str = Field(..., description="Title of the related article.")
@@ -90,13 +110,17 @@ class SourceInfo(BaseModel):
 class ContentAnalysis(BaseModel):
     sentiment: str = Field(..., description="Overall sentiment of the content (Positive, Negative, Neutral).")
     bias: str = Field(..., description="Identified bias in the content (e.g., Left-leaning, Right-leaning, Neutral).")
-    readability_score: float = Field(..., description="Readability score of the content.")
-    key_entities: List[str] = Field(default_factory=list, description="Key entities mentioned in the content.")
+    readability_score: float = Field(..., description="Readability score of the content (Flesch Reading Ease, 0-100); replaced by a local measurement when article text is available.")
+    key_entities: List[str] = Field(default_factory=list, description="Key entities mentioned in the content; replaced by gazetteer matches when any are found.")
+    metrics: ContentAnalysisMetrics = Field(default_factory=ContentAnalysisMetrics, description="Measured content metrics; computed locally, leave at defaults.")
 
 class PropagandaAnalysis(BaseModel):
     propaganda_techniques_detected: List[str] = Field(default_factory=list, description="List of propaganda techniques detected.")
     misinformation_indicators_detected: List[str] = Field(default_factory=list, description="List of misinformation indicators detected.")
     overall_risk_score: float = Field(..., description="Overall risk score for propaganda/misinformation (0-100).")
+    coordination_patterns: List[CoordinationPattern] = Field(default_factory=list, description="Coordinated posting patterns; measured locally from near-duplicate text, leave empty.")
+    bot_activity_metrics: BotActivityMetrics = Field(default_factory=BotActivityMetrics, description="Bot activity among commenters; measured locally from account data, leave at defaults.")
+    manipulation_timeline: List[Dict[str, Any]] = Field(default_factory=list, description="How the link spread across subreddits over time; measured locally from Reddit data, leave empty.")
 
 class NewsAnalysisReport(BaseModel):
     query_summary: str = Field(..., description="A concise summary of the news analysis query.")
@@ -112,11 +136,113 @@ class NewsAnalysisReport(BaseModel):
     propaganda_analysis: PropagandaAnalysis = Field(..., description="Analysis of propaganda techniques and misinformation indicators.")
     platform_facts: List[str] = Field(default_factory=list, description="Facts and observations related to the platform where the news was found.")
     cross_source_facts: List[str] = Field(default_factory=list, description="Facts cross-verified across multiple sources.")
+    hashtag_metrics: List[SocialMediaMetrics] = Field(default_factory=list, description="Hashtag, mention and cashtag counts; measured locally from the scraped text, leave empty.")
+    thread_analytics: ThreadAnalytics = Field(default_factory=ThreadAnalytics, description="Reddit thread statistics; computed locally, leave at defaults.")
     analysis_note: str = Field(default="No specific notes.", description="Any additional notes or disclaimers about the analysis.")
 
-    def to_json(self):
-        return self.model_dump_json(indent=2)
+    def to_json(self, indent: int = 2):
+        """Readable JSON for display and downloads; storage uses report_to_json instead."""
+        self.materialize()
+        return self.model_dump_json(indent=indent)
+
+    def materialize(self) -> "NewsAnalysisReport":
+        """Validate any lazily loaded lists now (see report_from_json)."""
+        for name in LAZY_FIELDS:
+            value = self.__dict__.get(name)
+            if isinstance(value, LazyModelList):
+                value.materialize()
+        return self
+
+    def model_dump(self, **kwargs):
+        self.materialize()
+        return super().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs):
+        self.materialize()
+        return super().model_dump_json(**kwargs)
 
     model_config = ConfigDict(
         arbitrary_types_allowed=True,
-    )
\ No newline at end of file
+    )
+
+
+class LazyModelList(list):
+    """
+    A list of raw dicts that are validated into models on first access.
+
+    len() and truthiness do not trigger validation, so loading a report only to count or list its
+    articles skips the per-item work. Any other access validates every item once, through a
+    prebuilt TypeAdapter, and replaces the raw dicts in place.
+    """
+
+    def __init__(self, items: list, adapter: TypeAdapter):
+        super().__init__(items)
+        self._adapter = adapter
+        self._validated = False
+
+    def materialize(self) -> None:
+        if not self._validated:
+            list.__setitem__(self, slice(None), self._adapter.validate_python(list(list.__iter__(self))))
+            self._validated = True
+
+    def __reduce_ex__(self, protocol):
+        self.materialize()
+        return list, (list(list.__iter__(self)),)
+
+
+def _materializing(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        self.materialize()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ("__getitem__", "__iter__", "__reversed__", "__contains__", "__eq__", "__ne__", "__repr__",
+              "__add__", "__iadd__", "__mul__", "__setitem__", "__delitem__", "append", "extend", "insert",
+              "remove", "pop", "index", "count", "sort", "reverse", "copy"):
+    setattr(LazyModelList, _name, _materializing(_name))
+
+
+# Prebuilt validators/serializers, created once at import instead of per call
+REPORT_ADAPTER = TypeAdapter(NewsAnalysisReport)
+ARTICLES_ADAPTER = TypeAdapter(List[RelatedArticle])
+TIME_SERIES_ADAPTER = TypeAdapter(List[TimeSeriesData])
+LAZY_FIELDS = {
+    "related_articles": ARTICLES_ADAPTER,
+    "similar_posts_time_series": TIME_SERIES_ADAPTER,
+}
+
+
+def report_to_json(report: NewsAnalysisReport) -> bytes:
+    """Compact (non-indented) UTF-8 JSON for storage."""
+    report.materialize()
+    return REPORT_ADAPTER.dump_json(report)
+
+
+def report_from_json(payload, lazy: bool = False) -> NewsAnalysisReport:
+    """
+    Parse and validate a report from JSON (str or bytes).
+
+    Args:
+        payload: JSON produced by report_to_json or an LLM
+        lazy (bool): Defer validation of the large lists (articles, time series) until they are
+            used; meant for reloading reports that were validated when they were stored
+
+    Returns:
+        NewsAnalysisReport
+    """
+    if not lazy:
+        return REPORT_ADAPTER.validate_json(payload)
+    data = from_json(payload)
+    given = {name for name in LAZY_FIELDS if name in data}
+    raw = {name: data.pop(name, None) or [] for name in LAZY_FIELDS}
+    report = REPORT_ADAPTER.validate_python(data)
+    for name, items in raw.items():
+        report.__dict__[name] = LazyModelList(items, LAZY_FIELDS[name])
+    # Set behind pydantic's back, so mark them set as eager validation would (exclude_unset keeps them)
+    report.__pydantic_fields_set__ |= given
+    return report
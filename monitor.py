@@ -0,0 +1,295 @@
+import argparse
+import logging
+import queue
+import threading
+import time
+from collections import Counter, deque
+
+from prawcore.exceptions import PrawcoreException
+
+from app import run_news_analysis
+from reddit import get_reddit_client, keyword_tokens
+from setup import setup_api_keys
+
+logger = logging.getLogger(__name__)
+
+# Wait between polls while every stream is idle, doubling up to the maximum (PRAW's own stream range)
+IDLE_MIN_DELAY = 1.0
+IDLE_MAX_DELAY = 16.0
+
+
+class SlidingWindowCounter:
+    """
+    Term counts over a sliding time window, kept as a ring of per-bucket Counters.
+
+    The window total is updated incrementally: items add to the newest bucket and the total,
+    and expired buckets are subtracted when they fall out. Each bucket keeps at most
+    max_terms_per_bucket terms (the rest are dropped when the bucket closes), so memory is
+    bounded by buckets * max_terms_per_bucket no matter how much text streams through.
+    """
+
+    def __init__(self, window_seconds: int, bucket_seconds: int = 60, max_terms_per_bucket: int = 5000):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = max(1, window_seconds // bucket_seconds)
+        self.max_terms_per_bucket = max_terms_per_bucket
+        self._buckets = deque()  # (bucket start, Counter)
+        self._total = Counter()
+
+    @property
+    def window_seconds(self) -> int:
+        return self.num_buckets * self.bucket_seconds
+
+    def _advance(self, now: float) -> Counter:
+        start = int(now // self.bucket_seconds) * self.bucket_seconds
+        if not self._buckets or self._buckets[-1][0] < start:
+            if self._buckets:
+                self._trim(self._buckets[-1][1])
+            self._buckets.append((start, Counter()))
+        oldest_allowed = start - (self.num_buckets - 1) * self.bucket_seconds
+        while self._buckets and self._buckets[0][0] < oldest_allowed:
+            _, expired = self._buckets.popleft()
+            self._total.subtract(expired)
+            for term in [t for t in expired if self._total[t] <= 0]:
+                del self._total[term]
+        return self._buckets[-1][1]
+
+    def _trim(self, bucket: Counter) -> None:
+        if len(bucket) <= self.max_terms_per_bucket:
+            return
+        for term, count in bucket.most_common()[self.max_terms_per_bucket:]:
+            del bucket[term]
+            self._total[term] -= count
+            if self._total[term] <= 0:
+                del self._total[term]
+
+    def add(self, terms, now: float = None) -> None:
+        bucket = self._advance(now if now is not None else time.time())
+        bucket.update(terms)
+        self._total.update(terms)
+
+    def count(self, term: str, now: float = None) -> int:
+        self._advance(now if now is not None else time.time())
+        return self._total.get(term, 0)
+
+    def most_common(self, n: int = 10, now: float = None) -> list:
+        self._advance(now if now is not None else time.time())
+        return self._total.most_common(n)
+
+
+class SpikeDetector:
+    """
+    Flags terms whose rate in a short window jumps well above their rate in a long baseline window.
+
+    A term spikes when it appears in at least min_count items in the short window and its
+    short-window rate is ratio times its baseline rate (with a floor so brand-new terms can spike).
+    The baseline rate is taken over the time actually observed, and nothing is reported during
+    the warm-up period, so starting the monitor does not flag every term at once.
+    """
+
+    def __init__(self, short_window: int = 300, long_window: int = 7200, bucket_seconds: int = 60,
+                 ratio: float = 4.0, min_count: int = 15, baseline_floor: float = 1.0,
+                 cooldown_seconds: int = 3600, max_terms_per_bucket: int = 5000, warmup_seconds: int = None):
+        self.short = SlidingWindowCounter(short_window, bucket_seconds, max_terms_per_bucket)
+        self.long = SlidingWindowCounter(long_window, bucket_seconds, max_terms_per_bucket)
+        self.ratio = ratio
+        self.min_count = min_count
+        self.baseline_floor = baseline_floor
+        self.cooldown_seconds = cooldown_seconds
+        self.warmup_seconds = warmup_seconds if warmup_seconds is not None else 3 * short_window
+        self._started = None
+        self._last_triggered = {}
+
+    def observe(self, text: str, now: float = None) -> list:
+        """
+        Count the distinct keywords of one submission or comment and return terms that just spiked.
+
+        Args:
+            text (str): The item text
+            now (float): Timestamp of the item (defaults to the current time)
+
+        Returns:
+            list: (term, short-window count, baseline count scaled to the short window) tuples
+        """
+        now = now if now is not None else time.time()
+        terms = set(keyword_tokens(text))
+        if not terms:
+            return []
+        self.short.add(terms, now)
+        self.long.add(terms, now)
+
+        if self._started is None:
+            self._started = now
+        observed = now - self._started
+        if observed < self.warmup_seconds:
+            return []
+        scale = self.short.window_seconds / min(self.long.window_seconds, max(observed, self.short.window_seconds))
+        spikes = []
+        for term in terms:
+            current = self.short.count(term, now)
+            if current < self.min_count:
+                continue
+            expected = max(self.long.count(term, now) * scale, self.baseline_floor)
+            if current / expected < self.ratio:
+                continue
+            if now - self._last_triggered.get(term, float("-inf")) < self.cooldown_seconds:
+                continue
+            self._last_triggered[term] = now
+            spikes.append((term, current, expected))
+
+        # Forget cooldowns that have expired so the map stays small
+        if len(self._last_triggered) > 10000:
+            self._last_triggered = {t: ts for t, ts in self._last_triggered.items() if now - ts < self.cooldown_seconds}
+        return spikes
+
+
+class AnalysisDispatcher:
+    """
+    Runs spike-triggered analyses on a bounded queue with a fixed number of workers.
+
+    The queue is the backpressure point: when it is full, new spikes are dropped (and logged)
+    instead of piling up, and at most max_in_flight analyses run at once.
+    """
+
+    def __init__(self, analyze=run_news_analysis, max_in_flight: int = 2, max_queue: int = 10):
+        self.analyze = analyze
+        self.max_in_flight = max_in_flight
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"analysis-worker-{i}", daemon=True)
+            for i in range(max_in_flight)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, term: str, context_terms: list) -> bool:
+        """Queue an analysis for term. Returns False if it is already pending or the queue is full."""
+        with self._lock:
+            if term in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((term, context_terms))
+            except queue.Full:
+                logger.warning("Analysis queue full, dropping spike for '%s'", term)
+                return False
+            self._pending.add(term)
+        logger.info("Queued analysis for spiking term '%s' (%d waiting)", term, self._queue.qsize())
+        return True
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                term, context_terms = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                logger.info("Running analysis for spiking term '%s'", term)
+                report = self.analyze(
+                    user_query=f"News analysis for: {term}",
+                    keywords=[term] + [t for t in context_terms if t != term][:4],
+                )
+                logger.info("Analysis for '%s' %s", term, "completed" if report else "returned no report")
+            except Exception as e:
+                logger.error("Analysis for '%s' failed: %s", term, e)
+            finally:
+                with self._lock:
+                    self._pending.discard(term)
+                self._queue.task_done()
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+
+def monitor(subreddits: list, detector: SpikeDetector = None, dispatcher: AnalysisDispatcher = None,
+            include_comments: bool = True, stop_event: threading.Event = None) -> None:
+    """
+    Stream new submissions (and comments) from subreddits and dispatch analyses on keyword spikes.
+
+    Args:
+        subreddits (list): Subreddit names to watch
+        detector (SpikeDetector): Spike detector (defaults to SpikeDetector())
+        dispatcher (AnalysisDispatcher): Where spikes are sent (defaults to AnalysisDispatcher())
+        include_comments (bool): Also count comment text, not only submission titles and bodies
+        stop_event (threading.Event): Set it to end the loop
+    """
+    detector = detector or SpikeDetector()
+    dispatcher = dispatcher or AnalysisDispatcher()
+    stop_event = stop_event or threading.Event()
+
+    subreddit = get_reddit_client().subreddit("+".join(subreddits))
+
+    def open_stream(kind: str):
+        # pause_after=-1 makes each stream yield None when it has nothing new, so one loop can serve both
+        return getattr(subreddit.stream, kind)(pause_after=-1, skip_existing=True)
+
+    kinds = ["submissions", "comments"] if include_comments else ["submissions"]
+    streams = [open_stream(kind) for kind in kinds]
+    logger.info("Monitoring r/%s", "+".join(subreddits))
+
+    delay = IDLE_MIN_DELAY
+    try:
+        while not stop_event.is_set():
+            seen_items = False
+            for i, kind in enumerate(kinds):
+                try:
+                    for item in streams[i]:
+                        if item is None or stop_event.is_set():
+                            break
+                        seen_items = True
+                        text = f"{item.title} {item.selftext}" if hasattr(item, "title") else item.body
+                        for term, current, expected in detector.observe(text, item.created_utc):
+                            logger.info("Spike: '%s' seen %d times in window (baseline %.1f)", term, current, expected)
+                            context = [t for t, _ in detector.short.most_common(10, item.created_utc)]
+                            dispatcher.submit(term, context)
+                except PrawcoreException as e:
+                    # A generator that raised is finished, so the stream is reopened
+                    logger.warning("Reddit %s stream failed (%s); reopening it", kind, e)
+                    streams[i] = open_stream(kind)
+            if seen_items:
+                delay = IDLE_MIN_DELAY
+            else:
+                # PRAW does not back off with pause_after=-1; without this wait an idle monitor
+                # re-polls at once and spends the Reddit quota interactive analyses need
+                stop_event.wait(delay)
+                delay = min(delay * 2, IDLE_MAX_DELAY)
+    finally:
+        # Wait for running analyses on a normal stop only, not on Ctrl+C or an unexpected error
+        dispatcher.stop(wait=stop_event.is_set())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch subreddits and analyze news terms when they spike.")
+    parser.add_argument("--subreddits", default="news,worldnews,politics", help="Comma-separated subreddit names")
+    parser.add_argument("--short-window", type=int, default=300, help="Spike window in seconds")
+    parser.add_argument("--long-window", type=int, default=7200, help="Baseline window in seconds")
+    parser.add_argument("--ratio", type=float, default=4.0, help="Short/baseline rate ratio that counts as a spike")
+    parser.add_argument("--min-count", type=int, default=15, help="Minimum mentions in the short window")
+    parser.add_argument("--cooldown", type=int, default=3600, help="Seconds before the same term can trigger again")
+    parser.add_argument("--max-in-flight", type=int, default=2, help="Maximum concurrent analyses")
+    parser.add_argument("--max-queue", type=int, default=10, help="Maximum queued analyses before spikes are dropped")
+    parser.add_argument("--no-comments", action="store_true", help="Only watch submissions")
+    args = parser.parse_args()
+
+    if not setup_api_keys():
+        print("Invalid API keys. Exiting.")
+        return
+
+    detector = SpikeDetector(args.short_window, args.long_window, ratio=args.ratio,
+                             min_count=args.min_count, cooldown_seconds=args.cooldown)
+    dispatcher = AnalysisDispatcher(max_in_flight=args.max_in_flight, max_queue=args.max_queue)
+    stop_event = threading.Event()
+    try:
+        monitor([s.strip() for s in args.subreddits.split(",") if s.strip()], detector, dispatcher,
+                include_comments=not args.no_comments, stop_event=stop_event)
+    except KeyboardInterrupt:
+        print("Stopping monitor...")
+        stop_event.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+from canonical import canonicalize_url
+from rate_limit import get_limiter
+from shared_state import process_singleton
+
+logger = logging.getLogger(__name__)
+
+# Responses larger than this are decoded in a worker thread so the event loop keeps serving other requests
+LARGE_PAYLOAD_BYTES = 256 * 1024
+
+# Each endpoint is used only when its key_env variable is set. "fields" maps our article fields to
+# dotted paths inside one result item. A custom endpoint can be added with VERIFAI_NEWS_API_URL
+# (plus VERIFAI_NEWS_API_KEY), which must accept ?q= and return {"articles": [...]}.
+NEWS_API_ENDPOINTS = {
+    "newsapi": {
+        "url": "https://newsapi.org/v2/everything",
+        "key_env": "NEWSAPI_KEY",
+        "key_header": "X-Api-Key",
+        "params": {"sortBy": "publishedAt", "language": "en", "pageSize": 20},
+        "results": "articles",
+        "fields": {"title": "title", "url": "url", "source": "source.name", "published_date": "publishedAt",
+                   "description": "description"},
+    },
+    "gnews": {
+        "url": "https://gnews.io/api/v4/search",
+        "key_env": "GNEWS_API_KEY",
+        "key_param": "apikey",
+        "params": {"lang": "en", "max": 20},
+        "results": "articles",
+        "fields": {"title": "title", "url": "url", "source": "source.name", "published_date": "publishedAt",
+                   "description": "description"},
+    },
+}
+
+
+def configured_endpoints() -> dict:
+    """Endpoints from NEWS_API_ENDPOINTS whose API key is set, plus the custom VERIFAI_NEWS_API_URL one."""
+    endpoints = {name: config for name, config in NEWS_API_ENDPOINTS.items() if os.getenv(config["key_env"])}
+    custom_url = os.getenv("VERIFAI_NEWS_API_URL")
+    if custom_url:
+        endpoints["custom"] = {
+            "url": custom_url,
+            "key_env": "VERIFAI_NEWS_API_KEY",
+            "key_header": "Authorization",
+            "key_prefix": "Bearer ",
+            "params": {},
+            "results": "articles",
+            "fields": {"title": "title", "url": "url", "source": "source", "published_date": "published_date",
+                       "description": "description"},
+        }
+    return endpoints
+
+
+def _dig(item, path: str):
+    for part in path.split("."):
+        if not isinstance(item, dict):
+            return None
+        item = item.get(part)
+    return item
+
+
+class TTLCache:
+    """Small LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, ttl: float = 900, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class NewsAPIClient:
+    """
+    Async client for structured news search APIs with one pooled HTTP session.
+
+    The session, with its connection pool and DNS cache, lives on a private event loop thread, so
+    synchronous callers such as crewai tools reuse the same connections. Queries fan out over
+    every configured endpoint with at most max_concurrency requests in flight, responses are
+    cached per (endpoint, query), and requests go through the shared "news_api" rate limiter, whose
+    bucket, concurrency and retry waits are awaited on the loop rather than run in its executor.
+    """
+
+    def __init__(self, endpoints: dict = None, max_concurrency: int = 8, timeout: float = 15,
+                 cache_ttl: float = 900):
+        self._endpoints = endpoints
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache = TTLCache(cache_ttl)
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    @property
+    def endpoints(self) -> dict:
+        return self._endpoints if self._endpoints is not None else configured_endpoints()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="news-api-loop", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _decode(self, body: bytes):
+        if len(body) > LARGE_PAYLOAD_BYTES:
+            return await asyncio.get_running_loop().run_in_executor(None, json.loads, body)
+        return json.loads(body)
+
+    async def _request(self, name: str, config: dict, query: str) -> list:
+        cached = self.cache.get((name, query))
+        if cached is not None:
+            return cached
+
+        session = await self._get_session()
+        params = {**config.get("params", {}), "q": query}
+        headers = {}
+        key = os.getenv(config["key_env"], "")
+        if config.get("key_param"):
+            params[config["key_param"]] = key
+        elif config.get("key_header") and key:
+            headers[config["key_header"]] = config.get("key_prefix", "") + key
+
+        async def fetch():
+            async with self._semaphore:
+                async with session.get(config["url"], params=params, headers=headers) as response:
+                    # Error statuses raise ClientResponseError, which the limiter retries on 429/503
+                    response.raise_for_status()
+                    return await self._decode(await response.read())
+
+        data = await get_limiter("news_api").call_async(fetch)
+
+        fields = config["fields"]
+        articles = []
+        for item in _dig(data, config["results"]) or []:
+            article = {field: _dig(item, path) or "" for field, path in fields.items()}
+            if article["url"]:
+                article["endpoint"] = name
+                articles.append(article)
+        self.cache.put((name, query), articles)
+        return articles
+
+    async def search(self, query: str) -> list:
+        """Search one query on every configured endpoint; results are merged by canonical URL."""
+        return (await self.search_many([query]))[query]
+
+    async def search_many(self, queries: list) -> dict:
+        """
+        Search many queries on every configured endpoint concurrently.
+
+        Args:
+            queries (list): Search queries
+
+        Returns:
+            dict: query -> list of article dicts (title, url, source, published_date, description, endpoint)
+        """
+        endpoints = self.endpoints
+        jobs = [(query, name, config) for query in queries for name, config in endpoints.items()]
+        responses = await asyncio.gather(
+            *(self._request(name, config, query) for query, name, config in jobs), return_exceptions=True
+        )
+        results = {query: {} for query in queries}
+        for (query, name, _), response in zip(jobs, responses):
+            if isinstance(response, Exception):
+                logger.warning("News API %s failed for '%s': %s", name, query, response)
+                continue
+            for article in response:
+                results[query].setdefault(canonicalize_url(article["url"]), article)
+        return {query: list(articles.values()) for query, articles in results.items()}
+
+    def search_many_sync(self, queries: list, timeout: float = None) -> dict:
+        """Blocking wrapper around search_many for synchronous callers."""
+        future = asyncio.run_coroutine_threadsafe(self.search_many(queries), self._ensure_loop())
+        return future.result(timeout or self.timeout * (get_limiter("news_api").max_retries + 2))
+
+
+@process_singleton
+def get_news_api_client() -> NewsAPIClient:
+    """Return the process-wide news API client."""
+    return NewsAPIClient()
@@ -0,0 +1,158 @@
+import logging
+import re
+
+from deadlines import TASK_LABELS, TASK_NAMES
+from models import (
+    ContentAnalysis,
+    NewsAnalysisReport,
+    PropagandaAnalysis,
+    RelatedArticle,
+    SourceInfo,
+    TopicCluster,
+)
+from report_store import normalize_domain
+from reputation import get_reputation_index
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_LINE_RE = re.compile(
+    r"Title:\s*(?P<title>.+?)\s*\|\s*Source:\s*(?P<source>.+?)\s*\|\s*URL:\s*(?P<url>\S+?)\s*(?:\||$)(?:\s*Reliability:\s*(?P<reliability>\w+))?",
+    re.IGNORECASE | re.MULTILINE,
+)
+RELIABILITY_TO_SCORE = {"high": 80.0, "medium": 55.0, "low": 25.0}
+NO_FINDINGS = "The analysis did not complete; see the note below for the sections that are missing."
+
+
+def _field(text: str, label: str) -> str:
+    """Value after 'LABEL:' up to the next upper-case label line, or an empty string."""
+    match = re.search(rf"^\s*{label}\s*:\s*(.*?)(?=^\s*[A-Z][A-Z ]+:|\Z)", text, re.MULTILINE | re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+def _items(value: str) -> list:
+    """Split a bracketed or comma/line separated list into clean items."""
+    value = value.strip().strip("[]")
+    parts = re.split(r",|\n", value)
+    return [p.strip().strip("-•*[]\"' ") for p in parts if p.strip().strip("-•*[]\"' ")]
+
+
+def _fill_from_crawler(report: NewsAnalysisReport, text: str) -> None:
+    index = get_reputation_index()
+    sources = {}
+    for match in ARTICLE_LINE_RE.finditer(text):
+        url = match.group("url").strip("[]()<>")
+        domain = normalize_domain(url) or normalize_domain(match.group("source"))
+        report.related_articles.append(RelatedArticle(
+            title=match.group("title").strip("[] "),
+            url=url,
+            source=match.group("source").strip("[] "),
+            published_date="Unknown",
+        ))
+        if domain and domain not in sources:
+            entry = index.lookup(domain)
+            if entry is not None:
+                score = entry.reliability_score
+            else:
+                score = RELIABILITY_TO_SCORE.get((match.group("reliability") or "").lower(), 50.0)
+            sources[domain] = SourceInfo(name=domain, url=f"https://{domain}", reliability_score=score)
+    report.top_sources = list(sources.values())
+    summary = _field(text, "SUMMARY")
+    if summary:
+        report.key_findings = summary
+
+
+def _fill_from_content(report: NewsAnalysisReport, text: str) -> None:
+    keywords = _items(_field(text, "KEYWORDS"))
+    report.related_words = keywords or report.related_words
+    report.topic_clusters = [
+        TopicCluster(cluster_name=theme, keywords=[], article_count=0)
+        for theme in _items(_field(text, "THEMES"))
+    ]
+    conflicts = _field(text, "CONFLICTS")
+    if conflicts and "none" not in conflicts.lower()[:12]:
+        report.cross_source_facts.append(f"Conflicting headlines: {conflicts}")
+    quality = _field(text, "QUALITY")
+    if quality:
+        report.cross_source_facts.append(f"Coverage quality: {quality}")
+
+
+def _fill_from_social(report: NewsAnalysisReport, text: str) -> None:
+    report.top_hashtags = [h if h.startswith("#") else f"#{h}" for h in _items(_field(text, "HASHTAGS"))]
+    sentiment = _field(text, "SENTIMENT")
+    if sentiment:
+        report.content_analysis.sentiment = _items(sentiment)[0] if _items(sentiment) else sentiment
+    for label in ("ENGAGEMENT", "TRENDING"):
+        value = _field(text, label)
+        if value:
+            report.platform_facts.append(f"{label.title()}: {value}")
+
+
+def _fill_from_organizer(report: NewsAnalysisReport, text: str) -> None:
+    low = [d for d in _items(_field(text, "LOW RELIABILITY")) if "none" not in d.lower()]
+    report.fake_news_sites = list(dict.fromkeys(report.fake_news_sites + low))
+    patterns = _field(text, "PATTERNS")
+    if patterns:
+        report.key_findings = f"{report.key_findings} {patterns}".strip()
+
+
+def _fill_from_reliability(report: NewsAnalysisReport, text: str) -> None:
+    match = re.search(r"RELIABILITY SCORE\s*:\s*\[?(\d+(?:\.\d+)?)\s*\]?\s*/\s*10", text, re.IGNORECASE)
+    if match:
+        report.propaganda_analysis.overall_risk_score = round(100.0 - float(match.group(1)) * 10.0, 1)
+    red_flags = _field(text, "RED FLAGS")
+    if red_flags and "none" not in red_flags.lower()[:12]:
+        report.propaganda_analysis.misinformation_indicators_detected = _items(red_flags)
+    steps = _items(_field(text, "VERIFICATION STEPS"))
+    report.cross_source_facts.extend(f"Verification step: {step}" for step in steps)
+
+
+FILLERS = {
+    "crawler": _fill_from_crawler,
+    "content": _fill_from_content,
+    "social": _fill_from_social,
+    "organizer": _fill_from_organizer,
+    "reliability": _fill_from_reliability,
+}
+
+
+def build_partial_report(user_query: str, task_outputs: dict, reason: str) -> NewsAnalysisReport:
+    """
+    Assemble a NewsAnalysisReport from the raw outputs of the tasks that did complete.
+
+    Each task's output is parsed according to the format its task description asks for, so work
+    already done is kept when a later task times out or the compiler's JSON cannot be parsed.
+
+    Args:
+        user_query (str): The analysis query
+        task_outputs (dict): Task name (see deadlines.TASK_NAMES) -> raw output text
+        reason (str): Why the full report could not be produced
+
+    Returns:
+        NewsAnalysisReport: The report, with missing sections listed in analysis_note
+    """
+    report = NewsAnalysisReport(
+        query_summary=f"Analysis for: {user_query}",
+        key_findings="",
+        content_analysis=ContentAnalysis(sentiment="Unknown", bias="Unknown", readability_score=0.0),
+        propaganda_analysis=PropagandaAnalysis(overall_risk_score=0.0),
+    )
+    for name, fill in FILLERS.items():
+        text = task_outputs.get(name)
+        if not text:
+            continue
+        try:
+            fill(report, text)
+        except Exception as e:
+            logger.warning("Could not parse %s output for the partial report: %s", name, e)
+
+    if not report.key_findings:
+        report.key_findings = NO_FINDINGS
+    missing = [TASK_LABELS[name] for name in TASK_NAMES if name != "compiler" and not task_outputs.get(name)]
+    note = f"Partial report: {reason}."
+    if missing:
+        note += f" Missing sections: {', '.join(missing)}."
+    else:
+        note += " Assembled from the completed task outputs without the final compilation step."
+    report.analysis_note = note
+    logger.info("Built partial report from %d task output(s)", len(task_outputs))
+    return report
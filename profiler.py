@@ -0,0 +1,254 @@
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from setup import get_db_path
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.005
+MAX_STACK_DEPTH = 128
+TOP_HOTSPOTS = 25
+
+# The profiler of the run each thread is working for; set by profile_run and carried into the run's
+# worker threads by propagate
+_current = threading.local()
+
+
+def profiling_enabled() -> bool:
+    """Whether VERIFAI_PROFILE asks for every analysis to be profiled."""
+    return os.getenv("VERIFAI_PROFILE", "").lower() in ("1", "true", "yes", "on")
+
+
+class Profile:
+    """Stack samples of one profiled run, with collapsed-stack, speedscope and hotspot views."""
+
+    def __init__(self, stacks: Counter, interval: float, duration: float, label: str = ""):
+        self.stacks = stacks  # (thread name, (frame label, ...) root first) -> samples
+        self.interval = interval
+        self.duration = duration
+        self.label = label
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format (input for flamegraph.pl, speedscope, inferno ...)."""
+        return "".join(
+            f"{';'.join((thread,) + stack)} {count}\n"
+            for (thread, stack), count in sorted(self.stacks.items(), key=lambda item: -item[1])
+        )
+
+    def speedscope(self) -> dict:
+        """A speedscope file (https://www.speedscope.app), one sampled profile per thread."""
+        frame_index, frames = {}, []
+        by_thread = {}
+        for (thread, stack), count in self.stacks.items():
+            indices = []
+            for label in stack:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    name, _, location = label.partition(" (")
+                    file, _, line = location.rstrip(")").rpartition(":")
+                    frames.append({"name": name, "file": file, "line": int(line) if line.isdigit() else 0})
+                indices.append(frame_index[label])
+            samples, weights = by_thread.setdefault(thread, ([], []))
+            samples.append(indices)
+            weights.append(round(count * self.interval, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.label or "analysis",
+            "exporter": "verifai-profiler",
+            "shared": {"frames": frames},
+            "profiles": [
+                {"type": "sampled", "name": thread, "unit": "seconds", "startValue": 0,
+                 "endValue": round(sum(weights), 6), "samples": samples, "weights": weights}
+                for thread, (samples, weights) in by_thread.items()
+            ],
+        }
+
+    def hotspots(self, n: int = TOP_HOTSPOTS) -> list:
+        """
+        The functions with the most samples.
+
+        Returns:
+            list: Dicts with function, self and total samples and their share of all samples (%),
+            most self time first
+        """
+        own, total = Counter(), Counter()
+        for (_, stack), count in self.stacks.items():
+            if stack:
+                own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        all_samples = max(self.samples, 1)
+        return [
+            {"function": label, "self_samples": count, "self_pct": round(count / all_samples * 100, 1),
+             "total_samples": total[label], "total_pct": round(total[label] / all_samples * 100, 1)}
+            for label, count in own.most_common(n)
+        ]
+
+    def save(self, directory: str = None) -> dict:
+        """
+        Write the collapsed stacks and the speedscope file to db/profiles/.
+
+        Returns:
+            dict: "collapsed" and "speedscope" -> file path
+        """
+        directory = directory or get_db_path("profiles")
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^a-z0-9]+", "-", self.label.lower()).strip("-")[:40] or "analysis"
+        base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}")
+        paths = {"collapsed": f"{base}.collapsed.txt", "speedscope": f"{base}.speedscope.json"}
+        with open(paths["collapsed"], "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        with open(paths["speedscope"], "w", encoding="utf-8") as f:
+            json.dump(self.speedscope(), f)
+        return paths
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for one run.
+
+    A background thread snapshots the Python stacks of the calling thread and of the threads the run
+    hands work to through propagate (the crew's worker, the crawl pools, ...) at a fixed interval.
+    Threads of the Streamlit server, other sessions and other batch runs are left out, including
+    ones started while profiling. Nothing is installed in the profiled code, so the cost is the
+    sampler's own stack walks.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, max_depth: int = MAX_STACK_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks = Counter()
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._threads = Counter()  # ident -> nesting depth of sampling_thread blocks
+        self._threads_lock = threading.Lock()
+        self._previous = None
+        self._started = 0.0
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            parts = path.replace("\\", "/").split("/")
+            # site-packages/<package>/... or the last two path components
+            short = "/".join(parts[parts.index("site-packages") + 1:]) if "site-packages" in parts else "/".join(parts[-2:])
+            label = self._labels[code] = f"{code.co_name} ({short}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self) -> None:
+        with self._threads_lock:
+            idents = list(self._threads)
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        for ident in idents:
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self._stacks[(names.get(ident, str(ident)), tuple(reversed(stack)))] += 1
+
+    def _enter(self) -> None:
+        with self._threads_lock:
+            self._threads[threading.get_ident()] += 1
+
+    def _exit(self) -> None:
+        ident = threading.get_ident()
+        with self._threads_lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    @contextmanager
+    def sampling_thread(self):
+        """Sample the calling thread, and make it propagate this profiler, until the block exits."""
+        previous = getattr(_current, "profiler", None)
+        _current.profiler = self
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+            _current.profiler = previous
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:
+                logger.debug("Profiler sample failed: %s", e)
+
+    def start(self) -> None:
+        self._previous = getattr(_current, "profiler", None)
+        _current.profiler = self
+        self._enter()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self, label: str = "") -> Profile:
+        self._exit()
+        _current.profiler = self._previous
+        self._stop.set()
+        self._thread.join()
+        return Profile(self._stacks, self.interval, time.perf_counter() - self._started, label)
+
+
+def propagate(fn):
+    """
+    Wrap fn so that the thread running it is sampled by the calling thread's profiler, if any.
+
+    Use it for work a run hands to other threads (threading.Thread targets, executor.map/submit).
+    Pool threads are sampled only while they run fn, so what they do for other runs is left out.
+    Without an active profiler fn is returned unchanged.
+    """
+    profiler = getattr(_current, "profiler", None)
+    if profiler is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with profiler.sampling_thread():
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def profile_run(enabled: bool, label: str = ""):
+    """
+    Profile the enclosed block when enabled.
+
+    Yields a dict whose "profile" key holds the Profile once the block exits (and "paths" the files
+    it was saved to); when disabled nothing is started and the dict stays empty.
+    """
+    result = {}
+    if not enabled:
+        yield result
+        return
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        yield result
+    finally:
+        profile = profiler.stop(label)
+        result["profile"] = profile
+        try:
+            result["paths"] = profile.save()
+            logger.info("Saved profile of '%s' (%d samples) to %s", label, profile.samples, result["paths"]["speedscope"])
+        except OSError as e:
+            logger.warning("Could not save the profile: %s", e)
@@ -0,0 +1,351 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from setup import get_db_path
+from shared_state import ThreadLocalConnection, process_singleton
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute, burst size and concurrency bounds per provider. The rate can be
+# overridden with VERIFAI_<PROVIDER>_RPM, e.g. VERIFAI_GEMINI_RPM=60 on a paid Gemini tier.
+PROVIDER_LIMITS = {
+    "gemini": {"rpm": 15, "burst": 3, "max_concurrency": 4},
+    "serper": {"rpm": 300, "burst": 10, "max_concurrency": 4},
+    "reddit": {"rpm": 90, "burst": 10, "max_concurrency": 2},
+    "web": {"rpm": 120, "burst": 10, "max_concurrency": 6},
+    "news_api": {"rpm": 60, "burst": 5, "max_concurrency": 8},
+}
+THROTTLE_STATUS_CODES = (429, 503)
+# Exception types (LiteLLM, google-api-core, requests wrappers) and gRPC status names that mean throttling
+THROTTLE_EXCEPTION_NAMES = ("RateLimitError", "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+                            "ServiceUnavailableError")
+THROTTLE_STATUSES = ("RESOURCE_EXHAUSTED", "UNAVAILABLE")
+RETRY_DELAY_RE = re.compile(r"retry[_ ]?delay\"?\s*[:=]\s*\"?(\d+(?:\.\d+)?)s", re.IGNORECASE)
+
+
+class TokenBucket:
+    """
+    Token bucket whose state lives in SQLite, so every thread and process on the machine shares it.
+
+    Acquiring reserves a token inside one IMMEDIATE transaction and may drive the balance negative;
+    the caller then sleeps until its reservation is covered. Waiters are therefore served in
+    arrival order without polling the database.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, path: str = None):
+        self.name = name
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self.path = path or get_db_path("rate_limits.db")
+        self._connection = ThreadLocalConnection(self.path, isolation_level=None)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS token_buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO token_buckets VALUES (?, ?, ?)", (name, capacity, time.time()))
+
+    def _update(self, change) -> float:
+        """Refill the bucket, apply change(tokens) -> new tokens, and return the new balance."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated_at = conn.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            now = time.time()
+            tokens = min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+            tokens = change(tokens)
+            conn.execute("UPDATE token_buckets SET tokens = ?, updated_at = ? WHERE name = ?", (tokens, now, self.name))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return tokens
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens without waiting. Returns the seconds the caller must wait before using them."""
+        balance = self._update(lambda current: current - tokens)
+        return -balance / self.rate if balance < 0 else 0.0
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens, sleeping until they are available. Returns the seconds waited."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """acquire() for coroutines: the wait is an asyncio.sleep, so no thread is held."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Empty the bucket so that no caller, in any process, gets a token for the next few seconds."""
+        self._update(lambda current: min(current, 0.0) - seconds * self.rate)
+
+
+class AIMDConcurrency:
+    """
+    Concurrency limit that grows additively on success and halves on throttling.
+
+    The limit rises by about one slot per limit-many successful calls and is cut at most once per
+    decrease_interval, so a burst of 429s from calls that were already in flight counts once.
+    """
+
+    def __init__(self, initial: float = 2, minimum: float = 1, maximum: float = 8,
+                 decrease_factor: float = 0.5, decrease_interval: float = 2.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.decrease_interval = decrease_interval
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    async def acquire_async(self, poll: float = 0.05) -> None:
+        """acquire() for coroutines; polls, since the event loop must not block on the condition."""
+        while not self.try_acquire():
+            await asyncio.sleep(poll)
+
+    def release(self, throttled: bool = False) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= self.decrease_interval:
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+class RetryBudget:
+    """
+    Process-wide cap on retries: each first attempt earns ratio of a retry and each retry spends one.
+
+    This keeps retries to roughly ratio * traffic (plus a small reserve), so an outage cannot
+    turn every request into max_retries requests.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0, maximum: float = 50.0):
+        self.ratio = ratio
+        self.maximum = maximum
+        self._balance = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._balance = min(self.maximum, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._balance < 1.0:
+                return False
+            self._balance -= 1.0
+            return True
+
+
+def _status_code(obj):
+    for candidate in (obj, getattr(obj, "response", None)):
+        for attribute in ("status_code", "status", "code"):
+            code = getattr(candidate, attribute, None)
+            if isinstance(code, int) and not isinstance(code, bool):
+                return code
+    return None
+
+
+def _exception_chain(error: BaseException):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_throttled(obj) -> bool:
+    """
+    Whether an exception or HTTP response means the provider is rate limiting or overloaded.
+
+    Decided by the HTTP status code, the exception type or the provider's status name, on the
+    exception and the ones it was raised from; the message text is not searched.
+    """
+    if not isinstance(obj, BaseException):
+        code = _status_code(obj)
+        return code is not None and code in THROTTLE_STATUS_CODES
+    for error in _exception_chain(obj):
+        code = _status_code(error)
+        if code is not None and code in THROTTLE_STATUS_CODES:
+            return True
+        if any(cls.__name__ in THROTTLE_EXCEPTION_NAMES for cls in type(error).__mro__):
+            return True
+        if str(getattr(error, "status", "")).upper() in THROTTLE_STATUSES:
+            return True
+    return False
+
+
+def retry_after(obj):
+    """Seconds the provider asked us to wait, from a Retry-After header or a Gemini retryDelay, or None."""
+    response = obj if hasattr(obj, "headers") else getattr(obj, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    match = RETRY_DELAY_RE.search(str(obj)) if isinstance(obj, BaseException) else None
+    return float(match.group(1)) if match else None
+
+
+class RateLimiter:
+    """
+    Per-provider gate combining the shared token bucket, AIMD concurrency and throttle-aware retries.
+
+    Calls that fail with (or return) a 429/503 are retried after the provider's Retry-After, or an
+    exponential backoff with jitter, as long as the global retry budget allows. A provider-supplied
+    delay pauses the shared bucket, so other threads and processes back off too.
+    """
+
+    def __init__(self, name: str, rpm: float, burst: float = 1, max_concurrency: int = 4,
+                 max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 60.0,
+                 retry_budget: RetryBudget = None, bucket_path: str = None):
+        self.name = name
+        self.bucket = TokenBucket(name, rpm / 60.0, burst, bucket_path)
+        self.concurrency = AIMDConcurrency(initial=min(2, max_concurrency), maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget or _retry_budget
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call fn through the limiter.
+
+        Args:
+            fn: The function making one provider request
+            *args, **kwargs: Passed to fn
+
+        Returns:
+            The result of fn. A throttled HTTP response is returned as-is once retries run out;
+            a throttling exception is re-raised.
+        """
+        self.retry_budget.deposit()
+        for attempt in range(self.max_retries + 1):
+            self.concurrency.acquire()
+            error = result = None
+            throttled = False
+            try:
+                self.bucket.acquire()
+                result = fn(*args, **kwargs)
+                throttled = is_throttled(result)
+            except Exception as e:
+                if not is_throttled(e):
+                    raise
+                error = e
+                throttled = True
+            finally:
+                # Also on BaseException (KeyboardInterrupt, Streamlit's stop/rerun), or the slot leaks for good
+                self.concurrency.release(throttled)
+            if not throttled:
+                return result
+            delay = self._retry_delay(attempt, error if error is not None else result)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+            time.sleep(delay)
+
+    async def call_async(self, fn, *args, **kwargs):
+        """
+        call() for a coroutine function, on an event loop.
+
+        Bucket, concurrency and backoff waits are asyncio sleeps, so they hold no thread (and no
+        executor worker) while they wait.
+        """
+        self.retry_budget.deposit()
+        for attempt in range(self.max_retries + 1):
+            await self.concurrency.acquire_async()
+            error = result = None
+            throttled = False
+            try:
+                await self.bucket.acquire_async()
+                result = await fn(*args, **kwargs)
+                throttled = is_throttled(result)
+            except Exception as e:
+                if not is_throttled(e):
+                    raise
+                error = e
+                throttled = True
+            finally:
+                self.concurrency.release(throttled)
+            if not throttled:
+                return result
+            delay = self._retry_delay(attempt, error if error is not None else result)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, attempt: int, signal):
+        """
+        After a throttled attempt, the seconds to sleep before retrying, or None to give up.
+
+        A provider-supplied delay pauses the shared bucket instead (the next attempt waits for it
+        there), so the sleep is then 0.
+        """
+        delay = retry_after(signal)
+        if delay is not None:
+            self.bucket.pause(min(delay, self.max_delay))
+        if attempt == self.max_retries or not self.retry_budget.withdraw():
+            logger.warning("%s: still throttled after %d attempt(s), giving up", self.name, attempt + 1)
+            return None
+        sleep = 0.0
+        if delay is None:
+            delay = sleep = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        logger.info("%s: throttled, retrying in %.1fs (attempt %d, limit %.1f)",
+                    self.name, delay, attempt + 2, self.concurrency.limit)
+        return sleep
+
+
+_retry_budget = RetryBudget()
+
+
+@process_singleton
+def get_limiter(provider: str) -> RateLimiter:
+    """Return the process-wide limiter for a provider listed in PROVIDER_LIMITS."""
+    config = dict(PROVIDER_LIMITS[provider])
+    rpm = os.getenv(f"VERIFAI_{provider.upper()}_RPM")
+    if rpm:
+        config["rpm"] = float(rpm)
+    return RateLimiter(provider, **config)
@@ -1,34 +1,96 @@
 import os
 import praw
+import prawcore
 import re
 import logging
 from collections import Counter
 from app import run_news_analysis
 from save_report import save_report_to_file
 from setup import setup_api_keys
+from bot_metrics import fetch_author_metadata
+from spread import fetch_spread
+from time_series import similar_posts_time_series
+from rate_limit import get_limiter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def scrape_reddit_data(url: str) -> dict:
+# Define stopwords
+STOPWORDS = frozenset([
+    "the", "and", "for", "you", "that", "this", "with", "have", "are",
+    "but", "not", "was", "from", "they", "will", "all", "your", "can",
+    "has", "had", "been", "their", "more", "which", "when", "what",
+    "about", "would", "there", "one", "just", "like", "some", "out",
+    "also", "how", "its", "i", "a", "an", "in", "on", "of", "to", "is", 
+    "https", "www", "com", "reddit", "edit", "post", "comment", "thread"
+])
+WORD_RE = re.compile(r'\b\w+\b')
+
+class RateLimitedRequestor(prawcore.Requestor):
+    """PRAW requestor that sends every HTTP request through the shared Reddit rate limiter."""
+
+    def request(self, *args, **kwargs):
+        return get_limiter("reddit").call(super().request, *args, **kwargs)
+
+def get_reddit_client() -> praw.Reddit:
+    """Create a read-only PRAW client from the REDDIT_* environment variables."""
+    reddit = praw.Reddit(
+        client_id=os.environ["REDDIT_CLIENT_ID"],
+        client_secret=os.environ["REDDIT_CLIENT_SECRET"],
+        user_agent=os.environ["REDDIT_USER_AGENT"],
+        redirect_uri=os.environ["REDDIT_REDIRECT_URI"],
+        requestor_class=RateLimitedRequestor,
+    )
+    reddit.read_only = True
+    return reddit
+
+def collect_comments(submission, max_comments: int = 2000, more_comments_limit: int = 0) -> list:
+    """
+    Flatten a submission's comment tree into a list of plain records.
+    
+    Args:
+        submission: The PRAW submission
+        max_comments (int): Maximum number of comments to return
+        more_comments_limit (int): How many "load more comments" stubs to expand (each costs an API call)
+        
+    Returns:
+        list: Comment dictionaries in breadth-first order
+    """
+    submission.comments.replace_more(limit=more_comments_limit)
+    comments = []
+    for comment in submission.comments.list()[:max_comments]:
+        author = comment.author
+        comments.append({
+            "id": comment.id,
+            "parent_id": comment.parent_id,
+            "author": str(author),
+            "author_fullname": getattr(comment, "author_fullname", None),
+            "body": comment.body,
+            "score": comment.score,
+            "created_utc": comment.created_utc,
+            "depth": getattr(comment, "depth", 0),
+            "edited": bool(comment.edited),
+            "is_deleted": author is None or comment.body in ("[deleted]", "[removed]"),
+        })
+    return comments
+
+def scrape_reddit_data(url: str, max_comments: int = 2000, include_authors: bool = True,
+                       include_spread: bool = True) -> dict:
     """
     Scrape data from a Reddit URL using PRAW.
     
     Args:
         url (str): The Reddit URL to scrape
+        max_comments (int): Maximum number of comments to collect from the thread
+        include_authors (bool): Also look up commenter account metadata (batched and cached)
+        include_spread (bool): Also find the other posts of the link across subreddits (cached)
         
     Returns:
         dict: A dictionary containing the scraped data (title, content, author, etc.)
     """
     try:
         # Initialize Reddit via PRAW
-        reddit = praw.Reddit(
-            client_id=os.environ["REDDIT_CLIENT_ID"],
-            client_secret=os.environ["REDDIT_CLIENT_SECRET"],
-            user_agent=os.environ["REDDIT_USER_AGENT"],
-            redirect_uri=os.environ["REDDIT_REDIRECT_URI"],
-        )
-        reddit.read_only = True
+        reddit = get_reddit_client()
         
         # Validate the URL
         if not is_reddit_url(url):
@@ -40,6 +102,7 @@ def scrape_reddit_data(url: str) -> dict:
         
         # Collect data
         data = {
+            "id": submission.id,
             "title": submission.title,
             "selftext": submission.selftext,
             "author": str(submission.author),
@@ -53,17 +116,24 @@ def scrape_reddit_data(url: str) -> dict:
             "is_original_content": submission.is_original_content,
         }
         
-        # Collect top-level comments
-        submission.comments.replace_more(limit=0)  # Only get the comments that are initially loaded
-        comments = []
-        for comment in submission.comments[:10]:  # Get the top 10 comments
-            comments.append({
-                "author": str(comment.author),
-                "body": comment.body,
-                "score": comment.score,
-                "created_utc": comment.created_utc,
-            })
-        data["top_comments"] = comments
+        # Collect the loaded comment thread; the top-level ones come first in breadth-first order
+        comments = collect_comments(submission, max_comments=max_comments)
+        data["comments"] = comments
+        data["top_comments"] = [c for c in comments if c["depth"] == 0][:10]  # Get the top 10 comments
+        
+        if include_authors:
+            try:
+                data["authors"] = fetch_author_metadata(reddit, comments)
+            except Exception as e:
+                logger.warning("Could not fetch commenter metadata: %s", e)
+                data["authors"] = {}
+        
+        if include_spread:
+            try:
+                data["spread"] = fetch_spread(reddit, submission)
+            except Exception as e:
+                logger.warning("Could not track the post's spread: %s", e)
+                data["spread"] = []
         
         logger.info("Successfully scraped data for Reddit post: %s", submission.title)
         return data
@@ -72,6 +142,10 @@ def scrape_reddit_data(url: str) -> dict:
         logger.error("Error scraping Reddit data: %s", e)
         return {"error": str(e)}
 
+def keyword_tokens(text: str) -> list:
+    """Lowercase words of text with stopwords and words of two letters or fewer removed."""
+    return [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS and len(w) > 2]
+
 def extract_keywords(data: dict, top_n: int = 25) -> list:
     """
     Extract keywords from the scraped Reddit data.
@@ -97,21 +171,8 @@ def extract_keywords(data: dict, top_n: int = 25) -> list:
             for comment in data["top_comments"]:
                 combined_text += " " + comment["body"]
         
-        # Extract words
-        words = re.findall(r'\b\w+\b', combined_text.lower())
-        
-        # Define stopwords
-        stopwords = set([
-            "the", "and", "for", "you", "that", "this", "with", "have", "are",
-            "but", "not", "was", "from", "they", "will", "all", "your", "can",
-            "has", "had", "been", "their", "more", "which", "when", "what",
-            "about", "would", "there", "one", "just", "like", "some", "out",
-            "also", "how", "its", "i", "a", "an", "in", "on", "of", "to", "is", 
-            "https", "www", "com", "reddit", "edit", "post", "comment", "thread"
-        ])
-        
-        # Filter out stopwords and short words
-        filtered_words = [w for w in words if w not in stopwords and len(w) > 2]
+        # Extract words, filtering out stopwords and short words
+        filtered_words = keyword_tokens(combined_text)
         
         # Count frequencies
         counter = Counter(filtered_words)
@@ -127,6 +188,26 @@ def extract_keywords(data: dict, top_n: int = 25) -> list:
         logger.error("Error extracting keywords: %s", e)
         return []
 
+def collect_similar_posts_series(data: dict, keywords: list, max_items: int = 2000) -> list:
+    """
+    Count Reddit posts similar to a scraped submission over time.
+    
+    Args:
+        data (dict): The scraped Reddit data
+        keywords (list): Keyword dictionaries from extract_keywords
+        max_items (int): Hard cap on the number of matching posts paged through
+        
+    Returns:
+        list: TimeSeriesData points (empty on error)
+    """
+    try:
+        if "error" in data:
+            return []
+        return similar_posts_time_series(get_reddit_client(), data, [kw["text"] for kw in keywords], max_items=max_items)
+    except Exception as e:
+        logger.error("Error building similar posts time series: %s", e)
+        return []
+
 def is_reddit_url(text: str) -> bool:
     """Check if a URL is a Reddit URL."""
     return "reddit.com" in text.lower()
@@ -141,6 +222,8 @@ def main():
         print("No keywords extracted from the post.")
         return
 
+    reddit_data["similar_posts_time_series"] = collect_similar_posts_series(reddit_data, keywords)
+    
     # Convert keywords to comma-separated string
     keyword_list = [kw['text'] for kw in keywords]
     user_query = "News analysis for: " + ", ".join(keyword_list[:5])  # Top 5 keywords
@@ -160,7 +243,8 @@ def main():
         print("\nStarting analysis...")
         report = run_news_analysis(
             user_query=user_query,
-            keywords=keyword_list
+            keywords=keyword_list,
+            reddit_data=reddit_data
         )
         if report:
             save_report_to_file(report)
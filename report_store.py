@@ -0,0 +1,231 @@
+import json
+import logging
+import sqlite3
+import time
+import zlib
+from urllib.parse import urlparse
+
+from models import NewsAnalysisReport, report_from_json, report_to_json
+from setup import get_db_path
+from shared_state import ThreadLocalConnection, process_singleton
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    user_query TEXT NOT NULL DEFAULT '',
+    query_summary TEXT NOT NULL DEFAULT '',
+    risk_score REAL,
+    article_count INTEGER NOT NULL DEFAULT 0,
+    is_structured INTEGER NOT NULL DEFAULT 1,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_created ON reports(created_at DESC);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+    query_summary, key_findings, related_words, top_hashtags,
+    tokenize = 'porter unicode61'
+);
+
+CREATE TABLE IF NOT EXISTS report_domains (
+    domain TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    report_id INTEGER NOT NULL,
+    PRIMARY KEY (domain, kind, report_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_report_domains_report ON report_domains(report_id);
+"""
+
+
+def normalize_domain(value: str) -> str:
+    """Reduce a URL or bare hostname to a lowercase domain without the www. prefix."""
+    if not value:
+        return ""
+    value = value.strip().lower()
+    host = urlparse(value if "://" in value else f"//{value}").hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _field(report, name, default=None):
+    if isinstance(report, dict):
+        return report.get(name, default)
+    return getattr(report, name, default)
+
+
+def _to_fts_query(text: str) -> str:
+    """Quote user input so FTS5 operators in it are treated as plain terms; the last term is a prefix match."""
+    terms = [t.replace('"', '""') for t in text.split() if t.strip()]
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class ReportStore:
+    """SQLite archive of analysis reports with full-text and domain lookups."""
+
+    def __init__(self, path: str = None):
+        self.path = path or get_db_path("reports.db")
+        self._connection = ThreadLocalConnection(self.path, synchronous="NORMAL", row_factory=sqlite3.Row)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def save(self, report, user_query: str = "") -> int:
+        """
+        Persist a report and index it for search.
+
+        Args:
+            report: A NewsAnalysisReport or the fallback report dict
+            user_query (str): The query the analysis was run for
+
+        Returns:
+            int: The id of the stored report
+        """
+        is_structured = isinstance(report, NewsAnalysisReport)
+        payload_json = report_to_json(report) if is_structured else json.dumps(report, default=str).encode("utf-8")
+        payload = zlib.compress(payload_json, 6)
+
+        propaganda = _field(report, "propaganda_analysis") or {}
+        risk_score = _field(propaganda, "overall_risk_score")
+        related_words = _field(report, "related_words") or []
+        top_hashtags = _field(report, "top_hashtags") or []
+
+        domains = set()
+        for source in _field(report, "top_sources") or []:
+            domain = normalize_domain(_field(source, "url", "") or _field(source, "name", ""))
+            if domain:
+                domains.add((domain, "source"))
+        for site in _field(report, "fake_news_sites") or []:
+            domain = normalize_domain(site if isinstance(site, str) else _field(site, "domain", ""))
+            if domain:
+                domains.add((domain, "fake"))
+
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO reports (created_at, user_query, query_summary, risk_score, article_count, is_structured, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(),
+                    user_query or "",
+                    _field(report, "query_summary", "") or "",
+                    risk_score if isinstance(risk_score, (int, float)) else None,
+                    len(_field(report, "related_articles") or []),
+                    int(is_structured),
+                    payload,
+                ),
+            )
+            report_id = cursor.lastrowid
+            conn.execute(
+                "INSERT INTO reports_fts (rowid, query_summary, key_findings, related_words, top_hashtags) VALUES (?, ?, ?, ?, ?)",
+                (
+                    report_id,
+                    _field(report, "query_summary", "") or "",
+                    str(_field(report, "key_findings", "") or ""),
+                    " ".join(str(w) for w in related_words),
+                    " ".join(str(_field(h, "hashtag", h)) for h in top_hashtags),
+                ),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO report_domains (domain, kind, report_id) VALUES (?, ?, ?)",
+                [(domain, kind, report_id) for domain, kind in domains],
+            )
+        logger.info("Archived report %d (%d domains indexed)", report_id, len(domains))
+        return report_id
+
+    def get(self, report_id: int, lazy: bool = True):
+        """
+        Load a stored report, returning a NewsAnalysisReport when it was stored as one, else a dict.
+
+        Reports were validated when saved, so by default their article and time-series lists are
+        only validated when first used (see models.report_from_json).
+        """
+        row = self._connection().execute(
+            "SELECT payload, is_structured FROM reports WHERE id = ?", (report_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        payload_json = zlib.decompress(row["payload"])
+        if row["is_structured"]:
+            return report_from_json(payload_json, lazy=lazy)
+        return json.loads(payload_json)
+
+    def search(self, text: str = "", domain: str = "", kind: str = None,
+               page: int = 1, page_size: int = 20) -> tuple:
+        """
+        Search archived reports by full text and/or domain, newest first (best match first for text queries).
+
+        Args:
+            text (str): Free-text query over summary, findings, related words and hashtags
+            domain (str): Only return reports citing this domain
+            kind (str): Restrict the domain match to "source" or "fake"
+            page (int): 1-based page number
+            page_size (int): Reports per page
+
+        Returns:
+            tuple: (list of summary dicts for the page, total number of matches)
+        """
+        joins, where, params = [], [], []
+        order = "r.created_at DESC"
+
+        fts_query = _to_fts_query(text or "")
+        if fts_query:
+            joins.append("JOIN reports_fts f ON f.rowid = r.id")
+            where.append("reports_fts MATCH ?")
+            params.append(fts_query)
+            order = "f.rank, r.created_at DESC"
+
+        domain = normalize_domain(domain or "")
+        if domain:
+            sub = "SELECT report_id FROM report_domains WHERE domain = ?"
+            params.append(domain)
+            if kind:
+                sub += " AND kind = ?"
+                params.append(kind)
+            where.append(f"r.id IN ({sub})")
+
+        base = "FROM reports r " + " ".join(joins)
+        if where:
+            base += " WHERE " + " AND ".join(where)
+
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0]
+        page = max(1, int(page))
+        rows = conn.execute(
+            f"SELECT r.id, r.created_at, r.user_query, r.query_summary, r.risk_score, r.article_count, r.is_structured "
+            f"{base} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [page_size, (page - 1) * page_size],
+        ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def domains_for(self, report_id: int) -> list:
+        """Return (domain, kind) pairs indexed for a report."""
+        rows = self._connection().execute(
+            "SELECT domain, kind FROM report_domains WHERE report_id = ? ORDER BY kind, domain", (report_id,)
+        ).fetchall()
+        return [(row["domain"], row["kind"]) for row in rows]
+
+    def delete(self, report_id: int) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM reports WHERE id = ?", (report_id,))
+            conn.execute("DELETE FROM reports_fts WHERE rowid = ?", (report_id,))
+            conn.execute("DELETE FROM report_domains WHERE report_id = ?", (report_id,))
+
+
+@process_singleton
+def get_report_store() -> ReportStore:
+    """Return the process-wide report store."""
+    return ReportStore()
+
+
+def archive_report(report, user_query: str = ""):
+    """Store a report in the archive, logging instead of raising on failure."""
+    try:
+        return get_report_store().save(report, user_query)
+    except Exception as e:
+        logger.warning("Could not archive report: %s", e)
+        return None
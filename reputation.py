@@ -0,0 +1,238 @@
+import csv
+import logging
+import os
+from collections import Counter, namedtuple
+
+from models import SourceInfo, SourceReliability, FakeNewsSite
+from report_store import normalize_domain
+from shared_state import process_singleton
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "domain_reputation.csv")
+
+# Multi-label public suffixes we see in news domains. Anything not listed is treated as a single-label TLD.
+PUBLIC_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "ltd.uk", "plc.uk",
+    "com.au", "net.au", "org.au", "edu.au", "gov.au",
+    "co.nz", "org.nz", "govt.nz", "co.za", "org.za", "gov.za",
+    "co.in", "org.in", "gov.in", "ac.in", "net.in",
+    "co.jp", "or.jp", "ne.jp", "ac.jp", "go.jp",
+    "co.kr", "or.kr", "com.br", "gov.br", "org.br", "com.mx", "gob.mx",
+    "com.ar", "com.cn", "org.cn", "gov.cn", "com.hk", "org.hk", "com.sg", "gov.sg",
+    "com.tr", "gov.tr", "com.pk", "com.ng", "co.il", "org.il", "com.my", "com.ph",
+    # Hosting platforms, so each user's site is rated on its own
+    "github.io", "blogspot.com", "wordpress.com", "substack.com", "medium.com",
+}
+
+RATING_TO_LEVEL = {"High": "High", "Mostly Factual": "High", "Mixed": "Medium", "Low": "Low"}
+# Factual rating shown for sources the index does not know
+UNRATED = "Unrated"
+
+DomainReputation = namedtuple("DomainReputation", ["domain", "factual_rating", "reliability_score", "known_fake"])
+
+
+def registrable_domain(host: str) -> str:
+    """Return the eTLD+1 of a host (e.g. news.bbc.co.uk -> bbc.co.uk)."""
+    labels = normalize_domain(host).split(".")
+    if len(labels) <= 2:
+        return ".".join(labels)
+    for i in range(1, len(labels) - 1):
+        if ".".join(labels[i:]) in PUBLIC_SUFFIXES:
+            return ".".join(labels[i - 1:])
+    return ".".join(labels[-2:])
+
+
+class ReputationIndex:
+    """
+    Suffix trie over reversed domain labels.
+
+    Each node is a plain dict of child label -> node; a rated domain stores its entry under the None key.
+    A lookup walks the host's labels from the TLD inwards and keeps the deepest rating seen, so
+    subdomains inherit their parent's rating unless they are rated themselves.
+    """
+
+    def __init__(self):
+        self._root = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, domain: str, factual_rating: str, reliability_score: float, known_fake: bool = False) -> None:
+        domain = normalize_domain(domain)
+        if not domain:
+            return
+        node = self._root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        if None not in node:
+            self._size += 1
+        node[None] = DomainReputation(domain, factual_rating, float(reliability_score), bool(known_fake))
+
+    def load_csv(self, path: str) -> int:
+        """
+        Load a reputation table with domain, factual_rating, reliability_score and known_fake columns.
+
+        Args:
+            path (str): Path of the CSV file
+
+        Returns:
+            int: Number of rows loaded
+        """
+        count = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    self.add(
+                        row["domain"],
+                        row.get("factual_rating") or "Mixed",
+                        float(row.get("reliability_score") or 50),
+                        str(row.get("known_fake", "0")).strip().lower() in ("1", "true", "yes"),
+                    )
+                    count += 1
+                except (KeyError, ValueError) as e:
+                    logger.warning("Skipping bad reputation row %s: %s", row, e)
+        logger.info("Loaded %d domain reputations from %s", count, path)
+        return count
+
+    def lookup(self, url_or_domain: str):
+        """Return the DomainReputation for a URL or host, or None if the domain is unknown."""
+        host = normalize_domain(url_or_domain)
+        if not host:
+            return None
+        labels = host.split(".")
+        # Do not let a rating for a public suffix (e.g. "co.uk") leak onto every site under it
+        min_depth = len(registrable_domain(host).split("."))
+        node, found = self._root, None
+        for depth, label in enumerate(reversed(labels), start=1):
+            node = node.get(label)
+            if node is None:
+                break
+            if depth >= min_depth and None in node:
+                found = node[None]
+        return found
+
+    def split_known(self, urls_or_domains) -> tuple:
+        """Partition inputs into ({input: DomainReputation} for known domains, [unknown inputs])."""
+        known, unknown = {}, []
+        for value in urls_or_domains:
+            entry = self.lookup(value)
+            if entry:
+                known[value] = entry
+            else:
+                unknown.append(value)
+        return known, unknown
+
+
+@process_singleton
+def get_reputation_index() -> ReputationIndex:
+    """Return the process-wide index loaded from the bundled table plus VERIFAI_REPUTATION_FILE, if set."""
+    index = ReputationIndex()
+    for path in (DEFAULT_TABLE, os.getenv("VERIFAI_REPUTATION_FILE")):
+        if path and os.path.exists(path):
+            index.load_csv(path)
+    return index
+
+
+def reliability_level(entry: DomainReputation) -> str:
+    """Map a factual rating to the crawler's High/Medium/Low scale."""
+    if entry.known_fake:
+        return "Low"
+    return RATING_TO_LEVEL.get(entry.factual_rating, "Medium")
+
+
+def score_source_info(source: SourceInfo) -> bool:
+    """Fill SourceInfo.reliability_score from the index. Returns True if the source was known."""
+    entry = get_reputation_index().lookup(source.url or source.name)
+    if entry is None:
+        return False
+    source.reliability_score = entry.reliability_score
+    return True
+
+
+def to_source_reliability(url_or_domain: str, articles_count: int = 0, engagement: int = 0):
+    """Build a SourceReliability for a known domain, or None if it is not in the index."""
+    entry = get_reputation_index().lookup(url_or_domain)
+    if entry is None:
+        return None
+    return SourceReliability(
+        domain=entry.domain,
+        factual_rating=entry.factual_rating,
+        articles_count=articles_count,
+        engagement=engagement,
+    )
+
+
+def source_reliabilities(report) -> list:
+    """
+    Rate a report's top sources from the index, for the Top Sources table and chart.
+
+    Args:
+        report: A NewsAnalysisReport
+
+    Returns:
+        list: One SourceReliability per top source, in order; articles are counted from the related
+        articles on the same registrable domain, and sources missing from the index are UNRATED
+    """
+    articles = Counter(registrable_domain(article.url) for article in report.related_articles if article.url)
+    rows = []
+    for source in report.top_sources:
+        domain = registrable_domain(source.url) if source.url else ""
+        count = articles[domain] if domain else 0
+        row = to_source_reliability(source.url or source.name, articles_count=count)
+        rows.append(row or SourceReliability(domain=domain or source.name, factual_rating=UNRATED, articles_count=count))
+    return rows
+
+
+def to_fake_news_site(url_or_domain: str, shares: int = 0, engagement: int = 0):
+    """Build a FakeNewsSite for a domain flagged as known-fake, or None otherwise."""
+    entry = get_reputation_index().lookup(url_or_domain)
+    if entry is None or not entry.known_fake:
+        return None
+    return FakeNewsSite(
+        domain=entry.domain,
+        shares=shares,
+        engagement=engagement,
+        verification_failures=[f"Listed as a known unreliable source (factual rating: {entry.factual_rating})"],
+    )
+
+
+def format_known_ratings(urls_or_domains) -> str:
+    """Render pre-scored domains as prompt lines so agents do not spend a call re-rating them."""
+    lines = []
+    seen = set()
+    for value in urls_or_domains or []:
+        entry = get_reputation_index().lookup(value)
+        if entry is None or entry.domain in seen:
+            continue
+        seen.add(entry.domain)
+        flag = " | KNOWN FAKE/UNRELIABLE" if entry.known_fake else ""
+        lines.append(f"- {entry.domain}: {reliability_level(entry)} ({entry.factual_rating}, {entry.reliability_score:.0f}/100){flag}")
+    return "\n".join(lines)
+
+
+def apply_reputation(report) -> int:
+    """
+    Overwrite LLM-estimated source scores with indexed ratings and add known-fake domains.
+
+    Args:
+        report: A NewsAnalysisReport
+
+    Returns:
+        int: Number of sources scored from the index
+    """
+    scored = 0
+    for source in report.top_sources:
+        if score_source_info(source):
+            scored += 1
+
+    flagged = {normalize_domain(site) for site in report.fake_news_sites}
+    candidates = [source.url or source.name for source in report.top_sources]
+    candidates += [article.url for article in report.related_articles]
+    for value in candidates:
+        site = to_fake_news_site(value)
+        if site and site.domain not in flagged:
+            report.fake_news_sites.append(site.domain)
+            flagged.add(site.domain)
+    return scored
@@ -66,10 +66,12 @@ def save_report_to_file(report, filename="news_analysis_report.md"):
             # Content Analysis Metrics
             f.write("## Content Analysis Metrics\n\n")
             f.write("*Percentage bars visualization would show:*\n\n")
-            f.write(f"- Language: {report.content_analysis.language_percentage}%\n")
-            f.write(f"- Coordination: {report.content_analysis.coordination_percentage}%\n")
-            f.write(f"- Source: {report.content_analysis.source_percentage}%\n")
-            f.write(f"- Bot-like activity: {report.content_analysis.bot_like_activity_percentage}%\n")
+            metrics = report.content_analysis.metrics
+            f.write(f"- Language: {metrics.language_percentage}% {metrics.dominant_language}\n")
+            f.write(f"- Coordination: {metrics.coordination_percentage}%\n")
+            f.write(f"- Source: {metrics.source_percentage}%\n")
+            f.write(f"- Bot-like activity: {metrics.bot_like_activity_percentage}%\n")
+            f.write(f"- Readability (Flesch Reading Ease): {report.content_analysis.readability_score}\n")
             f.write("\n")
             
             # Propaganda Analysis
@@ -0,0 +1,397 @@
+import csv
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from shared_state import process_singleton
+
+logger = logging.getLogger(__name__)
+
+LEXICON_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sentiment_lexicon.csv")
+EMOTIONS = ["joy", "trust", "surprise", "sadness", "fear", "anger", "disgust"]
+
+NEGATIONS = frozenset([
+    "not", "no", "never", "none", "nobody", "nothing", "neither", "nor", "nowhere", "cannot", "without",
+    "hardly", "aint", "cant", "dont", "doesnt", "didnt", "isnt", "wasnt", "wont", "wouldnt", "shouldnt",
+])
+# Added to (or, for diminishers, subtracted from) the magnitude of the next opinion word
+BOOSTERS = {
+    "very": 0.293, "really": 0.293, "extremely": 0.293, "so": 0.293, "totally": 0.293, "absolutely": 0.293,
+    "completely": 0.293, "incredibly": 0.293, "highly": 0.293, "super": 0.293, "utterly": 0.293,
+    "most": 0.293, "truly": 0.293, "deeply": 0.293, "especially": 0.293,
+    "slightly": -0.293, "somewhat": -0.293, "barely": -0.293, "kinda": -0.293, "sort": -0.293,
+    "little": -0.293, "marginally": -0.293, "partly": -0.293,
+}
+FUNCTION_WORDS = frozenset([
+    "the", "and", "for", "you", "that", "this", "with", "have", "are", "but", "not", "was", "from", "they",
+    "will", "all", "your", "can", "has", "had", "been", "their", "more", "which", "when", "what", "about",
+    "would", "there", "one", "just", "like", "some", "out", "also", "how", "its", "than", "then", "them",
+    "were", "who", "into", "only", "even", "because", "these", "those", "being", "does", "did", "here",
+])
+NEGATION_SCALAR = -0.74
+CAPS_INCREMENT = 0.733
+EXCLAMATION_INCREMENT = 0.292
+BUT_BEFORE, BUT_AFTER = 0.5, 1.5
+NEUTRAL_THRESHOLD = 0.05
+CACHE_SIZE = 50000
+
+TOKEN_RE = re.compile(
+    r"[:;][-']?[()dDpP](?!\w)"                  # emoticons
+    r"|[\U0001F300-\U0001FAFF\u2600-\u27BF]\uFE0F?"  # emoji
+    r"|/s\b"                                     # sarcasm tag
+    r"|\w+(?:'\w+)?"
+    r"|!+"
+)
+# Matched against the lowercased text
+SARCASM_RE = re.compile(
+    r"(?<!\w)(?:/s\b|yeah,? right\b|sure,? jan\b|oh (?:great|wonderful|perfect)\b|thanks a lot\b"
+    r"|what a surprise\b)|\U0001F644|\U0001F921"
+)
+QUOTED_RE = re.compile(r"[\"“']([A-Za-z]+)[\"”']")
+ENTITY_RE = re.compile(r"\b[A-Z][\w&.-]*[a-zA-Z](?:\s+[A-Z][\w&.-]*[a-zA-Z])*")
+
+
+def _load_lexicon(path: str) -> dict:
+    lexicon = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            lexicon[row["term"].strip().lower()] = (float(row["valence"]), row.get("emotion") or "")
+    return lexicon
+
+
+class SentimentEngine:
+    """
+    Lexicon- and rule-based sentiment, subjectivity and emotion scoring over batches of texts.
+
+    All texts of a batch are tokenized into one flat token array; lexicon valences, negation and
+    booster windows, the "but" rule and capitalization emphasis are applied with array operations,
+    and per-text totals come from np.bincount. Scores follow VADER's conventions: the compound
+    score is the normalized valence sum in [-1, 1]. Results are memoized by a hash of the text.
+    """
+
+    def __init__(self, lexicon_path: str = LEXICON_FILE, cache_size: int = CACHE_SIZE):
+        lexicon = _load_lexicon(lexicon_path)
+        self.lexicon = lexicon
+        # Token id 0 is reserved for words outside every table
+        self._vocab = {term: i + 1 for i, term in enumerate(
+            list(lexicon) + [w for w in list(BOOSTERS) + list(NEGATIONS) + ["but"] if w not in lexicon]
+        )}
+        size = len(self._vocab) + 1
+        self._valence = np.zeros(size)
+        self._emotion = np.full(size, -1, dtype=np.int64)
+        self._booster = np.zeros(size)
+        self._negation = np.zeros(size, dtype=bool)
+        for term, (valence, emotion) in lexicon.items():
+            self._valence[self._vocab[term]] = valence
+            if emotion in EMOTIONS:
+                self._emotion[self._vocab[term]] = EMOTIONS.index(emotion)
+        for term, boost in BOOSTERS.items():
+            self._booster[self._vocab[term]] = boost
+        for term in NEGATIONS:
+            self._negation[self._vocab[term]] = True
+        self._but_id = self._vocab["but"]
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lexicon_id(self, word: str) -> int:
+        word = word.lower()
+        token_id = self._vocab.get(word, 0)
+        if token_id == 0 and "'" in word:
+            if word.endswith("n't"):
+                return self._vocab["not"]
+            return self._vocab.get(word.replace("'", ""), 0)
+        return token_id
+
+    def _score(self, texts: list) -> list:
+        n_docs = len(texts)
+        tokens = []
+        lengths = np.zeros(n_docs, dtype=np.int64)
+        exclamations = np.zeros(n_docs)
+        for doc, text in enumerate(texts):
+            words = TOKEN_RE.findall(text)
+            if "!" in text:
+                words = [t for t in words if t[0] != "!"]
+                exclamations[doc] = min(4, text.count("!"))
+            lengths[doc] = len(words)
+            tokens.extend(words)
+
+        # Tokens get batch-local ids, so per-word work (lexicon lookup, case checks) runs once per distinct word
+        surface_ids = {token: i for i, token in enumerate(dict.fromkeys(tokens))}
+        ids = list(map(surface_ids.__getitem__, tokens))
+        surfaces = list(surface_ids)
+        lowered = [w.lower() for w in surfaces]
+        lexicon_ids = np.array([self._lexicon_id(w) for w in surfaces] or [0], dtype=np.int64)
+        is_caps = np.array([len(w) > 1 and w.isupper() and w.isalpha() for w in surfaces] or [False])
+        is_lower = np.array([w.islower() for w in surfaces] or [False])
+        is_symbol = np.array([not w[0].isalnum() for w in surfaces] or [False])
+        is_content = np.array([len(w) > 3 and w.isalpha() and w not in FUNCTION_WORDS and w not in self.lexicon
+                               for w in lowered] or [False])
+
+        ids = np.asarray(ids, dtype=np.int64)
+        docs = np.repeat(np.arange(n_docs), lengths)
+        starts = np.cumsum(lengths) - lengths
+        positions = np.arange(len(ids)) - starts[docs]
+        lex = lexicon_ids[ids]
+        raw_valence = self._valence[lex]
+        sign = np.sign(raw_valence)
+
+        # Emphasis only counts when the text is not written in capitals throughout
+        mixed_case = np.bincount(docs, weights=is_lower[ids], minlength=n_docs) > 0
+        caps = is_caps[ids] & mixed_case[docs]
+
+        # Boosters and negations in the three preceding words of the same text
+        boost = np.zeros(len(ids))
+        negated = np.zeros(len(ids), dtype=bool)
+        for distance, damping in ((1, 1.0), (2, 0.95), (3, 0.9)):
+            if len(ids) <= distance:
+                break
+            same_doc = docs[distance:] == docs[:-distance]
+            boost[distance:] += np.where(same_doc, self._booster[lex[:-distance]] * damping, 0.0)
+            negated[distance:] |= same_doc & self._negation[lex[:-distance]]
+        valence = raw_valence + sign * boost + sign * CAPS_INCREMENT * caps
+        valence = np.where(negated, valence * NEGATION_SCALAR, valence)
+
+        # "but" shifts weight to the clause after it
+        but_position = np.full(n_docs, -1, dtype=np.int64)
+        is_but = lex == self._but_id
+        np.maximum.at(but_position, docs[is_but], positions[is_but])
+        token_but = but_position[docs]
+        has_but = token_but >= 0
+        valence = np.where(has_but & (positions < token_but), valence * BUT_BEFORE, valence)
+        valence = np.where(has_but & (positions > token_but), valence * BUT_AFTER, valence)
+
+        # bincount returns int64 when there are no tokens at all (empty or punctuation-only texts)
+        totals = np.bincount(docs, weights=valence, minlength=n_docs).astype(float)
+        totals += np.sign(totals) * EXCLAMATION_INCREMENT * exclamations
+        compound = totals / np.sqrt(totals * totals + 15.0)
+
+        opinion = valence != 0
+        opinion_counts = np.bincount(docs, weights=opinion, minlength=n_docs)
+        booster_counts = np.bincount(docs, weights=self._booster[lex] != 0, minlength=n_docs)
+        density = (opinion_counts + 0.5 * booster_counts) / np.maximum(lengths, 1)
+        subjectivity = 1.0 - np.exp(-4.0 * density)
+
+        # Negated emotion words ("not happy") do not count towards that emotion
+        emotion_ids = self._emotion[lex]
+        has_emotion = (emotion_ids >= 0) & ~negated
+        emotion_weights = np.bincount(
+            docs[has_emotion] * len(EMOTIONS) + emotion_ids[has_emotion],
+            weights=np.abs(valence[has_emotion]),
+            minlength=n_docs * len(EMOTIONS),
+        ).reshape(n_docs, len(EMOTIONS))
+
+        # Emoji whose polarity contradicts the words are an irony signal
+        symbol = is_symbol[ids]
+        emoji_valence = np.bincount(docs, weights=raw_valence * symbol, minlength=n_docs)
+        word_valence = np.bincount(docs, weights=raw_valence * ~symbol, minlength=n_docs)
+        clash = (emoji_valence * word_valence) < 0
+
+        opinion_words = [[] for _ in range(n_docs)]
+        for doc, token, value in zip(docs[opinion].tolist(), ids[opinion].tolist(), np.abs(valence[opinion]).tolist()):
+            opinion_words[doc].append((value, lowered[token]))
+
+        # Five most frequent content words per text, from (text, word) pair counts
+        topics = [{} for _ in range(n_docs)]
+        content = is_content[ids]
+        if content.any():
+            lowered_ids = {}
+            word_ids = np.array([lowered_ids.setdefault(w, len(lowered_ids)) for w in lowered], dtype=np.int64)
+            pairs, counts = np.unique(docs[content] * len(lowered_ids) + word_ids[ids[content]], return_counts=True)
+            pair_docs = pairs // len(lowered_ids)
+            shares = (counts / np.bincount(pair_docs, weights=counts, minlength=n_docs)[pair_docs]).round(3)
+            order = np.lexsort((-counts, pair_docs))
+            pairs, shares, pair_docs = pairs[order], shares[order], pair_docs[order]
+            group_start = np.r_[0, np.flatnonzero(pair_docs[1:] != pair_docs[:-1]) + 1]
+            rank = np.arange(len(pairs)) - np.repeat(group_start, np.diff(np.r_[group_start, len(pairs)]))
+            top = rank < 5
+            words_by_id = list(lowered_ids)
+            for word, share, doc in zip((pairs[top] % len(lowered_ids)).tolist(), shares[top].tolist(), pair_docs[top].tolist()):
+                topics[doc][words_by_id[word]] = share
+
+        dominant = np.where(emotion_weights.sum(axis=1) > 0, emotion_weights.argmax(axis=1), -1)
+        return [
+            self._result(*row) for row in zip(
+                texts, compound.tolist(), subjectivity.round(3).tolist(), dominant.tolist(),
+                opinion_counts.astype(int).tolist(), opinion_words, clash.tolist(), topics,
+            )
+        ]
+
+    def _result(self, text, compound, subjectivity, emotion, opinion_count, opinion_words, clash, topics) -> dict:
+        # Irony: explicit sarcasm markers, scare-quoted praise, or emoji that contradict the words
+        markers = len(SARCASM_RE.findall(text.lower()))
+        quoted_praise = ('"' in text or "'" in text or "\u201c" in text) and any(
+            self.lexicon.get(w.lower(), (0,))[0] > 0 for w in QUOTED_RE.findall(text)
+        )
+        sarcasm_level = round(min(1.0, 0.6 * markers + 0.3 * quoted_praise + 0.3 * clash), 2)
+        irony = sarcasm_level >= 0.5
+        if irony and compound > 0:
+            compound = -0.5 * compound
+
+        if compound >= NEUTRAL_THRESHOLD:
+            label = "Positive"
+        elif compound <= -NEUTRAL_THRESHOLD:
+            label = "Negative"
+        else:
+            label = "Neutral"
+
+        entities = []
+        for match in ENTITY_RE.finditer(text):
+            name = match.group()
+            if " " not in name:
+                preceding = text[:match.start()].rstrip()
+                # A single capitalized word that starts a sentence, or an emphasized opinion word, is not a name
+                if not preceding or preceding[-1] in ".!?\n" or name.lower() in self.lexicon:
+                    continue
+            if name.lower() not in FUNCTION_WORDS:
+                entities.append(name)
+
+        return {
+            "sentiment": label,
+            "compound": round(compound, 4),
+            "confidence": round(min(1.0, abs(compound) + 0.1 * min(opinion_count, 5) / 5), 3) if opinion_count else 0.0,
+            "emotion": EMOTIONS[emotion] if emotion >= 0 else "neutral",
+            "subjectivity": subjectivity,
+            "irony_detected": irony,
+            "sarcasm_level": sarcasm_level,
+            "keywords": [w for _, w in sorted(set(opinion_words), reverse=True)][:10],
+            "entity_mentions": list(dict.fromkeys(entities))[:20],
+            "topic_distribution": topics,
+        }
+
+    def analyze(self, texts: list) -> list:
+        """
+        Score a batch of texts.
+
+        Args:
+            texts (list): Strings to score
+
+        Returns:
+            list: One result dict per text, in the same order
+
+        Texts without any words score neutral:
+
+        >>> engine = SentimentEngine()
+        >>> [r["sentiment"] for r in engine.analyze(["", "!!!", "..."])]
+        ['Neutral', 'Neutral', 'Neutral']
+        >>> engine.analyze(["!!!"])[0]["compound"]
+        0.0
+        """
+        keys = [hashlib.blake2b((t or "").encode("utf-8"), digest_size=16).digest() for t in texts]
+        results = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    results[i] = cached
+                else:
+                    missing.setdefault(key, []).append(i)
+        if missing:
+            unique_keys = list(missing)
+            scored = self._score([texts[missing[k][0]] or "" for k in unique_keys])
+            with self._lock:
+                for key, result in zip(unique_keys, scored):
+                    self._cache[key] = result
+                    for i in missing[key]:
+                        results[i] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        # Callers get their own copies so the cached results cannot be modified
+        return [dict(r) for r in results]
+
+
+def aggregate_sentiment(results: list, weights=None) -> dict:
+    """
+    Combine per-text results into one overall sentiment.
+
+    Args:
+        results (list): Output of SentimentEngine.analyze
+        weights (list): Optional per-text weights (for example comment scores)
+
+    Returns:
+        dict: sentiment (Positive, Negative, Neutral or Mixed), compound, positive/negative/neutral shares,
+            subjectivity, dominant emotion and count
+    """
+    if not results:
+        return {"sentiment": "Neutral", "compound": 0.0, "positive_share": 0.0, "negative_share": 0.0,
+                "neutral_share": 0.0, "subjectivity": 0.0, "emotion": "neutral", "count": 0}
+    weights = np.ones(len(results)) if weights is None else np.asarray(weights, dtype=float)
+    compound = np.array([r["compound"] for r in results])
+    labels = np.array([r["sentiment"] for r in results])
+    total = weights.sum() or 1.0
+    positive = float(weights[labels == "Positive"].sum() / total)
+    negative = float(weights[labels == "Negative"].sum() / total)
+    mean = float(np.average(compound, weights=weights)) if weights.sum() else 0.0
+    if positive >= 0.3 and negative >= 0.3:
+        label = "Mixed"
+    elif mean >= NEUTRAL_THRESHOLD:
+        label = "Positive"
+    elif mean <= -NEUTRAL_THRESHOLD:
+        label = "Negative"
+    else:
+        label = "Neutral"
+    emotions = Counter()
+    for result, weight in zip(results, weights):
+        if result["emotion"] != "neutral":
+            emotions[result["emotion"]] += weight
+    return {
+        "sentiment": label,
+        "compound": round(mean, 3),
+        "positive_share": round(positive, 3),
+        "negative_share": round(negative, 3),
+        "neutral_share": round(1.0 - positive - negative, 3),
+        "subjectivity": round(float(np.average([r["subjectivity"] for r in results], weights=weights)) if weights.sum() else 0.0, 3),
+        "emotion": emotions.most_common(1)[0][0] if emotions else "neutral",
+        "count": len(results),
+    }
+
+
+def _thread_texts(reddit_data: dict) -> tuple:
+    if not reddit_data or "error" in reddit_data:
+        return [], []
+    comments = [c for c in reddit_data.get("comments") or reddit_data.get("top_comments") or [] if not c.get("is_deleted")]
+    texts = [f"{reddit_data.get('title', '')} {reddit_data.get('selftext', '')}"] + [c.get("body", "") for c in comments]
+    weights = [1.0] + [1.0 + math.log1p(max(c.get("score") or 0, 0)) for c in comments]
+    return texts, weights
+
+
+def measure_comment_sentiment(reddit_data: dict):
+    """Aggregate sentiment of a scraped Reddit thread, weighting comments by log score; None without a thread."""
+    texts, weights = _thread_texts(reddit_data)
+    if not texts:
+        return None
+    return aggregate_sentiment(get_sentiment_engine().analyze(texts), weights)
+
+
+def measure_report_sentiment(article_texts: list, reddit_data: dict = None):
+    """Aggregate sentiment of scraped article texts plus an optional Reddit thread; None without any text."""
+    texts, weights = _thread_texts(reddit_data)
+    articles = [t for t in article_texts if t]
+    if not texts and not articles:
+        return None
+    # Each article counts as much as the thread's opening post
+    results = get_sentiment_engine().analyze(articles + texts)
+    return aggregate_sentiment(results, [1.0] * len(articles) + weights)
+
+
+def format_measured_sentiment(aggregate: dict) -> str:
+    """One-line summary of an aggregate for task prompts."""
+    return (
+        f"{aggregate['sentiment']} (compound {aggregate['compound']:+.2f} over {aggregate['count']} posts/comments; "
+        f"{aggregate['positive_share']:.0%} positive, {aggregate['negative_share']:.0%} negative; "
+        f"dominant emotion {aggregate['emotion']})"
+    )
+
+
+@process_singleton
+def get_sentiment_engine() -> SentimentEngine:
+    """Return the process-wide sentiment engine."""
+    return SentimentEngine()
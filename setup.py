@@ -6,6 +6,7 @@ import requests
 import time
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.language_models.chat_models import BaseChatModel
+from model_routing import DEFAULT_OLLAMA_URL, model_for, provider_of
 
 load_dotenv()
 
@@ -18,7 +19,7 @@ def setup_crewai_config():
     
     # Set CrewAI to use Gemini
     os.environ["CREWAI_LLM_PROVIDER"] = "gemini"
-    os.environ["GEMINI_API_KEY"] = os.getenv("GEMINI_API_KEY")
+    os.environ["GEMINI_API_KEY"] = os.getenv("GEMINI_API_KEY", "")
     
     # Disable function calling and telemetry globally
     os.environ["CREWAI_DISABLE_TELEMETRY"] = "true"
@@ -37,26 +38,91 @@ def check_gemini_status():
         
     return True, "Gemini API key is set and appears valid."
 
-def get_llm() -> BaseChatModel:
-    """Initializes and returns the appropriate LLM based on configuration."""
-    try:
-        # For Gemini - use LiteLLM compatible format
-        if os.getenv("CREWAI_LLM_PROVIDER") == "gemini":
-            gemini_api_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_api_key:
-                raise ValueError("GEMINI_API_KEY not set for Gemini LLM provider.")
-            
-            # Use CrewAI's LLM class with proper provider prefix for LiteLLM
-            return LLM(
-                model="gemini/gemini-2.5-flash-lite",  # LiteLLM format: provider/model
-                api_key=gemini_api_key
-            )
+# CrewAI versions whose LLM.__new__ routes models to native provider classes take is_litellm
+_ROUTES_PROVIDERS = LLM.__new__ is not object.__new__
+
+class RateLimitedLLM(LLM):
+    """
+    CrewAI LLM whose calls go through its provider's shared rate limiter.
+
+    With a token budget, every call is checked against it first and its tokens are recorded after,
+    under the task the LLM's agent works on.
+
+    Always built on LiteLLM: newer CrewAI versions otherwise hand "gemini/..." models to a native
+    provider class, which would skip this subclass and with it the limiter and the budget.
+    """
+
+    def __init__(self, *args, task_name=None, token_budget=None, **kwargs):
+        if _ROUTES_PROVIDERS:
+            kwargs["is_litellm"] = True
+        super().__init__(*args, **kwargs)
+        self.task_name = task_name
+        self.token_budget = token_budget
+
+    def __new__(cls, *args, task_name=None, token_budget=None, **kwargs):
+        if not _ROUTES_PROVIDERS:
+            return super().__new__(cls)
+        return super().__new__(cls, *args, is_litellm=True, **kwargs)
+
+    def call(self, messages, *args, **kwargs):
+        # Imported here because rate_limit imports get_db_path from this module
+        from rate_limit import PROVIDER_LIMITS, get_limiter
+        if self.token_budget:
+            messages = self.token_budget.before_call(self.task_name, messages)
+        provider = provider_of(self.model)
+        if provider in PROVIDER_LIMITS:
+            response = get_limiter(provider).call(super().call, messages, *args, **kwargs)
         else:
-            raise ValueError(f"Unsupported LLM provider: {os.getenv('CREWAI_LLM_PROVIDER')}")
+            response = super().call(messages, *args, **kwargs)
+        if self.token_budget:
+            self.token_budget.record(self.task_name, self.model, messages, response)
+        return response
+
+def get_llm(task_name: str = None, token_budget=None) -> BaseChatModel:
+    """
+    Initializes and returns the LLM for a task's agent.
+    
+    The model comes from the task's tier in model_routing: fast for the search and analysis
+    steps, stronger for the compiler, or a local Ollama model for every task when
+    VERIFAI_MODEL_TIER=local.
+    
+    Args:
+        task_name (str): The task the agent works on (see deadlines.TASK_NAMES)
+        token_budget (TokenBudget): The run's token budget, if any
+    """
+    try:
+        llm = _create_llm(model_for(task_name), task_name, token_budget)
+        # Anything else would bypass the rate limiter and the token budget
+        if not isinstance(llm, RateLimitedLLM):
+            raise TypeError(f"CrewAI returned {type(llm).__name__} instead of a RateLimitedLLM for {llm.model}")
+        return llm
     except Exception as e:
         print(f"Error initializing LLM: {e}")
         return None
 
+def _create_llm(model, task_name, token_budget):
+    provider = provider_of(model)
+    if provider == "gemini":
+        gemini_api_key = os.getenv("GEMINI_API_KEY")
+        if not gemini_api_key:
+            raise ValueError("GEMINI_API_KEY not set for Gemini LLM provider.")
+        
+        # Use CrewAI's LLM class with proper provider prefix for LiteLLM
+        return RateLimitedLLM(
+            model=model,  # LiteLLM format: provider/model
+            api_key=gemini_api_key,
+            task_name=task_name,
+            token_budget=token_budget,
+        )
+    elif provider == "ollama":
+        return RateLimitedLLM(
+            model=model,
+            base_url=os.getenv("OLLAMA_BASE_URL", DEFAULT_OLLAMA_URL),
+            task_name=task_name,
+            token_budget=token_budget,
+        )
+    raise ValueError(f"Unsupported LLM provider for model: {model}")
+
 def setup_api_keys():
     """Validate API keys"""
     serper_key = os.getenv("SERPER_API_KEY")
@@ -77,4 +143,10 @@ def setup_api_keys():
             print("SERPER_API_KEY appears to be invalid. Please check your API key.")
         return False
     
-    return True
\ No newline at end of file
+    return True
+
+def get_db_path(filename: str) -> str:
+    """Return the path of a file inside the local db/ directory, creating the directory if needed."""
+    db_dir = os.getenv("VERIFAI_DB_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "db")
+    os.makedirs(db_dir, exist_ok=True)
+    return os.path.join(db_dir, filename)
@@ -0,0 +1,67 @@
+import functools
+import sqlite3
+import threading
+
+# Kept free of third-party imports: the spawned extraction workers import modules that use these helpers
+
+
+class ThreadLocalConnection:
+    """
+    Per-thread SQLite connections to one database file, opened on first use in WAL mode.
+
+    Call the instance to get the calling thread's connection (sqlite3 connections must not be shared
+    across threads); the extra keyword arguments are passed to sqlite3.connect.
+
+    Args:
+        path (str): Database file, normally from setup.get_db_path
+        synchronous (str): PRAGMA synchronous level to set, e.g. "NORMAL"; SQLite's default if None
+        row_factory: Row factory for the connections, e.g. sqlite3.Row
+    """
+
+    def __init__(self, path: str, synchronous: str = None, row_factory=None, **connect_kwargs):
+        self.path = path
+        self.synchronous = synchronous
+        self.row_factory = row_factory
+        self.connect_kwargs = {"timeout": 30, **connect_kwargs}
+        self._local = threading.local()
+
+    def __call__(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, **self.connect_kwargs)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute("PRAGMA journal_mode=WAL")
+            if self.synchronous:
+                conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
+
+
+def process_singleton(factory):
+    """
+    Decorator returning one process-wide result of factory per distinct arguments.
+
+    The first call builds it under a lock (double-checked, so later calls take no lock); for the
+    get_x() accessors of caches, stores, pools and clients shared by every session and thread.
+    The wrapper's discard(*args) forgets an instance and returns it, so the next call builds a new one.
+    """
+    instances = {}
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get(*args):
+        instance = instances.get(args)
+        if instance is None:
+            with lock:
+                instance = instances.get(args)
+                if instance is None:
+                    instance = instances[args] = factory(*args)
+        return instance
+
+    def discard(*args):
+        with lock:
+            return instances.pop(args, None)
+
+    get.discard = discard
+    return get
@@ -0,0 +1,138 @@
+import logging
+import threading
+
+from shared_state import process_singleton
+
+logger = logging.getLogger(__name__)
+
+
+class FlightAbandoned(Exception):
+    """The leader of a flight stopped without an outcome to share (e.g. its Streamlit session reran)."""
+
+
+class Flight:
+    """One in-flight call: its progress events so far and, once finished, its result or error."""
+
+    def __init__(self, key):
+        self.key = key
+        self.events = []
+        self.followers = 0
+        self.done = False
+        self.result = None
+        self.error = None
+        self.abandoned = False
+        self._cond = threading.Condition()
+
+    def publish(self, event) -> None:
+        """Record a progress event; waiting followers receive it (late joiners get the whole history)."""
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def _finish(self, result=None, error: Exception = None, abandoned: bool = False) -> None:
+        with self._cond:
+            self.result = result
+            self.error = error
+            self.abandoned = abandoned
+            self.done = True
+            self._cond.notify_all()
+
+    def wait(self, on_event=None):
+        """
+        Replay and then follow the progress events until the call finishes; return its result or raise its error.
+
+        Raises FlightAbandoned when the leader stopped without a result or error to share.
+        """
+        seen = 0
+        while True:
+            with self._cond:
+                while len(self.events) == seen and not self.done:
+                    self._cond.wait()
+                pending = self.events[seen:]
+                seen = len(self.events)
+                done = self.done
+            if on_event:
+                for event in pending:
+                    on_event(event)
+            if done:
+                break
+        if self.abandoned:
+            raise FlightAbandoned(self.key)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers arriving while it runs attach to that
+    flight, receive its progress events and get the same result (or exception). Keys are released
+    as soon as the call finishes, so nothing is cached past the in-flight window.
+
+    Only results and Exceptions are shared. When the leader is interrupted by a BaseException
+    (Streamlit's RerunException and StopException, KeyboardInterrupt ...) the flight is abandoned
+    and a waiting follower runs its own fn instead, so one session's rerun never stops another.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key) -> bool:
+        with self._lock:
+            return key in self._flights
+
+    def run(self, key, fn, on_event=None) -> tuple:
+        """
+        Run fn(publish) unless a call with the same key is already running, in which case wait for it.
+
+        Args:
+            key: Hashable identity of the call's inputs
+            fn: Callable taking one argument, a publish(event) function for progress events
+            on_event: Called with each progress event when this caller is a follower
+
+        Returns:
+            tuple: (result, whether it came from another caller's flight)
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Flight(key)
+                else:
+                    flight.followers += 1
+            if leader:
+                break
+            logger.info("%s: joined in-flight call %s", self.name, key)
+            try:
+                return flight.wait(on_event), True
+            except FlightAbandoned:
+                logger.info("%s: leader of call %s stopped; taking over", self.name, key)
+
+        try:
+            result = fn(flight.publish)
+        except Exception as e:
+            self._land(key, flight, error=e)
+            raise
+        except BaseException:
+            self._land(key, flight, abandoned=True)
+            raise
+        self._land(key, flight, result=result)
+        return result, False
+
+    def _land(self, key, flight: Flight, **outcome) -> None:
+        # Release the key before waking the followers, so one that takes over starts a new flight
+        with self._lock:
+            self._flights.pop(key, None)
+        flight._finish(**outcome)
+        if flight.followers:
+            logger.info("%s: call %s served %d follower(s)", self.name, key, flight.followers)
+
+@process_singleton
+def get_single_flight(name: str) -> SingleFlight:
+    """Return the process-wide SingleFlight group for a kind of call (shared by all Streamlit sessions)."""
+    return SingleFlight(name)
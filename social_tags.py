@@ -0,0 +1,214 @@
+import logging
+import re
+from collections import Counter, deque
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
+
+from extract import EXTRACTION_WORKERS, get_extraction_pool, reset_extraction_pool
+from models import SocialMediaMetrics
+from sentiment import get_sentiment_engine
+
+logger = logging.getLogger(__name__)
+
+# Hashtags need a letter (so "#1" is not one); mentions are @name or Reddit's u/name; cashtags are $ + 1-5 letters.
+# The look-behinds skip URL fragments, e-mail addresses, HTML entities and path segments.
+TAG_RE = re.compile(
+    r"(?<![\w#@$&/])(?:"
+    r"#(?P<hashtag>\d*[^\W\d_][\w]{0,49})"
+    r"|(?:@|\bu/)(?P<mention>\w[\w-]{1,29})"
+    r"|\$(?P<cashtag>[A-Za-z]{1,5}(?:\.[A-Za-z]{1,2})?)(?![\w$])"
+    r")"
+)
+SIGILS = {"hashtag": "#", "mention": "@", "cashtag": "$"}
+SHARD_DOCS = 2000
+# Below this many documents the pool's start-up and pickling cost more than counting in-process
+PARALLEL_MIN_DOCS = 10000
+# Shards submitted to the pool but not yet merged; bounds the documents held in memory
+MAX_PENDING_SHARDS = 2 * EXTRACTION_WORKERS
+NEUTRAL_THRESHOLD = 0.05
+TOP_TAGS = {"hashtag": 10, "mention": 5, "cashtag": 5}
+
+
+def _normalize(match) -> tuple:
+    kind = match.lastgroup
+    value = match.group(kind)
+    value = value.upper() if kind == "cashtag" else value.lower()
+    return kind, f"{SIGILS[kind]}{value}"
+
+
+class TagCounter:
+    """
+    Mergeable tallies of #hashtags, @mentions and $cashtags.
+
+    Per tag: occurrences, documents using it, reach (the summed weight of those documents) and
+    summed sentiment compound of those documents. Counters built on separate shards combine with
+    + (or merge) into the same result as counting everything at once.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.documents = Counter()
+        self.reach = Counter()
+        self.compound = Counter()
+        self.kinds = {}
+        self.total_documents = 0
+
+    def update(self, documents) -> "TagCounter":
+        """
+        Count the tags in (text, reach) pairs.
+
+        Sentiment is scored only for the documents that contain a tag.
+        """
+        tagged = []
+        for text, reach in documents:
+            self.total_documents += 1
+            if not text or not ("#" in text or "@" in text or "$" in text or "u/" in text):
+                continue
+            tags = [_normalize(match) for match in TAG_RE.finditer(text)]
+            if not tags:
+                continue
+            for kind, tag in tags:
+                self.counts[tag] += 1
+                self.kinds[tag] = kind
+            distinct = {tag for _, tag in tags}
+            for tag in distinct:
+                self.documents[tag] += 1
+                self.reach[tag] += reach
+            tagged.append((text, distinct))
+        if tagged:
+            results = get_sentiment_engine().analyze([text for text, _ in tagged])
+            for (_, distinct), result in zip(tagged, results):
+                for tag in distinct:
+                    self.compound[tag] += result["compound"]
+        return self
+
+    def merge(self, other: "TagCounter") -> "TagCounter":
+        self.counts.update(other.counts)
+        self.documents.update(other.documents)
+        self.reach.update(other.reach)
+        self.compound.update(other.compound)
+        self.kinds.update(other.kinds)
+        self.total_documents += other.total_documents
+        return self
+
+    def __add__(self, other: "TagCounter") -> "TagCounter":
+        return TagCounter().merge(self).merge(other)
+
+    def top(self, kind: str, n: int) -> list:
+        """The n most used tags of one kind ("hashtag", "mention" or "cashtag")."""
+        return [tag for tag, _ in self.counts.most_common() if self.kinds[tag] == kind][:n]
+
+    def metrics(self, tag: str) -> SocialMediaMetrics:
+        documents = self.documents[tag]
+        compound = self.compound[tag] / documents if documents else 0.0
+        if compound >= NEUTRAL_THRESHOLD:
+            sentiment = "Positive"
+        elif compound <= -NEUTRAL_THRESHOLD:
+            sentiment = "Negative"
+        else:
+            sentiment = "Neutral"
+        return SocialMediaMetrics(
+            hashtag=tag,
+            count=self.counts[tag],
+            engagement_rate=round(documents / max(self.total_documents, 1) * 100, 2),
+            reach=int(self.reach[tag]),
+            sentiment=sentiment,
+        )
+
+
+def _count_shard(documents: list) -> TagCounter:
+    return TagCounter().update(documents)
+
+
+def iter_documents(reddit_data: dict = None, article_texts=(), snippets=()):
+    """
+    Yield (text, reach) for every text to scan.
+
+    Reddit posts and comments weigh their score (at least 1); articles and search snippets weigh 1.
+    """
+    if reddit_data and "error" not in reddit_data:
+        yield f"{reddit_data.get('title', '')} {reddit_data.get('selftext', '')}", max(reddit_data.get("score") or 0, 1)
+        for comment in reddit_data.get("comments") or reddit_data.get("top_comments") or []:
+            if not comment.get("is_deleted"):
+                yield comment.get("body", ""), max(comment.get("score") or 0, 1)
+    for text in article_texts or ():
+        if text:
+            yield text, 1
+    for text in snippets or ():
+        if text:
+            yield text, 1
+
+
+def count_tags(documents, parallel_min_docs: int = PARALLEL_MIN_DOCS) -> TagCounter:
+    """
+    Count tags over a stream of (text, reach) pairs.
+
+    The stream is read in shards of SHARD_DOCS; large inputs are counted one shard per task on the
+    extraction process pool, with at most MAX_PENDING_SHARDS shards submitted ahead of the merge,
+    so the stream is never held in memory as a whole. Small inputs are counted in this process.
+    """
+    documents = iter(documents)
+    first = list(islice(documents, parallel_min_docs))
+    if len(first) < parallel_min_docs:
+        return _count_shard(first)
+
+    shards = chain(
+        (first[i:i + SHARD_DOCS] for i in range(0, len(first), SHARD_DOCS)),
+        iter(lambda: list(islice(documents, SHARD_DOCS)), []),
+    )
+    total = TagCounter()
+    pending = deque()  # (shard, future), oldest first
+    unsubmitted = []  # the shard being submitted, already taken from the stream
+    try:
+        pool = get_extraction_pool()
+        for shard in shards:
+            unsubmitted = shard
+            pending.append((shard, pool.submit(_count_shard, shard)))
+            unsubmitted = []
+            if len(pending) >= MAX_PENDING_SHARDS:
+                total.merge(pending[0][1].result())
+                pending.popleft()
+        while pending:
+            total.merge(pending[0][1].result())
+            pending.popleft()
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        logger.warning("Tag counting pool unavailable (%s); counting in-process", e)
+        reset_extraction_pool()
+        # Shards not merged yet, the one whose submit failed, then the rest of the stream
+        for shard in chain((shard for shard, _ in pending), [unsubmitted], shards):
+            total.merge(_count_shard(shard))
+    return total
+
+
+def merge_hashtags(measured: list, reported: list) -> list:
+    """Measured hashtags first, then reported ones not already present (case-insensitive)."""
+    seen, merged = set(), []
+    for tag in list(measured) + list(reported):
+        key = tag.lower() if tag.startswith("#") else f"#{tag.lower()}"
+        if key not in seen:
+            seen.add(key)
+            merged.append(tag if tag.startswith("#") else f"#{tag}")
+    return merged
+
+
+def format_tag_counts(counter: TagCounter, limit: int = 8) -> str:
+    """One-line summary of the most used hashtags for task prompts; empty when there are none."""
+    return ", ".join(
+        f"{tag} ({counter.counts[tag]} uses in {counter.documents[tag]} posts/comments)"
+        for tag in counter.top("hashtag", limit)
+    )
+
+
+def apply_social_tags(report, article_texts=(), reddit_data: dict = None, snippets=()) -> None:
+    """Fill the report's hashtag metrics and top hashtags from counts over all scraped text."""
+    counter = count_tags(iter_documents(reddit_data, article_texts, snippets))
+    if not counter.counts:
+        return
+    tags = [tag for kind, n in TOP_TAGS.items() for tag in counter.top(kind, n)]
+    report.hashtag_metrics = [counter.metrics(tag) for tag in tags]
+    report.top_hashtags = merge_hashtags(counter.top("hashtag", TOP_TAGS["hashtag"]), report.top_hashtags)
+    kinds = Counter(counter.kinds.values())
+    report.platform_facts = [f for f in report.platform_facts if not f.startswith("Tags used")] + [
+        f"Tags used: {kinds['hashtag']} distinct hashtags, {kinds['mention']} mentioned accounts and "
+        f"{kinds['cashtag']} cashtags across {counter.total_documents} texts"
+    ]
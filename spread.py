@@ -0,0 +1,320 @@
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from canonical import canonicalize_url
+from models import CoordinationPattern
+from setup import get_db_path
+from shared_state import ThreadLocalConnection, process_singleton
+
+logger = logging.getLogger(__name__)
+
+SPREAD_CACHE_TTL = 6 * 3600
+INFO_BATCH_SIZE = 100
+MAX_SPREAD_POSTS = 500
+# An account posting the link to this many subreddits is reported as a hub
+HUB_MIN_SUBREDDITS = 3
+# Subreddits reached within the first hour at which fan-out counts as fully "fast"
+FAST_FANOUT_SUBREDDITS = 5
+MAX_TIMELINE_EVENTS = 50
+# How a post is linked to its parent in a SpreadGraph
+ROOT, CROSSPOST, SAME_AUTHOR, FALLBACK = 0, 1, 2, 3
+
+
+class SpreadCache:
+    """Posts sharing a link (by canonical link or post fullname) in SQLite, with an in-memory layer."""
+
+    def __init__(self, path: str = None, ttl: int = SPREAD_CACHE_TTL):
+        self.path = path or get_db_path("spread.db")
+        self.ttl = ttl
+        self._memory = {}
+        self._connection = ThreadLocalConnection(self.path)
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS spread (
+                link TEXT PRIMARY KEY,
+                posts TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+
+    def get(self, link: str):
+        """Return the cached, unexpired posts for a link, or None."""
+        cutoff = time.time() - self.ttl
+        entry = self._memory.get(link)
+        if entry is not None and entry[1] >= cutoff:
+            return entry[0]
+        row = self._connection().execute(
+            "SELECT posts, fetched_at FROM spread WHERE link = ? AND fetched_at >= ?", (link, cutoff)
+        ).fetchone()
+        if row is None:
+            return None
+        posts = json.loads(row[0])
+        self._memory[link] = (posts, row[1])
+        return posts
+
+    def put(self, link: str, posts: list) -> None:
+        now = time.time()
+        self._memory[link] = (posts, now)
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO spread VALUES (?, ?, ?)", (link, json.dumps(posts), now))
+
+
+@process_singleton
+def get_spread_cache() -> SpreadCache:
+    """Return the process-wide spread cache."""
+    return SpreadCache()
+
+
+def _post_record(submission) -> dict:
+    return {
+        "id": submission.id,
+        "subreddit": submission.subreddit.display_name,
+        "author": str(submission.author) if submission.author else None,
+        "created_utc": submission.created_utc,
+        "score": submission.score,
+        "num_comments": submission.num_comments,
+        "permalink": submission.permalink,
+        # Fullname (t3_...) of the post this one was cross-posted from, if any
+        "crosspost_parent": getattr(submission, "crosspost_parent", None),
+    }
+
+
+def fetch_spread(reddit, submission, max_posts: int = MAX_SPREAD_POSTS) -> list:
+    """
+    Find the other posts of a submission's link across subreddits, through the cache.
+
+    Uses the submission's duplicates listing (Reddit's "other discussions", which includes
+    cross-posts), a search by link URL for link posts, and batched by-fullname lookups of
+    cross-post parents that neither listing returned.
+
+    Args:
+        reddit: A PRAW Reddit client
+        submission: The PRAW submission
+        max_posts (int): Cap on the posts read from each listing
+
+    Returns:
+        list: Post records (subreddit, author, created_utc, ...) in time order, the submission included
+    """
+    is_self = getattr(submission, "is_self", False)
+    key = submission.name if is_self else canonicalize_url(submission.url)
+    cache = get_spread_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    posts = {submission.id: _post_record(submission)}
+    listings = [submission.duplicates(limit=max_posts)]
+    if not is_self:
+        listings.append(reddit.info(url=submission.url))
+    for listing in listings:
+        try:
+            for post in islice(listing, max_posts):
+                posts.setdefault(post.id, _post_record(post))
+        except Exception as e:
+            logger.warning("Spread listing failed for %s: %s", key, e)
+
+    parents = sorted({p["crosspost_parent"] for p in posts.values()
+                      if p["crosspost_parent"] and p["crosspost_parent"][3:] not in posts})
+    for i in range(0, len(parents), INFO_BATCH_SIZE):
+        try:
+            for post in reddit.info(fullnames=parents[i:i + INFO_BATCH_SIZE]):
+                posts.setdefault(post.id, _post_record(post))
+        except Exception as e:
+            logger.warning("Cross-post parent lookup failed: %s", e)
+
+    result = sorted(posts.values(), key=lambda p: p["created_utc"] or 0)
+    cache.put(key, result)
+    logger.info("Spread of %s: %d post(s) in %d subreddit(s)", key, len(result), len({p["subreddit"] for p in result}))
+    return result
+
+
+class SpreadGraph:
+    """
+    Time-ordered propagation graph of the posts sharing one link.
+
+    Nodes are posts in time order; node i's parent is the post it was cross-posted from when
+    Reddit records one, otherwise the same author's previous post of the link, otherwise the
+    earliest post. edge_kind records which of these (CROSSPOST, SAME_AUTHOR or FALLBACK; ROOT for
+    the first post) linked each post; only the first two are evidence that one post led to another.
+    Children are stored as CSR arrays (indptr, children), so node i's children are
+    children[indptr[i]:indptr[i + 1]].
+    """
+
+    def __init__(self, posts: list):
+        self.posts = sorted(posts, key=lambda p: p["created_utc"] or 0)
+        n = len(self.posts)
+        self.times = np.array([p["created_utc"] or 0 for p in self.posts], dtype=np.float64)
+        self.subreddit, self.subreddit_names = pd.factorize(pd.Series([p["subreddit"] for p in self.posts], dtype=object))
+        self.author, self.author_names = pd.factorize(pd.Series([p["author"] for p in self.posts], dtype=object))
+        self.parent, self.edge_kind = self._link_parents(n)
+        linked = np.flatnonzero(self.parent >= 0)
+        order = linked[np.argsort(self.parent[linked], kind="stable")]
+        self.children = order.astype(np.int32)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(self.parent[linked], minlength=n))]).astype(np.int32)
+
+    def _link_parents(self, n: int) -> tuple:
+        # Fallback: the earliest post
+        parent = np.zeros(n, dtype=np.int32)
+        kind = np.full(n, FALLBACK, dtype=np.int8)
+        if n:
+            parent[0] = -1
+            kind[0] = ROOT
+        # Same author's previous post of the link
+        rows = pd.Series(np.arange(n))
+        previous = rows.groupby(self.author).shift(1).to_numpy()
+        has_previous = (self.author >= 0) & ~np.isnan(previous)
+        parent[has_previous] = previous[has_previous].astype(np.int32)
+        kind[has_previous] = SAME_AUTHOR
+        # Recorded cross-post parents take precedence
+        index = {f"t3_{p['id']}": i for i, p in enumerate(self.posts)}
+        for i, post in enumerate(self.posts):
+            source = index.get(post["crosspost_parent"] or "")
+            if source is not None and source != i:
+                parent[i] = source
+                kind[i] = CROSSPOST
+        return parent, kind
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def evidenced_out_degree(self) -> np.ndarray:
+        """Children per post linked by a cross-post or the same author, leaving out fallback edges."""
+        linked = (self.edge_kind == CROSSPOST) | (self.edge_kind == SAME_AUTHOR)
+        return np.bincount(self.parent[linked], minlength=len(self.posts))
+
+    def depth(self) -> np.ndarray:
+        """Cascade depth of every post (0 for the first)."""
+        depth = np.zeros(len(self.posts), dtype=np.int32)
+        # Parents precede children in time except for mis-ordered cross-post timestamps
+        for i in np.argsort(self.times, kind="stable"):
+            if self.parent[i] >= 0:
+                depth[i] = depth[self.parent[i]] + 1
+        return depth
+
+    def summary(self) -> dict:
+        """
+        Fan-out speed and hub accounts.
+
+        Returns:
+            dict: posts, subreddits, subreddits_1h, subreddits_24h, hours_to_all_subreddits,
+            subreddits_per_hour (over the first day), max_depth and hubs (author, subreddits, posts,
+            reposted_from: posts cross-posted from or re-posted after theirs; fallback edges do not count)
+        """
+        n = len(self.posts)
+        if n == 0:
+            return {"posts": 0, "subreddits": 0, "hubs": []}
+        elapsed = self.times - self.times[0]
+        _, first_seen = np.unique(self.subreddit, return_index=True)
+        first_seen_hours = np.sort(elapsed[first_seen]) / 3600
+        within_day = first_seen_hours[first_seen_hours <= 24]
+        spread_hours = max(float(within_day[-1]), 1.0)
+
+        hubs = []
+        known = self.author >= 0
+        if known.any():
+            pairs = np.unique(np.stack([self.author[known], self.subreddit[known]]), axis=1)
+            per_author_subreddits = np.bincount(pairs[0], minlength=len(self.author_names))
+            per_author_posts = np.bincount(self.author[known], minlength=len(self.author_names))
+            reposted = np.bincount(self.author[known], weights=self.evidenced_out_degree()[known], minlength=len(self.author_names))
+            for code in np.flatnonzero(per_author_subreddits >= HUB_MIN_SUBREDDITS):
+                hubs.append({
+                    "author": self.author_names[code],
+                    "subreddits": int(per_author_subreddits[code]),
+                    "posts": int(per_author_posts[code]),
+                    "reposted_from": int(reposted[code]),
+                })
+            hubs.sort(key=lambda h: (h["subreddits"], h["posts"]), reverse=True)
+
+        return {
+            "posts": n,
+            "subreddits": len(self.subreddit_names),
+            "subreddits_1h": int((first_seen_hours <= 1).sum()),
+            "subreddits_24h": len(within_day),
+            "hours_to_all_subreddits": round(float(first_seen_hours[-1]), 2),
+            "subreddits_per_hour": round((len(within_day) - 1) / spread_hours, 2),
+            "max_depth": int(self.depth().max()),
+            "hubs": hubs,
+        }
+
+    def timeline(self, limit: int = MAX_TIMELINE_EVENTS) -> list:
+        """The first posts as manipulation-timeline events."""
+        events = []
+        for i, post in enumerate(self.posts[:limit]):
+            parent, kind = int(self.parent[i]), self.edge_kind[i]
+            if kind == ROOT:
+                event = "first post"
+            elif kind == CROSSPOST:
+                event = "cross-post"
+            elif kind == SAME_AUTHOR:
+                event = "repost by same author"
+            else:
+                event = "independent post"
+            events.append({
+                "time": datetime.fromtimestamp(self.times[i], tz=timezone.utc).strftime("%Y-%m-%d %H:%M"),
+                "subreddit": f"r/{post['subreddit']}",
+                "author": f"u/{post['author']}" if post["author"] else "[deleted]",
+                "event": event,
+                "from": f"r/{self.posts[parent]['subreddit']}" if parent >= 0 else "",
+                "score": post["score"],
+                "comments": post["num_comments"],
+            })
+        return events
+
+
+def spread_patterns(graph: SpreadGraph, summary: dict) -> list:
+    """CoordinationPattern objects for fast cross-subreddit fan-out and hub accounts."""
+    if summary["subreddits"] < 2:
+        return []
+    first = graph.posts[0]
+    reached = [f"r/{name}" for name in graph.subreddit_names[:10]]
+    top_hub_share = max((h["posts"] for h in summary["hubs"]), default=0) / summary["posts"]
+    speed = min(1.0, (summary["subreddits_1h"] - 1) / (FAST_FANOUT_SUBREDDITS - 1))
+    patterns = [CoordinationPattern(
+        pattern_type="Cross-subreddit link spread",
+        strength=round(0.6 * speed + 0.4 * top_hub_share, 2),
+        entities_involved=reached,
+        timeline=(
+            f"{summary['posts']} posts in {summary['subreddits']} subreddits starting in r/{first['subreddit']}; "
+            f"{summary['subreddits_1h']} subreddits within 1 h, {summary['subreddits_24h']} within 24 h "
+            f"({summary['subreddits_per_hour']:.1f}/h); all reached after {summary['hours_to_all_subreddits']:.1f} h"
+        ),
+    )]
+    for hub in summary["hubs"][:5]:
+        subreddits = sorted({f"r/{p['subreddit']}" for p in graph.posts if p["author"] == hub["author"]})
+        patterns.append(CoordinationPattern(
+            pattern_type="Hub account cross-posting",
+            strength=round(min(1.0, hub["subreddits"] / 10), 2),
+            entities_involved=[f"u/{hub['author']}"] + subreddits[:10],
+            timeline=f"Posted the link {hub['posts']} times in {hub['subreddits']} subreddits; "
+                     f"{hub['reposted_from']} later post(s) descend from theirs",
+        ))
+    return patterns
+
+
+def apply_spread(report, reddit_data: dict) -> None:
+    """
+    Add measured spread patterns, the propagation timeline and a platform fact to a report.
+
+    Call after the coordination patterns have been set (see coordination.measure_coordination).
+    """
+    posts = (reddit_data or {}).get("spread") or []
+    if len(posts) < 2:
+        return
+    graph = SpreadGraph(posts)
+    summary = graph.summary()
+    analysis = report.propaganda_analysis
+    analysis.coordination_patterns = [
+        p for p in analysis.coordination_patterns
+        if p.pattern_type not in ("Cross-subreddit link spread", "Hub account cross-posting")
+    ] + spread_patterns(graph, summary)
+    analysis.manipulation_timeline = graph.timeline()
+    report.platform_facts = [f for f in report.platform_facts if not f.startswith("Link spread")] + [
+        f"Link spread: posted {summary['posts']} times in {summary['subreddits']} subreddits, "
+        f"{summary['subreddits_1h']} of them within the first hour; {len(summary['hubs'])} hub account(s)"
+    ]
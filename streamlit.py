@@ -6,7 +6,16 @@ import seaborn as sns
 from datetime import datetime
 import logging
 from app import run_news_analysis, get_report_as_markdown
-from reddit import scrape_reddit_data, extract_keywords, is_reddit_url
+from reddit import scrape_reddit_data, extract_keywords, is_reddit_url, collect_similar_posts_series
+from report_store import get_report_store
+from reputation import source_reliabilities
+from models import TIME_SERIES_ADAPTER
+from batch import run_batch_analysis
+from canonical import canonicalize_url
+from singleflight import get_single_flight
+from fast_tier import PRELIMINARY_NOTE, build_fast_report, merge_task_outputs
+from thread_analytics import thread_facts
+from profiler import profiling_enabled
 import traceback
 from setup import setup_crewai_config, setup_api_keys, check_gemini_status
 
@@ -29,6 +38,218 @@ def check_gemini_connection():
 
 
 
+def _show_summary(report):
+    st.title(f"News Analysis Report: {getattr(report, 'query_summary', 'Unknown Topic')}")
+    
+    st.header("Key Findings & Summary")
+    st.write(getattr(report, 'key_findings', 'No key findings available'))
+
+def _show_related_articles(report):
+    st.header("Related Articles")
+    related_articles = getattr(report, 'related_articles', [])
+    if related_articles:
+        for article in related_articles:
+            st.markdown(f"- [{article.title}]({article.url}) ({article.source})")
+    else:
+        st.write("No related articles found")
+
+def _show_related_words(report):
+    st.header("Related Words")
+    st.write("*Keywords found in the analysis:*")
+    related_words = getattr(report, 'related_words', [])
+    if related_words:
+        st.write(", ".join(related_words))
+    else:
+        st.write("No related words found")
+
+def _show_topic_clusters(report):
+    st.header("Related Topic Clusters")
+    topic_clusters = getattr(report, 'topic_clusters', [])
+    if topic_clusters:
+        for cluster in topic_clusters:
+            if isinstance(cluster, dict):
+                st.markdown(f"- **{cluster.get('topic', 'N/A')}** (Size: {cluster.get('size', 'N/A')})")
+                related_narratives = cluster.get('related_narratives', [])
+                if related_narratives:
+                    st.markdown("  - Related narratives: " + ", ".join(related_narratives))
+    else:
+        st.write("No topic clusters found")
+
+def _show_top_sources(report):
+    st.header("List of Top Sources")
+    top_sources = getattr(report, 'top_sources', [])
+    if top_sources:
+        # Factual ratings come from the local reputation index; the score is the one apply_reputation set
+        ratings = source_reliabilities(report)
+        sources_data = []
+        for source, rating in zip(top_sources, ratings):
+            sources_data.append({
+                "Source": source.name,
+                "Domain": rating.domain,
+                "Factual Rating": rating.factual_rating,
+                "Reliability Score": source.reliability_score,
+                "Articles Count": rating.articles_count
+            })
+        st.dataframe(pd.DataFrame(sources_data))
+        plot_source_reliability(ratings)
+    else:
+        st.write("No source data available")
+
+def _show_top_hashtags(report):
+    st.header("Top Hashtags")
+    hashtag_metrics = getattr(report, 'hashtag_metrics', [])
+    if hashtag_metrics:
+        # Counted locally over the thread, articles and search snippets
+        st.dataframe(pd.DataFrame([{
+            "Tag": metric.hashtag,
+            "Uses": metric.count,
+            "Engagement Rate": metric.engagement_rate,
+            "Reach": metric.reach,
+            "Sentiment": metric.sentiment
+        } for metric in hashtag_metrics]))
+        if getattr(report, 'top_hashtags', []):
+            st.write("**Hashtags:** " + ", ".join(report.top_hashtags))
+        plot_social_media_metrics(hashtag_metrics)
+        return
+    top_hashtags = getattr(report, 'top_hashtags', [])
+    if top_hashtags:
+        hashtags_data = []
+        for hashtag in top_hashtags:
+            hashtags_data.append({
+                "Hashtag": getattr(hashtag, 'hashtag', 'N/A'),
+                "Engagement Rate": getattr(hashtag, 'engagement_rate', 0.0),
+                "Reach": getattr(hashtag, 'reach', 0),
+                "Sentiment": getattr(hashtag, 'sentiment', 'N/A')
+            })
+        st.dataframe(pd.DataFrame(hashtags_data))
+        plot_social_media_metrics(top_hashtags)
+    else:
+        st.write("No hashtag data available")
+
+def _show_time_series(report):
+    st.header("Similar Posts Over Time")
+    similar_posts_time_series = getattr(report, 'similar_posts_time_series', [])
+    if similar_posts_time_series:
+        # One serializer call for the whole series instead of per-entry attribute lookups
+        df_time_series = pd.DataFrame(TIME_SERIES_ADAPTER.dump_python(list(similar_posts_time_series)))
+        df_time_series = df_time_series.rename(columns={"date": "Date", "count": "Count"})
+        df_time_series['Date'] = pd.to_datetime(df_time_series['Date'])
+        df_time_series = df_time_series.sort_values(by='Date')
+        st.dataframe(df_time_series)
+        plot_time_series_data(df_time_series)
+    else:
+        st.write("No time series data available")
+
+def _show_propaganda_analysis(report):
+    st.header("Propaganda Analysis")
+    propaganda_analysis = getattr(report, 'propaganda_analysis', None)
+    if propaganda_analysis:
+        st.subheader("Overall Reliability Score")
+        st.write(f"{getattr(propaganda_analysis, 'overall_reliability_score', 'N/A')}/100")
+
+        propaganda_techniques = getattr(propaganda_analysis, 'propaganda_techniques', [])
+        if propaganda_techniques:
+            st.subheader("Propaganda Techniques Detected")
+            tech_data = []
+            for tech in propaganda_techniques:
+                tech_data.append({
+                    "Technique": getattr(tech, 'technique_name', 'N/A'),
+                    "Frequency": getattr(tech, 'frequency', 0),
+                    "Severity": getattr(tech, 'severity', 0.0),
+                    "Example": getattr(tech, 'example', 'N/A'),
+                    "Explanation": getattr(tech, 'explanation', 'N/A')
+                })
+            st.dataframe(pd.DataFrame(tech_data))
+            plot_propaganda_techniques(propaganda_techniques)
+        else:
+            st.write("No propaganda techniques detected.")
+
+        misinformation_indicators = getattr(propaganda_analysis, 'misinformation_indicators', [])
+        if misinformation_indicators:
+            st.subheader("Misinformation Indicators")
+            for indicator in misinformation_indicators:
+                st.markdown(f"- **Type**: {getattr(indicator, 'indicator_type', 'N/A')}")
+                st.markdown(f"  **Confidence**: {getattr(indicator, 'confidence', 'N/A')}")
+                st.markdown(f"  **Correction**: {getattr(indicator, 'correction', 'N/A')}")
+                st.markdown(f"  **Source Verification**: {', '.join(getattr(indicator, 'source_verification', []))}")
+        else:
+            st.write("No misinformation indicators detected.")
+
+        coordination_patterns = getattr(propaganda_analysis, 'coordination_patterns', [])
+        if coordination_patterns:
+            st.subheader("Coordination Patterns")
+            st.dataframe(pd.DataFrame([{
+                "Pattern": getattr(pattern, 'pattern_type', 'N/A'),
+                "Strength": getattr(pattern, 'strength', 0.0),
+                "Entities": ", ".join(getattr(pattern, 'entities_involved', [])),
+                "Timeline": getattr(pattern, 'timeline', 'N/A')
+            } for pattern in coordination_patterns]))
+        else:
+            st.write("No coordinated posting detected.")
+
+        manipulation_timeline = getattr(propaganda_analysis, 'manipulation_timeline', [])
+        if manipulation_timeline:
+            st.subheader("Spread Timeline")
+            st.dataframe(pd.DataFrame(manipulation_timeline))
+
+        bot_metrics = getattr(propaganda_analysis, 'bot_activity_metrics', None)
+        if bot_metrics and getattr(bot_metrics, 'account_creation_patterns', ''):
+            st.subheader("Bot Activity")
+            st.metric("Bot Likelihood", f"{bot_metrics.bot_likelihood_score * 100:.1f}%")
+            content_metrics = getattr(getattr(report, 'content_analysis', None), 'metrics', None)
+            if content_metrics:
+                st.write(f"**Comments from likely bots:** {content_metrics.bot_like_activity_percentage}%")
+            st.write(f"**Account creation patterns:** {bot_metrics.account_creation_patterns}")
+            for indicator in bot_metrics.behavioral_indicators:
+                st.markdown(f"- {indicator}")
+            st.write(f"**Network analysis:** {bot_metrics.network_analysis}")
+
+        fake_news_sites = getattr(propaganda_analysis, 'fake_news_sites', [])
+        if fake_news_sites:
+            st.subheader("Associated Fake News Sites")
+            fake_news_data = []
+            for site in fake_news_sites:
+                fake_news_data.append({
+                    "Domain": getattr(site, 'domain', 'N/A'),
+                    "Shares": getattr(site, 'shares', 0),
+                    "Engagement": getattr(site, 'engagement', 0),
+                    "Known False Stories": getattr(site, 'known_false_stories', 0)
+                })
+            st.dataframe(pd.DataFrame(fake_news_data))
+            plot_fake_news_sites(fake_news_sites)
+        else:
+            st.write("No fake news sites identified.")
+
+    else:
+        st.write("No propaganda analysis available.")
+
+def _show_thread_analytics(report):
+    analytics = getattr(report, 'thread_analytics', None)
+    if not analytics or not analytics.comment_count:
+        return
+    st.header("Comment Thread Analytics")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Comments", f"{analytics.comment_count:,}")
+    col2.metric("Authors", f"{analytics.author_count:,}")
+    col3.metric("Author Gini", f"{analytics.author_gini:.2f}")
+    col4.metric("Deleted/Removed", f"{analytics.deleted_percentage:.1f}%")
+    for fact in thread_facts(analytics):
+        st.markdown(f"- {fact}")
+    plot_thread_analytics(analytics)
+
+# Report sections in display order, with the report fields each one renders
+REPORT_SECTIONS = [
+    (("query_summary", "key_findings"), _show_summary),
+    (("related_articles",), _show_related_articles),
+    (("related_words",), _show_related_words),
+    (("topic_clusters",), _show_topic_clusters),
+    (("top_sources", "related_articles"), _show_top_sources),
+    (("top_hashtags", "hashtag_metrics"), _show_top_hashtags),
+    (("similar_posts_time_series",), _show_time_series),
+    (("thread_analytics",), _show_thread_analytics),
+    (("propaganda_analysis", "content_analysis"), _show_propaganda_analysis),
+]
+
 def display_report(report):
     """Display the news analysis report in the Streamlit interface"""
     if not report:
@@ -42,177 +263,63 @@ def display_report(report):
         return
         
     try:
-        # Handle structured reports (if available)
-        st.title(f"News Analysis Report: {getattr(report, 'query_summary', 'Unknown Topic')}")
-        
-        st.header("Key Findings & Summary")
-        st.write(getattr(report, 'key_findings', 'No key findings available'))
-        
-        # Related Articles
-        st.header("Related Articles")
-        related_articles = getattr(report, 'related_articles', [])
-        if related_articles:
-            for article in related_articles:
-                if isinstance(article, dict):
-                    for title, url in article.items():
-                        st.markdown(f"- [{title}]({url})")
-        else:
-            st.write("No related articles found")
-        
-        # Related Words (wordcloud)
-        st.header("Related Words")
-        st.write("*Keywords found in the analysis:*")
-        related_words = getattr(report, 'related_words', [])
-        if related_words:
-            st.write(", ".join(related_words))
-        else:
-            st.write("No related words found")
-        
-        # Topic Clusters
-        st.header("Related Topic Clusters")
-        topic_clusters = getattr(report, 'topic_clusters', [])
-        if topic_clusters:
-            for cluster in topic_clusters:
-                if isinstance(cluster, dict):
-                    st.markdown(f"- **{cluster.get('topic', 'N/A')}** (Size: {cluster.get('size', 'N/A')})")
-                    related_narratives = cluster.get('related_narratives', [])
-                    if related_narratives:
-                        st.markdown("  - Related narratives: " + ", ".join(related_narratives))
-        else:
-            st.write("No topic clusters found")
-        
-        # Top Sources
-        st.header("List of Top Sources")
-        top_sources = getattr(report, 'top_sources', [])
-        if top_sources:
-            sources_data = []
-            for source in top_sources:
-                sources_data.append({
-                    "Domain": getattr(source, 'domain', 'N/A'),
-                    "Factual Rating": getattr(source, 'factual_rating', 'N/A'),
-                    "Articles Count": getattr(source, 'articles_count', 0),
-                    "Engagement": getattr(source, 'engagement', 0)
-                })
-            st.dataframe(pd.DataFrame(sources_data))
-            plot_source_reliability(top_sources)
-        else:
-            st.write("No source data available")
-
-        # Top Hashtags
-        st.header("Top Hashtags")
-        top_hashtags = getattr(report, 'top_hashtags', [])
-        if top_hashtags:
-            hashtags_data = []
-            for hashtag in top_hashtags:
-                hashtags_data.append({
-                    "Hashtag": getattr(hashtag, 'hashtag', 'N/A'),
-                    "Engagement Rate": getattr(hashtag, 'engagement_rate', 0.0),
-                    "Reach": getattr(hashtag, 'reach', 0),
-                    "Sentiment": getattr(hashtag, 'sentiment', 'N/A')
-                })
-            st.dataframe(pd.DataFrame(hashtags_data))
-            plot_social_media_metrics(top_hashtags)
-        else:
-            st.write("No hashtag data available")
-
-        # Similar Posts Time Series
-        st.header("Similar Posts Over Time")
-        similar_posts_time_series = getattr(report, 'similar_posts_time_series', [])
-        if similar_posts_time_series:
-            time_series_data = []
-            for ts_entry in similar_posts_time_series:
-                time_series_data.append({
-                    "Date": getattr(ts_entry, 'date', 'N/A'),
-                    "Count": getattr(ts_entry, 'count', 0)
-                })
-            df_time_series = pd.DataFrame(time_series_data)
-            df_time_series['Date'] = pd.to_datetime(df_time_series['Date'])
-            df_time_series = df_time_series.sort_values(by='Date')
-            st.dataframe(df_time_series)
-            plot_time_series_data(df_time_series)
-        else:
-            st.write("No time series data available")
-
-        # Propaganda Analysis
-        st.header("Propaganda Analysis")
-        propaganda_analysis = getattr(report, 'propaganda_analysis', None)
-        if propaganda_analysis:
-            st.subheader("Overall Reliability Score")
-            st.write(f"{getattr(propaganda_analysis, 'overall_reliability_score', 'N/A')}/100")
-
-            propaganda_techniques = getattr(propaganda_analysis, 'propaganda_techniques', [])
-            if propaganda_techniques:
-                st.subheader("Propaganda Techniques Detected")
-                tech_data = []
-                for tech in propaganda_techniques:
-                    tech_data.append({
-                        "Technique": getattr(tech, 'technique_name', 'N/A'),
-                        "Frequency": getattr(tech, 'frequency', 0),
-                        "Severity": getattr(tech, 'severity', 0.0),
-                        "Example": getattr(tech, 'example', 'N/A'),
-                        "Explanation": getattr(tech, 'explanation', 'N/A')
-                    })
-                st.dataframe(pd.DataFrame(tech_data))
-                plot_propaganda_techniques(propaganda_techniques)
-            else:
-                st.write("No propaganda techniques detected.")
-
-            misinformation_indicators = getattr(propaganda_analysis, 'misinformation_indicators', [])
-            if misinformation_indicators:
-                st.subheader("Misinformation Indicators")
-                for indicator in misinformation_indicators:
-                    st.markdown(f"- **Type**: {getattr(indicator, 'indicator_type', 'N/A')}")
-                    st.markdown(f"  **Confidence**: {getattr(indicator, 'confidence', 'N/A')}")
-                    st.markdown(f"  **Correction**: {getattr(indicator, 'correction', 'N/A')}")
-                    st.markdown(f"  **Source Verification**: {', '.join(getattr(indicator, 'source_verification', []))}")
-            else:
-                st.write("No misinformation indicators detected.")
-
-            fake_news_sites = getattr(propaganda_analysis, 'fake_news_sites', [])
-            if fake_news_sites:
-                st.subheader("Associated Fake News Sites")
-                fake_news_data = []
-                for site in fake_news_sites:
-                    fake_news_data.append({
-                        "Domain": getattr(site, 'domain', 'N/A'),
-                        "Shares": getattr(site, 'shares', 0),
-                        "Engagement": getattr(site, 'engagement', 0),
-                        "Known False Stories": getattr(site, 'known_false_stories', 0)
-                    })
-                st.dataframe(pd.DataFrame(fake_news_data))
-                plot_fake_news_sites(fake_news_sites)
-            else:
-                st.write("No fake news sites identified.")
-
-        else:
-            st.write("No propaganda analysis available.")
-
+        for _, show_section in REPORT_SECTIONS:
+            show_section(report)
     except Exception as e:
         st.error(f"Error displaying structured report: {str(e)}")
         st.markdown("## Raw Report")
         st.text(str(report))
 
+class ProgressiveReport:
+    """
+    A report view that is drawn once and then updated in place.
+    
+    Each section gets its own placeholder; update() redraws only the sections whose fields changed,
+    so a preliminary report can be refined section by section as the crew's tasks complete.
+    """
+    
+    def __init__(self):
+        self._status = st.empty()
+        self._placeholders = [st.empty() for _ in REPORT_SECTIONS]
+        self._drawn = [None] * len(REPORT_SECTIONS)
+    
+    def update(self, report, status=None):
+        if status:
+            self._status.info(status)
+        for i, (fields, show_section) in enumerate(REPORT_SECTIONS):
+            snapshot = report.model_dump_json(include=set(fields))
+            if snapshot == self._drawn[i]:
+                continue
+            self._drawn[i] = snapshot
+            with self._placeholders[i].container():
+                try:
+                    show_section(report)
+                except Exception as e:
+                    st.error(f"Error displaying report section: {str(e)}")
+
 def plot_source_reliability(sources):
     if not sources:
         return
-    df = pd.DataFrame([{"domain": s.domain, "factual_rating": s.factual_rating, "articles_count": s.articles_count, "engagement": s.engagement} for s in sources])
-    
-    st.subheader("Source Reliability: Articles Count by Factual Rating")
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.barplot(x='factual_rating', y='articles_count', data=df, ax=ax, palette='viridis')
-    ax.set_title('Articles Count by Factual Rating')
-    ax.set_xlabel('Factual Rating')
-    ax.set_ylabel('Number of Articles')
-    st.pyplot(fig)
+    df = pd.DataFrame([{"domain": s.domain, "factual_rating": s.factual_rating, "articles_count": s.articles_count} for s in sources])
+    df = df.groupby('factual_rating', as_index=False).agg(sources=('domain', 'count'), articles_count=('articles_count', 'sum'))
 
-    st.subheader("Source Reliability: Engagement by Factual Rating")
+    st.subheader("Source Reliability: Sources by Factual Rating")
     fig, ax = plt.subplots(figsize=(10, 6))
-    sns.barplot(x='factual_rating', y='engagement', data=df, ax=ax, palette='magma')
-    ax.set_title('Engagement by Factual Rating')
+    sns.barplot(x='factual_rating', y='sources', data=df, ax=ax, palette='crest')
+    ax.set_title('Top Sources by Factual Rating')
     ax.set_xlabel('Factual Rating')
-    ax.set_ylabel('Engagement')
+    ax.set_ylabel('Number of Sources')
     st.pyplot(fig)
 
+    if df['articles_count'].any():
+        st.subheader("Source Reliability: Articles Count by Factual Rating")
+        fig, ax = plt.subplots(figsize=(10, 6))
+        sns.barplot(x='factual_rating', y='articles_count', data=df, ax=ax, palette='viridis')
+        ax.set_title('Articles Count by Factual Rating')
+        ax.set_xlabel('Factual Rating')
+        ax.set_ylabel('Number of Articles')
+        st.pyplot(fig)
+
 def plot_social_media_metrics(hashtags):
     if not hashtags:
         return
@@ -255,6 +362,36 @@ def plot_time_series_data(df_time_series):
     ax.tick_params(axis='x', rotation=45)
     st.pyplot(fig)
 
+def plot_thread_analytics(analytics):
+    st.subheader("Comment Scores and Reply Depth")
+    fig, (score_ax, depth_ax) = plt.subplots(1, 2, figsize=(14, 5))
+    sns.barplot(x=list(analytics.score_histogram), y=list(analytics.score_histogram.values()), ax=score_ax, color='steelblue')
+    score_ax.set_title('Comment Score Distribution')
+    score_ax.set_xlabel('Score')
+    score_ax.set_ylabel('Comments')
+    score_ax.tick_params(axis='x', rotation=45)
+    sns.barplot(x=list(range(len(analytics.depth_histogram))), y=analytics.depth_histogram, ax=depth_ax, color='seagreen')
+    depth_ax.set_title('Reply Depth Histogram')
+    depth_ax.set_xlabel('Depth (0 = top-level)')
+    depth_ax.set_ylabel('Comments')
+    st.pyplot(fig)
+
+    if analytics.reply_velocity:
+        st.subheader("Reply Velocity")
+        df = pd.DataFrame(TIME_SERIES_ADAPTER.dump_python(list(analytics.reply_velocity)))
+        df['date'] = pd.to_datetime(df['date'])
+        df['cumulative'] = df['count'].cumsum() / max(analytics.comment_count, 1) * 100
+        fig, ax = plt.subplots(figsize=(12, 5))
+        sns.lineplot(x='date', y='count', data=df, marker='o', ax=ax, label='Comments per interval')
+        share_ax = ax.twinx()
+        share_ax.plot(df['date'], df['cumulative'], color='gray', linestyle='--', label='Cumulative %')
+        share_ax.set_ylabel('Cumulative share of comments (%)')
+        ax.set_title('Comments Over Time')
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Comments')
+        ax.tick_params(axis='x', rotation=45)
+        st.pyplot(fig)
+
 def plot_propaganda_techniques(techniques):
     if not techniques:
         return
@@ -302,22 +439,53 @@ def plot_fake_news_sites(sites):
     plt.xticks(rotation=45, ha='right')
     st.pyplot(fig)
 
-def analyze_reddit_post(url):
+def prepare_reddit_post(url, publish=None):
     """
-    Analyze a Reddit post and return the news analysis report
+    Scrape a Reddit post, extract its keywords and count similar posts.
+    
+    Returns:
+        tuple: (reddit_data, keywords); keywords is None when reddit_data holds an error
     """
+    publish = publish or (lambda event: None)
     # Scrape Reddit data
+    publish("Scraping Reddit post...")
     with st.spinner("Scraping Reddit post..."):
         reddit_data = scrape_reddit_data(url)
     
     if "error" in reddit_data:
-        st.error(f"Error: {reddit_data['error']}")
-        return None
+        return reddit_data, None
     
     # Extract keywords
+    publish("Extracting keywords...")
     with st.spinner("Extracting keywords..."):
         keywords = extract_keywords(reddit_data)
     
+    if keywords:
+        publish("Counting similar posts on Reddit...")
+        with st.spinner("Counting similar posts on Reddit..."):
+            reddit_data["similar_posts_time_series"] = collect_similar_posts_series(reddit_data, keywords)
+    return reddit_data, keywords
+
+def analyze_reddit_post(url):
+    """
+    Analyze a Reddit post and return the news analysis report.
+    
+    A preliminary report from local analysis is displayed within seconds; its sections are then
+    updated in place as the crew's tasks complete, and replaced by the full report at the end.
+    """
+    # A post already being prepared by another session is scraped once; this session waits for it
+    status = st.empty()
+    (reddit_data, keywords), _ = get_single_flight("reddit_post").run(
+        canonicalize_url(url),
+        lambda publish: prepare_reddit_post(url, publish),
+        on_event=lambda message: status.info(f"Another session is preparing this post: {message}"),
+    )
+    status.empty()
+    
+    if "error" in reddit_data:
+        st.error(f"Error: {reddit_data['error']}")
+        return None
+    
     if not keywords:
         st.error("No keywords extracted from the post.")
         return None
@@ -353,13 +521,40 @@ def analyze_reddit_post(url):
     keywords = keyword_list[:5]
     st.info(f"Running analysis for: {user_query}")
     
+    # The crew's progress is shown above the report, which is drawn below and refined in place
+    progress_area = st.container()
+    st.divider()
+    view = ProgressiveReport()
+    
+    # Fast tier: a preliminary report from local analysis and one news search, shown right away
+    preliminary = None
+    try:
+        with progress_area, st.spinner("Building a preliminary report..."):
+            preliminary = build_fast_report(user_query, keyword_list, reddit_data)
+        view.update(preliminary, PRELIMINARY_NOTE)
+    except Exception as e:
+        logger.warning("Could not build the preliminary report: %s", e)
+    
+    def show_task_outputs(outputs):
+        if preliminary is not None:
+            merged = merge_task_outputs(preliminary, user_query, outputs)
+            view.update(merged, merged.analysis_note)
+    
     # Run analysis
-    with st.spinner("Running news analysis... This may take several minutes."):
+    with progress_area, st.spinner("Running news analysis... This may take several minutes."):
         report = run_news_analysis(
             user_query=user_query,
-            keywords=keywords
+            keywords=keywords,
+            reddit_data=reddit_data,
+            resume=st.session_state.get("resume_runs_1", True),
+            on_task_outputs=show_task_outputs,
+            profile=st.session_state.get("profile_runs_1", False)
         )
     
+    if report:
+        view.update(report, "Full analysis complete.")
+    elif preliminary is not None:
+        view.update(preliminary, "The full analysis did not complete; showing the preliminary report.")
     return report
 
 def manual_analysis():
@@ -410,13 +605,127 @@ def manual_analysis():
                 user_query=user_query.strip(),
                 urls=urls,
                 hashtags=hashtags,
-                keywords=keywords
+                keywords=keywords,
+                resume=st.session_state.get("resume_runs_1", True),
+                profile=st.session_state.get("profile_runs_1", False)
             )
         
         return report
     
     return None
 
+def batch_analysis_page():
+    """Analyze several related queries with one shared search-and-scrape phase"""
+    st.header("Batch Analysis")
+    st.markdown("Analyze related queries together. Articles are searched and scraped once and shared by every query.")
+
+    queries_input = st.text_area(
+        "Queries (one per line):",
+        placeholder="earthquake turkey\nturkey quake death toll\nturkey earthquake aid",
+        key="batch_queries_1"
+    )
+    max_concurrent = st.slider("Queries analyzed at the same time", 1, 5, 3, key="batch_concurrency_1")
+
+    if st.button("Run Batch Analysis", type="primary", key="run_batch_analysis_1"):
+        queries = [q.strip() for q in queries_input.split('\n') if q.strip()]
+        if not queries:
+            st.error("Please enter at least one query.")
+            return
+        if not setup_api_keys():
+            st.error("API keys not set or invalid. Please set valid API keys in the sidebar.")
+            return
+        with st.spinner(f"Analyzing {len(queries)} queries... This may take several minutes."):
+            st.session_state["batch_reports"] = run_batch_analysis(queries, max_concurrent=max_concurrent)
+
+    reports = st.session_state.get("batch_reports")
+    if not reports:
+        return
+    st.success(f"{sum(1 for r in reports.values() if r)} of {len(reports)} queries produced a report.")
+    for tab, (query, report) in zip(st.tabs(list(reports)), reports.items()):
+        with tab:
+            if report:
+                display_report(report)
+            else:
+                st.error("The analysis for this query failed.")
+
+def report_history_page():
+    """Browse and search previously archived reports"""
+    st.header("Report History")
+    st.markdown("Search past analyses instead of running them again.")
+
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        search_text = st.text_input(
+            "Search reports:",
+            placeholder="Words from the summary, findings, keywords or hashtags",
+            key="history_search_1"
+        )
+    with col2:
+        domain = st.text_input(
+            "Cited domain:",
+            placeholder="example.com",
+            key="history_domain_1"
+        )
+    with col3:
+        domain_kind = st.selectbox("Domain role", ["Any", "Source", "Fake news site"], key="history_domain_kind_1")
+
+    kind = {"Source": "source", "Fake news site": "fake"}.get(domain_kind)
+    page_size = 20
+    store = get_report_store()
+
+    # Go back to the first page whenever the filters change
+    filters = (search_text, domain, kind)
+    if st.session_state.get("history_filters") != filters:
+        st.session_state["history_filters"] = filters
+        st.session_state["history_page"] = 1
+    page = st.session_state.get("history_page", 1)
+
+    rows, total = store.search(text=search_text, domain=domain, kind=kind, page=page, page_size=page_size)
+    page_count = max(1, (total + page_size - 1) // page_size)
+    st.caption(f"{total} report(s) found — page {page} of {page_count}")
+
+    if not rows:
+        st.write("No archived reports match your search.")
+        return
+
+    st.dataframe(pd.DataFrame([{
+        "ID": row["id"],
+        "Date": datetime.fromtimestamp(row["created_at"]).strftime('%Y-%m-%d %H:%M'),
+        "Summary": row["query_summary"] or row["user_query"],
+        "Articles": row["article_count"],
+        "Risk Score": row["risk_score"],
+    } for row in rows]), hide_index=True)
+
+    prev_col, next_col = st.columns(2)
+    with prev_col:
+        if st.button("← Previous page", disabled=page <= 1, key="history_prev_1"):
+            st.session_state["history_page"] = page - 1
+            st.rerun()
+    with next_col:
+        if st.button("Next page →", disabled=page >= page_count, key="history_next_1"):
+            st.session_state["history_page"] = page + 1
+            st.rerun()
+
+    selected_id = st.selectbox(
+        "Open report:",
+        [row["id"] for row in rows],
+        format_func=lambda report_id: next(
+            f"#{row['id']} — {row['query_summary'] or row['user_query']}" for row in rows if row["id"] == report_id
+        ),
+        key="history_selected_1"
+    )
+    report = store.get(selected_id)
+    if report:
+        st.divider()
+        display_report(report)
+        st.download_button(
+            label="📥 Download Report as Markdown",
+            data=get_report_as_markdown(report),
+            file_name=f"news_analysis_report_{selected_id}.md",
+            mime="text/markdown",
+            key="history_download_1"
+        )
+
 def main():
     try:
         st.title("VerifAI: News Analysis Tool")
@@ -462,6 +771,26 @@ def main():
                 else:
                     st.error("Please enter a valid Serper API key")
         
+        page = st.sidebar.radio("Page", ["Analyze", "Batch Analysis", "Report History"], key="page_1")
+        st.sidebar.checkbox(
+            "Resume interrupted runs",
+            value=True,
+            help="Reuse the completed steps of a failed or timed-out run with the same inputs instead of starting over",
+            key="resume_runs_1"
+        )
+        st.sidebar.checkbox(
+            "Profile analyses",
+            value=profiling_enabled(),
+            help="Sample where Python time goes during each analysis; shows a hotspot table and flamegraph/speedscope downloads (also enabled by VERIFAI_PROFILE=1)",
+            key="profile_runs_1"
+        )
+        if page == "Report History":
+            report_history_page()
+            return
+        if page == "Batch Analysis":
+            batch_analysis_page()
+            return
+        
         # Reddit Analysis interface
         st.header("Reddit Post Analysis")
         st.markdown("Analyze a Reddit post to understand news patterns and credibility.")
@@ -482,15 +811,12 @@ def main():
                 st.error("API keys not set or invalid. Please set valid API keys in the sidebar.")
             else:
                 try:
+                    # The report is drawn (preliminary first, then refined) while the analysis runs
                     report = analyze_reddit_post(url)
                     
                     if report:
                         st.success("Analysis completed!")
                         
-                        # Display report
-                        st.divider()
-                        display_report(report)
-                        
                         # Download button
                         st.divider()
                         markdown_report = get_report_as_markdown(report)
@@ -1,7 +1,10 @@
 import json
 from crewai import Task
 from models import NewsAnalysisReport
-from typing import List
+from reputation import format_known_ratings
+from deadlines import TASK_NAMES, TASK_LABELS
+from sentiment import get_sentiment_engine
+from typing import Dict, List
 from streamlit.runtime.caching import cache_data
 
 def model_to_json_template(model_class: type) -> str:
@@ -13,23 +16,47 @@ def model_to_json_template(model_class: type) -> str:
 def create_news_analysis_tasks(agents: List[str], user_query: str,
                                urls: List[str] = None,
                                hashtags: List[str] = None,
-                               keywords: List[str] = None) -> List[Task]:
+                               keywords: List[str] = None,
+                               completed_outputs: Dict[str, str] = None,
+                               measured_sentiment: str = None,
+                               measured_hashtags: str = None) -> List[Task]:
     if not agents or len(agents) < 6:
         print(f"Expected 6 agents, got {len(agents) if agents else 0}")
         return None
 
     # Generate JSON template dynamically from Pydantic model
     json_schema_template = model_to_json_template(NewsAnalysisReport)
+
+    # Ratings for the given URLs come from the local reputation table instead of the LLM
+    known_ratings = format_known_ratings(urls) or "None of the provided URLs are in the reputation table."
+
+    # Sentiment measured over the Reddit comments replaces the agent's own guess when available
+    if measured_sentiment:
+        sentiment_step = f"""3. Report the measured sentiment below as-is; do not re-estimate it
+               MEASURED SENTIMENT: {measured_sentiment}"""
+    else:
+        sentiment_step = "3. Determine overall sentiment as Positive/Negative/Neutral/Mixed"
+
+    # Hashtags counted in the Reddit thread replace the search for them when any were found
+    if measured_hashtags:
+        hashtag_step = f"""1. Report the measured hashtags below, most used first; add at most 2 more only if your search finds clearly relevant ones
+               MEASURED HASHTAGS: {measured_hashtags}"""
+    else:
+        hashtag_step = "1. Search for 3-5 relevant hashtags about this topic"
         
-    return [
-        Task(
+    specs = [
+        dict(
             description=f"""QUICK SEARCH: Find 3-5 recent news articles about: {user_query}
                         
             SIMPLE INSTRUCTIONS:
             1. Provide a 1-sentence summary
             2. Find exactly 3-5 article titles and URLs
             3. Note the source domain for each
-            4. Rate each source as High/Medium/Low reliability based on common knowledge
+            4. Rate each source as High/Medium/Low reliability using the Domain Reputation Lookup tool;
+               use common knowledge only for domains the tool reports as UNKNOWN
+            
+            ALREADY RATED (use as-is):
+            {known_ratings}
             
             REQUIRED OUTPUT FORMAT:
             ARTICLES FOUND:
@@ -42,7 +69,7 @@ def create_news_analysis_tasks(agents: List[str], user_query: str,
             agent=agents[0],
             expected_output="List of 3-5 articles with titles, sources, URLs, and reliability ratings, plus a one-sentence summary."
         ),
-        Task(
+        dict(
             description=f"""QUICK ANALYSIS: Analyze themes from article titles found for: {user_query}
                         
             SIMPLE INSTRUCTIONS:
@@ -60,13 +87,13 @@ def create_news_analysis_tasks(agents: List[str], user_query: str,
             agent=agents[1],
             expected_output="Quick thematic analysis with themes, keywords, conflicts, and quality assessment from headlines only."
         ),
-        Task(
+        dict(
             description=f"""QUICK SOCIAL SEARCH: Find hashtags and sentiment for: {user_query}
                         
             SIMPLE INSTRUCTIONS:
-            1. Search for 3-5 relevant hashtags about this topic
+            {hashtag_step}
             2. Assess general engagement as High/Medium/Low
-            3. Determine overall sentiment as Positive/Negative/Neutral/Mixed
+            {sentiment_step}
             4. Note if topic is trending or not
             
             REQUIRED OUTPUT FORMAT:
@@ -78,7 +105,7 @@ def create_news_analysis_tasks(agents: List[str], user_query: str,
             agent=agents[2],
             expected_output="Basic social media metrics with hashtags, engagement level, sentiment, and trending status."
         ),
-        Task(
+        dict(
             description=f"""ORGANIZE DATA: Structure all findings for: {user_query}
                         
             SIMPLE INSTRUCTIONS:
@@ -96,11 +123,12 @@ def create_news_analysis_tasks(agents: List[str], user_query: str,
             agent=agents[3],
             expected_output="Organized data with reliability groupings, theme categories, and pattern summary."
         ),
-        Task(
+        dict(
             description=f"""BASIC RELIABILITY CHECK: Assess information quality for: {user_query}
                         
             SIMPLE INSTRUCTIONS:
-            1. Rate overall reliability 1-10 based on sources found
+            1. Look up all sources with the Domain Reputation Lookup tool, then rate overall
+               reliability 1-10 based on sources found
             2. Note any obvious red flags (if any)
             3. Suggest 2-3 basic verification steps
             4. Keep assessment simple and fast
@@ -116,7 +144,7 @@ def create_news_analysis_tasks(agents: List[str], user_query: str,
             agent=agents[4],
             expected_output="Basic reliability assessment with score, red flags, and verification steps."
         ),
-        Task(
+        dict(
             description=f"""COMPILE REPORT: Create JSON report for: {user_query}
                         
             INSTRUCTIONS:
@@ -125,6 +153,8 @@ def create_news_analysis_tasks(agents: List[str], user_query: str,
             3. Use "Unknown" or "N/A" for missing information
             4. Keep data realistic based on what was actually found
             5. Ensure valid JSON format
+            6. Leave propaganda_analysis.coordination_patterns, propaganda_analysis.bot_activity_metrics,
+               content_analysis.metrics and similar_posts_time_series at their defaults; they are measured locally
             
             Context:
             - Query: {user_query}
@@ -142,19 +172,37 @@ def create_news_analysis_tasks(agents: List[str], user_query: str,
             expected_output="Complete JSON report following the NewsAnalysisReport schema with actual findings from the analysis."
         )
     ]
+    if completed_outputs:
+        specs = resume_task_specs(specs, completed_outputs)
+    return [Task(**spec) for spec in specs]
+
+def resume_task_specs(specs: List[dict], completed_outputs: Dict[str, str]) -> List[dict]:
+    """
+    Drop the tasks a previous run already completed and give the rest their outputs as context.
+    
+    Args:
+        specs (List[dict]): Task arguments for all tasks, in TASK_NAMES order
+        completed_outputs (Dict[str, str]): Task name -> raw output from the checkpointed run
+        
+    Returns:
+        List[dict]: Task arguments for the tasks that still need to run
+    """
+    replay = "\n\n".join(
+        f"--- {TASK_LABELS[name].upper()} (completed earlier) ---\n{completed_outputs[name]}"
+        for name in TASK_NAMES if name in completed_outputs
+    )
+    remaining = []
+    for name, spec in zip(TASK_NAMES, specs):
+        if name in completed_outputs:
+            continue
+        description = spec["description"] + f"""
+            
+            RESULTS FROM EARLIER STEPS (use these as the previous tasks' output):
+            {replay}"""
+        remaining.append({**spec, "description": description})
+    return remaining
 
 @cache_data(ttl=3600, show_spinner=False)
 def analyze_sentiment(text):
-    # Existing analysis logic
-    # Add memory cleanup
-    return {
-        'sentiment': processed_sentiment,
-        'confidence': confidence_score,
-        'emotion': dominant_emotion,
-        'subjectivity': subjectivity_score,
-        'irony_detected': irony_flag,
-        'sarcasm_level': sarcasm_level,
-        'keywords': list(keywords_set),
-        'entity_mentions': list(named_entities),
-        'topic_distribution': topic_probs
-    }
\ No newline at end of file
+    """Sentiment, emotion, irony and keyword scores for one text (see sentiment.SentimentEngine)."""
+    return get_sentiment_engine().analyze([text])[0]
@@ -0,0 +1,336 @@
+import csv
+import logging
+import os
+import re
+from collections import Counter
+from itertools import islice
+
+import numpy as np
+
+from shared_state import process_singleton
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+LANGUAGE_SAMPLES_FILE = os.path.join(DATA_DIR, "language_samples.csv")
+GAZETTEER_FILE = os.path.join(DATA_DIR, "entity_gazetteer.csv")
+
+TOKEN_RE = re.compile(r"\w+(?:[.'&-]\w+)*")
+NON_LETTER_RE = re.compile(r"[\W\d_]+")
+VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+SILENT_ENDING_RE = re.compile(r"(?:[^laeiouy]es|[^laeiouydt]ed|[^laeiouy]e)$")
+# Sentence ends: terminal punctuation followed by a capitalized word or the end of the text, except after
+# initials and common abbreviations, plus blank-line paragraph breaks (headlines rarely end with a period)
+SENTENCE_END_RE = re.compile(
+    r"(?=[.!?])(?<!\b[A-Z])(?<!\bMr)(?<!\bMs)(?<!\bDr)(?<!\bSt)(?<!\bvs)(?<!\bMrs)(?<!\bSen)(?<!\bRep)(?<!\bGov)"
+    r"[.!?]+[\"'”’)]*(?=\s+[\"'“‘(]?[A-Z0-9]|\s*$)|\n\s*\n"
+)
+
+# Byte trigrams are hashed into this many buckets (a prime) for language identification
+LANGUAGE_BUCKETS = 65521
+# Only the start of each text is needed to identify its language
+LANGUAGE_MAX_CHARS = 2000
+MIN_LANGUAGE_TRIGRAMS = 12
+READABILITY_LANGUAGE = "English"
+CHUNK_SIZE = 256
+
+
+def count_syllables(word: str) -> int:
+    """Heuristic English syllable count: vowel groups, minus silent endings."""
+    word = word.lower()
+    if len(word) <= 3:
+        return 1
+    word = SILENT_ENDING_RE.sub(lambda m: m.group()[0], word)
+    if word.startswith("y"):
+        word = word[1:]
+    return max(1, len(VOWEL_GROUP_RE.findall(word)))
+
+
+class _SyllableCache(dict):
+    def __missing__(self, word):
+        count = self[word] = count_syllables(word)
+        return count
+
+
+def flesch_reading_ease(words: int, sentences: int, syllables: int) -> float:
+    """Flesch Reading Ease (higher is easier; 60-70 is plain English), clamped to 0-100."""
+    if not words:
+        return 0.0
+    score = 206.835 - 1.015 * (words / max(sentences, 1)) - 84.6 * (syllables / words)
+    return round(min(100.0, max(0.0, score)), 1)
+
+
+def flesch_kincaid_grade(words: int, sentences: int, syllables: int) -> float:
+    """Flesch-Kincaid US school grade level."""
+    if not words:
+        return 0.0
+    return round(max(0.0, 0.39 * (words / max(sentences, 1)) + 11.8 * (syllables / words) - 15.59), 1)
+
+
+class LanguageIdentifier:
+    """
+    Naive Bayes language identification over hashed character (UTF-8 byte) trigrams.
+
+    Profiles are built from the bundled sample text per language. A batch of texts is scored at
+    once: all trigram ids go into one array, the log-probability matrix is gathered for them and
+    summed per text with np.add.reduceat.
+    """
+
+    def __init__(self, samples_path: str = LANGUAGE_SAMPLES_FILE):
+        with open(samples_path, newline="", encoding="utf-8") as f:
+            samples = [(row["language"], row["text"]) for row in csv.DictReader(f)]
+        self.languages = [language for language, _ in samples]
+        counts = np.zeros((len(samples), LANGUAGE_BUCKETS))
+        for i, (_, text) in enumerate(samples):
+            counts[i] = np.bincount(self._trigram_ids(text), minlength=LANGUAGE_BUCKETS)
+        # Add-half smoothing so unseen trigrams cost the same in every language model
+        smoothed = counts + 0.5
+        self._log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    @staticmethod
+    def _trigram_ids(text: str) -> np.ndarray:
+        cleaned = f" {NON_LETTER_RE.sub(' ', text[:LANGUAGE_MAX_CHARS].lower())} "
+        data = np.frombuffer(cleaned.encode("utf-8"), dtype=np.uint8).astype(np.int64)
+        return (data[:-2] * 65536 + data[1:-1] * 256 + data[2:]) % LANGUAGE_BUCKETS
+
+    def identify_many(self, texts: list) -> list:
+        """
+        Identify the language of each text.
+
+        Returns:
+            list: Language name per text, or None for texts too short to tell
+        """
+        ids = [self._trigram_ids(text) for text in texts]
+        lengths = np.array([len(i) for i in ids], dtype=np.int64)
+        scored = np.flatnonzero(lengths >= MIN_LANGUAGE_TRIGRAMS)
+        languages = [None] * len(texts)
+        if not len(scored):
+            return languages
+        trigrams = np.concatenate([ids[i] for i in scored])
+        starts = np.concatenate([[0], np.cumsum(lengths[scored])[:-1]])
+        scores = np.add.reduceat(self._log_prob[:, trigrams], starts, axis=1)
+        for i, best in zip(scored.tolist(), scores.argmax(axis=0).tolist()):
+            languages[i] = self.languages[best]
+        return languages
+
+
+def _entity_key(token: str) -> str:
+    # Short all-caps tokens are acronyms and match case-sensitively ("US" is not "us", "WHO" is not "who")
+    return token if len(token) <= 5 and token.isupper() else token.lower()
+
+
+class EntityGazetteer:
+    """
+    Gazetteer entity spotting with an Aho-Corasick automaton over word tokens.
+
+    Every name and alias is a path of normalized tokens in a trie with failure links, so one
+    left-to-right pass over a text's tokens finds all gazetteer names in it regardless of how many
+    there are. Overlapping matches resolve to the longest, leftmost one ("New York Times" rather
+    than "New York"), and a match must start with a capitalized token.
+    """
+
+    def __init__(self, path: str = GAZETTEER_FILE):
+        self.entities = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                entity_id = len(self.entities)
+                self.entities.append((row["name"].strip(), row["type"].strip()))
+                for alias in [row["name"]] + (row.get("aliases") or "").split("|"):
+                    keys = [_entity_key(t) for t in TOKEN_RE.findall(alias)]
+                    if keys:
+                        self._insert(keys, entity_id)
+        self._vocabulary = {key for node in self._goto for key in node}
+        self._lowered_vocabulary = {key.lower() for key in self._vocabulary}
+        self._build_failure_links()
+
+    def _insert(self, keys: list, entity_id: int) -> None:
+        node = 0
+        for key in keys:
+            if key not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][key] = len(self._goto) - 1
+            node = self._goto[node][key]
+        self._output[node].append((len(keys), entity_id))
+
+    def _build_failure_links(self) -> None:
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for key, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and key not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(key, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, tokens: list) -> list:
+        """
+        Find gazetteer entities in a token list (as produced by TOKEN_RE).
+
+        Returns:
+            list: Entity ids, one per non-overlapping match, in text order
+        """
+        # Most tokens are not part of any name; only runs of tokens that are get walked through the automaton
+        lowered = list(map(str.lower, tokens))
+        candidates = [i for i, token in enumerate(lowered) if token in self._lowered_vocabulary]
+        matches = []
+        node = 0
+        previous = -2
+        goto, fail, output, vocabulary = self._goto, self._fail, self._output, self._vocabulary
+        for end in candidates:
+            if end != previous + 1:
+                node = 0
+            previous = end
+            token = tokens[end]
+            key = token if len(token) <= 5 and token.isupper() else lowered[end]
+            if key not in vocabulary:
+                node = 0
+                continue
+            while node and key not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(key, 0)
+            for length, entity_id in output[node]:
+                start = end - length + 1
+                if tokens[start][0].isupper():
+                    matches.append((start, -length, entity_id))
+        found = []
+        covered_until = -1
+        for start, negative_length, entity_id in sorted(matches):
+            if start > covered_until:
+                found.append(entity_id)
+                covered_until = start - negative_length - 1
+        return found
+
+
+class TextMetrics:
+    """
+    Streaming readability, language and entity metrics over article and comment texts.
+
+    Texts are consumed in chunks, so only one chunk is held at a time: each chunk's languages are
+    identified in one vectorized call, each text is tokenized once for both the syllable/word
+    counts and the gazetteer pass, and only running totals are kept. Readability is accumulated
+    over English texts only, since the Flesch formulas are calibrated for English.
+    """
+
+    def __init__(self, language_identifier: LanguageIdentifier = None, gazetteer: EntityGazetteer = None):
+        self.language_identifier = language_identifier or get_language_identifier()
+        self.gazetteer = gazetteer or get_entity_gazetteer()
+        self._syllables = _SyllableCache()
+        self.texts = Counter()
+        self.words = Counter()
+        self.sentences = Counter()
+        self.syllable_total = Counter()
+        self.language_chars = Counter()
+        self.entity_mentions = Counter()
+
+    def update(self, texts, kind: str = "article", chunk_size: int = CHUNK_SIZE) -> None:
+        """Add an iterable of texts of one kind ("article" or "comment")."""
+        texts = iter(texts)
+        while True:
+            chunk = list(islice(texts, chunk_size))
+            if not chunk:
+                return
+            chunk = [t for t in chunk if t]
+            if chunk:
+                self._update_chunk(chunk, kind)
+
+    def _update_chunk(self, chunk: list, kind: str) -> None:
+        languages = self.language_identifier.identify_many(chunk)
+        syllables = self._syllables
+        for text, language in zip(chunk, languages):
+            self.texts[kind] += 1
+            if language:
+                self.language_chars[language] += len(text)
+            tokens = TOKEN_RE.findall(text)
+            self.entity_mentions.update(self.gazetteer.find(tokens))
+            if language == READABILITY_LANGUAGE:
+                words = [t for t in tokens if t.isalpha()]
+                self.words[kind] += len(words)
+                self.syllable_total[kind] += sum(map(syllables.__getitem__, words))
+                self.sentences[kind] += max(1, len(SENTENCE_END_RE.findall(text)))
+
+    def summary(self, max_entities: int = 10) -> dict:
+        """
+        Returns:
+            dict: readability_score (Flesch Reading Ease), grade_level, dominant_language,
+                language_percentage, languages (name -> % of identified text), key_entities and counts
+        """
+        # Article prose is what readability describes; comments only count when no article text was English
+        kinds = ["article"] if self.words["article"] else ["article", "comment"]
+        words = sum(self.words[k] for k in kinds)
+        sentences = sum(self.sentences[k] for k in kinds)
+        syllables = sum(self.syllable_total[k] for k in kinds)
+        identified = sum(self.language_chars.values())
+        languages = {
+            name: round(chars / identified * 100, 1) for name, chars in self.language_chars.most_common()
+        } if identified else {}
+        dominant = next(iter(languages), "")
+        return {
+            "readability_score": flesch_reading_ease(words, sentences, syllables),
+            "grade_level": flesch_kincaid_grade(words, sentences, syllables),
+            "dominant_language": dominant,
+            "language_percentage": languages.get(dominant, 0.0),
+            "languages": languages,
+            "key_entities": [self.gazetteer.entities[i][0] for i, _ in self.entity_mentions.most_common(max_entities)],
+            "article_count": self.texts["article"],
+            "comment_count": self.texts["comment"],
+        }
+
+
+def comment_texts(reddit_data: dict):
+    """Yield the post and comment bodies of a scraped Reddit thread."""
+    if not reddit_data or "error" in reddit_data:
+        return
+    yield f"{reddit_data.get('title', '')}\n\n{reddit_data.get('selftext', '')}"
+    for comment in reddit_data.get("comments") or reddit_data.get("top_comments") or []:
+        if not comment.get("is_deleted"):
+            yield comment.get("body", "")
+
+
+def measure_text_metrics(article_texts, reddit_data: dict = None) -> dict:
+    """
+    Measure readability, language mix and gazetteer entities in one pass.
+
+    Args:
+        article_texts: Iterable of scraped article texts (None entries are skipped)
+        reddit_data (dict): Output of scrape_reddit_data
+
+    Returns:
+        dict: See TextMetrics.summary
+    """
+    metrics = TextMetrics()
+    metrics.update(article_texts, "article")
+    metrics.update(comment_texts(reddit_data), "comment")
+    return metrics.summary()
+
+
+def apply_text_metrics(report, article_texts, reddit_data: dict = None) -> None:
+    """Fill the report's readability score, key entities and language metrics from the scraped text."""
+    summary = measure_text_metrics(article_texts, reddit_data)
+    if not summary["article_count"] and not summary["comment_count"]:
+        return
+    content = report.content_analysis
+    if summary["readability_score"]:
+        content.readability_score = summary["readability_score"]
+    if summary["key_entities"]:
+        content.key_entities = summary["key_entities"]
+    content.metrics.language_percentage = summary["language_percentage"]
+    content.metrics.dominant_language = summary["dominant_language"]
+
+
+@process_singleton
+def get_language_identifier() -> LanguageIdentifier:
+    """Return the process-wide language identifier."""
+    return LanguageIdentifier()
+
+
+@process_singleton
+def get_entity_gazetteer() -> EntityGazetteer:
+    """Return the process-wide entity gazetteer."""
+    return EntityGazetteer()
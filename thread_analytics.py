@@ -0,0 +1,171 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from models import ThreadAnalytics
+from time_series import bin_timestamps
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["id", "parent_id", "author", "score", "created_utc", "depth", "edited", "is_deleted"]
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+# Lower edge of every score bin after the first; see SCORE_LABELS
+SCORE_EDGES = np.array([-9, 0, 1, 2, 5, 10, 50, 100, 1000])
+SCORE_LABELS = ["≤ -10", "-9 to -1", "0", "1", "2-4", "5-9", "10-49", "50-99", "100-999", "1000+"]
+TOP_AUTHORS = [1, 10]
+# Thresholds above which a thread statistic is reported as a bot/coordination indicator
+DELETED_INDICATOR_PERCENTAGE = 10.0
+BURST_INDICATOR_RATIO = 10.0
+GINI_INDICATOR = 0.6
+
+
+def comment_columns(comments: list) -> dict:
+    """
+    Convert comment records from reddit.collect_comments into columnar arrays.
+
+    Returns:
+        dict: score (int64), created (float64, epoch seconds), depth (int64), edited and deleted
+        (bool), author (int64 codes, -1 for deleted authors) and parent (int64 row of the parent
+        comment, -1 when the parent is the post or was not loaded)
+    """
+    frame = pd.DataFrame.from_records(comments, columns=COLUMNS)
+    deleted = frame["is_deleted"].fillna(False).to_numpy(dtype=bool)
+    authors = frame["author"].where(~deleted & frame["author"].notna() & (frame["author"] != "None"))
+    author_codes, _ = pd.factorize(authors, use_na_sentinel=True)
+    # parent_id is "t1_<comment id>" for replies and "t3_<post id>" for top-level comments
+    parent_ids = frame["parent_id"].fillna("").str.slice(3)
+    unique = (frame["id"].notna() & ~frame["id"].duplicated()).to_numpy()
+    rows = np.flatnonzero(unique)
+    found = pd.Index(frame["id"][unique]).get_indexer(parent_ids)
+    parent = np.full(len(frame), -1, dtype=np.int64)
+    parent[found >= 0] = rows[found[found >= 0]]
+    return {
+        "score": frame["score"].fillna(0).to_numpy(dtype=np.int64),
+        "created": frame["created_utc"].to_numpy(dtype=np.float64, na_value=np.nan),
+        "depth": frame["depth"].fillna(0).to_numpy(dtype=np.int64),
+        "edited": frame["edited"].fillna(False).to_numpy(dtype=bool),
+        "deleted": deleted,
+        "author": author_codes.astype(np.int64),
+        "parent": parent.astype(np.int64),
+    }
+
+
+def gini(counts: np.ndarray) -> float:
+    """Gini coefficient of non-negative counts (0 = all equal, approaching 1 = all in one)."""
+    values = np.sort(np.asarray(counts, dtype=np.float64))
+    n, total = len(values), values.sum()
+    if n == 0 or total == 0:
+        return 0.0
+    ranks = np.arange(1, n + 1)
+    return float(2.0 * np.dot(ranks, values) / (n * total) - (n + 1) / n)
+
+
+def analyze_thread(comments: list, post_created_utc: float = None) -> ThreadAnalytics:
+    """
+    Compute thread-level statistics over every loaded comment, vectorized over columnar arrays.
+
+    Args:
+        comments (list): Comment records from reddit.collect_comments
+        post_created_utc (float): Creation time of the post, for reply delays and the half-life
+
+    Returns:
+        ThreadAnalytics: Empty (all defaults) when there are no comments
+    """
+    if not comments:
+        return ThreadAnalytics()
+    columns = comment_columns(comments)
+    score, created, depth = columns["score"], columns["created"], columns["depth"]
+    count = len(score)
+
+    score_bins = np.bincount(np.searchsorted(SCORE_EDGES, score, side="right"), minlength=len(SCORE_LABELS))
+    depth_counts = np.bincount(np.clip(depth, 0, None))
+
+    per_author = np.bincount(columns["author"][columns["author"] >= 0])
+    per_author = per_author[per_author > 0]
+    ranked = np.sort(per_author)[::-1]
+    authored = max(int(ranked.sum()), 1)
+    top_share = {f"top {k}": round(float(ranked[:k].sum() / authored * 100), 1) for k in TOP_AUTHORS}
+    top_share["top 1%"] = round(float(ranked[:max(1, int(np.ceil(len(ranked) * 0.01)))].sum() / authored * 100), 1)
+
+    times = created[~np.isnan(created)]
+    velocity, half_life, peak_minute, reply_delay = [], 0.0, 0, 0.0
+    if times.size:
+        velocity = bin_timestamps(times)
+        start = post_created_utc if post_created_utc else times.min()
+        half_life = float(np.median(times) - start) / 3600
+        peak_minute = int(np.unique(np.floor(times / 60), return_counts=True)[1].max())
+
+        parent = columns["parent"]
+        parent_time = np.full(count, post_created_utc if post_created_utc else np.nan)
+        has_parent = parent >= 0
+        parent_time[has_parent] = created[parent[has_parent]]
+        delays = created - parent_time
+        delays = delays[~np.isnan(delays) & (delays >= 0)]
+        if delays.size:
+            reply_delay = float(np.median(delays)) / 60
+
+    return ThreadAnalytics(
+        comment_count=count,
+        author_count=len(per_author),
+        score_mean=round(float(score.mean()), 2),
+        score_percentiles={f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(score, PERCENTILES))},
+        score_histogram=dict(zip(SCORE_LABELS, score_bins.tolist())),
+        depth_histogram=depth_counts.tolist(),
+        mean_depth=round(float(depth.mean()), 2),
+        reply_velocity=velocity,
+        half_life_hours=round(max(half_life, 0.0), 2),
+        peak_comments_per_minute=peak_minute,
+        median_reply_delay_minutes=round(reply_delay, 1),
+        author_gini=round(gini(per_author), 3),
+        top_author_share=top_share,
+        edited_percentage=round(float(columns["edited"].mean() * 100), 1),
+        deleted_percentage=round(float(columns["deleted"].mean() * 100), 1),
+    )
+
+
+def thread_facts(analytics: ThreadAnalytics) -> list:
+    """Plain-language platform facts summarizing the thread statistics."""
+    if not analytics.comment_count:
+        return []
+    p = analytics.score_percentiles
+    return [
+        f"Thread size: {analytics.comment_count:,} comments by {analytics.author_count:,} authors; "
+        f"replies nest up to {len(analytics.depth_histogram) - 1} levels deep (mean depth {analytics.mean_depth:.1f})",
+        f"Thread comment scores: median {p.get('p50', 0):.0f}, 90th percentile {p.get('p90', 0):.0f}, "
+        f"99th percentile {p.get('p99', 0):.0f} (mean {analytics.score_mean:.1f})",
+        f"Thread reply velocity: half of the comments arrived within {analytics.half_life_hours:.1f} h; "
+        f"median reply delay {analytics.median_reply_delay_minutes:.1f} min; "
+        f"peak of {analytics.peak_comments_per_minute} comments in one minute",
+        f"Thread author concentration: Gini {analytics.author_gini:.2f}; the top 10 authors wrote "
+        f"{analytics.top_author_share.get('top 10', 0):.1f}% of comments",
+        f"Thread edits: {analytics.edited_percentage:.1f}% of comments edited, {analytics.deleted_percentage:.1f}% deleted or removed",
+    ]
+
+
+def apply_thread_analytics(report, reddit_data: dict) -> None:
+    """
+    Fill the report's thread statistics and feed them into its platform facts and bot indicators.
+
+    Call after bot_metrics.apply_bot_metrics, whose indicators this extends.
+    """
+    if not reddit_data or "error" in reddit_data or not reddit_data.get("comments"):
+        return
+    analytics = analyze_thread(reddit_data["comments"], reddit_data.get("created_utc"))
+    report.thread_analytics = analytics
+    # Replace facts from an earlier pass (e.g. the preliminary report) rather than repeating them
+    report.platform_facts = [f for f in report.platform_facts if not f.startswith("Thread ")] + thread_facts(analytics)
+
+    bot_metrics = report.propaganda_analysis.bot_activity_metrics
+    indicators = []
+    if analytics.deleted_percentage >= DELETED_INDICATOR_PERCENTAGE:
+        indicators.append(f"{analytics.deleted_percentage:.1f}% of comments deleted or removed")
+    # Mean rate while the first half of the comments arrived
+    per_minute = analytics.comment_count / max(analytics.half_life_hours * 120, 1.0)
+    if analytics.peak_comments_per_minute >= BURST_INDICATOR_RATIO * max(per_minute, 1.0):
+        indicators.append(f"burst of {analytics.peak_comments_per_minute} comments within one minute")
+    if analytics.author_gini >= GINI_INDICATOR and analytics.author_count >= 10:
+        indicators.append(f"comments concentrated in few accounts (author Gini {analytics.author_gini:.2f})")
+    bot_metrics.behavioral_indicators = [i for i in bot_metrics.behavioral_indicators if i not in indicators] + indicators
+    if bot_metrics.network_analysis and "author Gini" not in bot_metrics.network_analysis:
+        bot_metrics.network_analysis += f"; author Gini {analytics.author_gini:.2f}"
@@ -0,0 +1,115 @@
+import logging
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+
+from models import TimeSeriesData
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def iter_similar_posts(reddit, queries, post_url: str = None, max_items: int = 2000,
+                       time_filter: str = "month", exclude_id: str = None):
+    """
+    Lazily yield (id, created_utc) for Reddit posts matching the queries or sharing the post URL.
+
+    PRAW listings are fetched 100 posts per request only as the generator is consumed, and
+    iteration stops at max_items, so memory and API usage stay bounded regardless of how
+    many posts match.
+
+    Args:
+        reddit: A PRAW Reddit client
+        queries (list): Search queries run against r/all, newest first
+        post_url (str): Link URL of the submission; other posts of the same link are included
+        max_items (int): Hard cap on posts yielded across all queries
+        time_filter (str): Reddit search time filter (hour, day, week, month, year, all)
+        exclude_id (str): Submission id to leave out (the post being analyzed)
+
+    Yields:
+        tuple: (post id, created_utc)
+    """
+    seen = {exclude_id} if exclude_id else set()
+    listings = []
+    if post_url:
+        listings.append(lambda: reddit.info(url=post_url))
+    for query in queries:
+        if query:
+            listings.append(lambda q=query: reddit.subreddit("all").search(q, sort="new", time_filter=time_filter, limit=None))
+
+    yielded = 0
+    for make_listing in listings:
+        try:
+            for submission in make_listing():
+                if submission.id in seen:
+                    continue
+                seen.add(submission.id)
+                yield submission.id, submission.created_utc
+                yielded += 1
+                if yielded >= max_items:
+                    return
+        except Exception as e:
+            logger.warning("Reddit search listing failed: %s", e)
+
+
+def bin_timestamps(timestamps, bucket: str = "auto") -> list:
+    """
+    Count timestamps per hour or day.
+
+    Args:
+        timestamps: Iterable of epoch seconds
+        bucket (str): "hour", "day" or "auto" (hourly when the posts span three days or less)
+
+    Returns:
+        list: TimeSeriesData points for every bucket between the first and last post, including empty ones
+    """
+    values = np.asarray(timestamps, dtype=np.float64)
+    if values.size == 0:
+        return []
+    start, end = values.min(), values.max()
+    if bucket == "auto":
+        bucket = "hour" if end - start <= 3 * DAY else "day"
+    width = HOUR if bucket == "hour" else DAY
+
+    first_edge = np.floor(start / width) * width
+    edges = np.arange(first_edge, end + width, width)
+    if len(edges) < 2:
+        edges = np.array([first_edge, first_edge + width])
+    counts, _ = np.histogram(values, bins=edges)
+
+    fmt = "%Y-%m-%d %H:00" if bucket == "hour" else "%Y-%m-%d"
+    return [
+        TimeSeriesData(date=datetime.fromtimestamp(edge, tz=timezone.utc).strftime(fmt), count=int(count))
+        for edge, count in zip(edges[:-1], counts)
+    ]
+
+
+def similar_posts_time_series(reddit, reddit_data: dict, keywords: list, max_items: int = 2000,
+                              bucket: str = "auto") -> list:
+    """
+    Build the similar-posts time series for a scraped Reddit submission.
+
+    Args:
+        reddit: A PRAW Reddit client
+        reddit_data (dict): Output of scrape_reddit_data
+        keywords (list): Keyword strings from extract_keywords, most frequent first
+        max_items (int): Hard cap on posts counted
+        bucket (str): Bucket size passed to bin_timestamps
+
+    Returns:
+        list: TimeSeriesData points
+    """
+    queries = [" ".join(keywords[:3]), " ".join(keywords[:2])] if keywords else []
+    post_url = reddit_data.get("url")
+    # Self posts link to their own permalink, which no other post shares
+    if post_url and reddit_data.get("permalink", "") in post_url:
+        post_url = None
+
+    timestamps = array("d")
+    for _, created_utc in iter_similar_posts(reddit, queries, post_url, max_items, exclude_id=reddit_data.get("id")):
+        timestamps.append(created_utc)
+    logger.info("Counted %d similar posts", len(timestamps))
+    return bin_timestamps(np.frombuffer(timestamps, dtype=np.float64) if timestamps else [], bucket)
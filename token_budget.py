@@ -0,0 +1,130 @@
+import logging
+import os
+import threading
+from collections import Counter
+
+from deadlines import TASK_LABELS, TASK_NAMES, AnalysisTimeout
+from model_routing import model_cost
+
+logger = logging.getLogger(__name__)
+
+# Tokens (prompt + completion) each task may spend; the crawler's tool output makes its prompts the largest
+TASK_TOKEN_BUDGETS = {
+    "crawler": 60000,
+    "content": 30000,
+    "social": 40000,
+    "organizer": 25000,
+    "reliability": 40000,
+    "compiler": 50000,
+}
+# Share of a budget after which the agent is told to give its final answer
+SOFT_FRACTION = 0.8
+WRAP_UP_MESSAGE = (
+    "Your token budget for this step is almost spent. Do not use any more tools; "
+    "give your Final Answer now with the information you already have."
+)
+CHARS_PER_TOKEN = 4
+
+
+class TokenBudgetExceeded(AnalysisTimeout):
+    """Raised when a task or the whole run has spent its hard token budget."""
+
+
+def count_tokens(model: str, messages=None, text: str = None) -> int:
+    """Tokens in chat messages or text, by LiteLLM's counter for the model or about 4 characters per token."""
+    try:
+        # Imported here because LiteLLM is only installed as a CrewAI dependency
+        from litellm import token_counter
+        if messages is not None:
+            return token_counter(model=model, messages=messages if isinstance(messages, list) else None,
+                                 text=messages if isinstance(messages, str) else None)
+        return token_counter(model=model, text=text or "")
+    except Exception:
+        if messages is not None and not isinstance(messages, str):
+            text = " ".join(str(m.get("content", "")) if isinstance(m, dict) else str(m) for m in messages)
+        else:
+            text = messages if messages is not None else text or ""
+        return len(text) // CHARS_PER_TOKEN + 1
+
+
+class TokenBudget:
+    """
+    Cumulative token usage of one crew run, with soft and hard budgets per task and for the run.
+
+    The run's LLMs call before_call ahead of every request and record after it. Once a task or the
+    run has spent SOFT_FRACTION of its budget, the request gets an instruction to give the final
+    answer now; once either is spent, before_call raises TokenBudgetExceeded so the agent's loop
+    stops at its next LLM call, and on_exhausted (normally TaskDeadlines.cancel) is called so the
+    run ends with a partial report. The run budget defaults to the sum of the remaining tasks'
+    budgets, or VERIFAI_TOKEN_BUDGET when set.
+    """
+
+    def __init__(self, budgets: dict = None, task_names: list = None, run_limit: int = None,
+                 soft_fraction: float = SOFT_FRACTION, on_exhausted=None):
+        self.budgets = dict(budgets or TASK_TOKEN_BUDGETS)
+        self.task_names = list(task_names or TASK_NAMES)
+        self.run_limit = (run_limit or int(os.getenv("VERIFAI_TOKEN_BUDGET") or 0)
+                          or sum(self.budgets.get(name, 0) for name in self.task_names))
+        self.soft_fraction = soft_fraction
+        self.on_exhausted = on_exhausted
+        self.prompt_tokens = Counter()
+        self.completion_tokens = Counter()
+        self.calls = Counter()
+        self.cost = 0.0
+        self._wrapping_up = set()
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        return sum(self.prompt_tokens.values()) + sum(self.completion_tokens.values())
+
+    def used(self, task_name: str) -> int:
+        return self.prompt_tokens[task_name] + self.completion_tokens[task_name]
+
+    def _exhausted(self, task_name: str, message: str) -> None:
+        if self.on_exhausted:
+            self.on_exhausted()
+        raise TokenBudgetExceeded(task_name, message)
+
+    def before_call(self, task_name: str, messages):
+        """
+        Check the budgets before an LLM request.
+
+        Returns:
+            The messages to send: unchanged, or with the wrap-up instruction appended past a soft budget
+
+        Raises:
+            TokenBudgetExceeded: The task's or the run's budget is spent
+        """
+        used, limit = self.used(task_name), self.budgets.get(task_name)
+        label = TASK_LABELS.get(task_name, task_name or "analysis")
+        if limit and used >= limit:
+            self._exhausted(task_name, f"The {label} step spent its {limit:,}-token budget")
+        if self.total >= self.run_limit:
+            self._exhausted(task_name, f"The analysis spent its {self.run_limit:,}-token budget during the {label} step")
+        if (limit and used >= limit * self.soft_fraction) or self.total >= self.run_limit * self.soft_fraction:
+            if task_name not in self._wrapping_up:
+                self._wrapping_up.add(task_name)
+                logger.info("Token budget of the %s step nearly spent (%d tokens, run %d); asking for the final answer",
+                            label, used, self.total)
+            if isinstance(messages, str):
+                return f"{messages}\n\n{WRAP_UP_MESSAGE}"
+            return list(messages) + [{"role": "user", "content": WRAP_UP_MESSAGE}]
+        return messages
+
+    def record(self, task_name: str, model: str, messages, response) -> None:
+        """Add one LLM request's prompt and completion tokens to the task's usage."""
+        prompt = count_tokens(model, messages=messages)
+        completion = count_tokens(model, text=str(response or ""))
+        with self._lock:
+            self.prompt_tokens[task_name] += prompt
+            self.completion_tokens[task_name] += completion
+            self.calls[task_name] += 1
+            self.cost += model_cost(model, prompt, completion)
+
+    def summary(self) -> str:
+        """One line of total and per-task usage with the estimated cost."""
+        tasks = ", ".join(f"{TASK_LABELS.get(name, name)} {self.used(name):,}"
+                          for name in self.task_names if self.calls[name])
+        return (f"{self.total:,} of {self.run_limit:,} tokens in {sum(self.calls.values())} LLM calls "
+                f"(~${self.cost:.4f}): {tasks}")
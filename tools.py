@@ -0,0 +1,195 @@
+import json
+import logging
+from typing import Any, Type
+
+from crewai.tools import BaseTool
+from crewai_tools import ScrapeWebsiteTool, SerperDevTool
+from pydantic import BaseModel, Field, PrivateAttr
+
+from canonical import resolve_redirects, get_article_index
+from extract import CHARS_PER_TOKEN, MAX_DOC_TOKENS, extract_in_pool, fetch_html, format_article
+from news_api import get_news_api_client
+from rate_limit import get_limiter
+from reputation import get_reputation_index, reliability_level
+from singleflight import get_single_flight
+from vector_index import get_vector_index
+
+logger = logging.getLogger(__name__)
+
+
+class DomainReputationInput(BaseModel):
+    domains: str = Field(..., description="Comma-separated list of domains or article URLs to look up.")
+
+
+class DomainReputationTool(BaseTool):
+    name: str = "Domain Reputation Lookup"
+    description: str = (
+        "Look up the factual rating, reliability score (0-100) and known-fake flag of news domains "
+        "from the local reputation table. Use this before rating any source yourself; only rate "
+        "domains it reports as UNKNOWN."
+    )
+    args_schema: Type[BaseModel] = DomainReputationInput
+
+    def _run(self, domains: str) -> str:
+        index = get_reputation_index()
+        lines = []
+        for value in (d.strip() for d in domains.split(",")):
+            if not value:
+                continue
+            entry = index.lookup(value)
+            if entry is None:
+                lines.append(f"{value}: UNKNOWN")
+            else:
+                flag = " | KNOWN FAKE/UNRELIABLE" if entry.known_fake else ""
+                lines.append(
+                    f"{value}: {reliability_level(entry)} reliability | factual rating {entry.factual_rating} "
+                    f"| score {entry.reliability_score:.0f}/100{flag}"
+                )
+        return "\n".join(lines) or "No domains given."
+
+
+class RateLimitedSerperDevTool(SerperDevTool):
+    """
+    SerperDevTool whose searches go through the shared Serper rate limiter.
+
+    Identical searches already in flight (from any agent or session) are not sent again; the
+    caller waits for the running request and gets its result.
+    """
+
+    def _run(self, **kwargs: Any) -> Any:
+        search = super()._run
+        key = json.dumps(kwargs, sort_keys=True, default=str)
+        result, _ = get_single_flight("serper").run(key, lambda _: get_limiter("serper").call(search, **kwargs))
+        return result
+
+
+class NewsAPISearchInput(BaseModel):
+    queries: str = Field(..., description="One or more search queries separated by semicolons.")
+
+
+class NewsAPISearchTool(BaseTool):
+    name: str = "News API Search"
+    description: str = (
+        "Search structured news APIs for recent articles. Returns title, source, URL and publication "
+        "date for each article. Cheaper than web search and scraping; try it first and fall back to "
+        "web search when it finds nothing."
+    )
+    args_schema: Type[BaseModel] = NewsAPISearchInput
+    max_results: int = 10
+
+    def _run(self, queries: str) -> str:
+        client = get_news_api_client()
+        if not client.endpoints:
+            return "No news API is configured. Use web search instead."
+        query_list = [q.strip() for q in queries.split(";") if q.strip()]
+        try:
+            results = client.search_many_sync(query_list)
+        except Exception as e:
+            return f"News API search failed ({e}). Use web search instead."
+
+        lines = []
+        for query in query_list:
+            articles = results.get(query, [])[:self.max_results]
+            lines.append(f"Results for '{query}': {len(articles) or 'none'}")
+            for article in articles:
+                lines.append(
+                    f"- Title: {article['title']} | Source: {article['source']} | URL: {article['url']} "
+                    f"| Published: {article['published_date'] or 'Unknown'}"
+                )
+        return "\n".join(lines)
+
+
+class CanonicalScrapeWebsiteTool(ScrapeWebsiteTool):
+    """
+    ScrapeWebsiteTool that collapses URL variants before fetching.
+
+    URLs are canonicalized (tracking parameters, AMP and mobile variants, shortener redirects) and
+    looked up in the persistent article index, so a page scraped by any earlier run is served from
+    disk. A page already returned earlier in the same run is served again from memory, marked as a
+    duplicate (the agent asking is often not the one that scraped it first).
+    New pages are reduced to title, byline, date and main text by extract.py (on its process pool)
+    and capped in size before they reach the agent.
+    """
+
+    _scraped_this_run: dict = PrivateAttr(default_factory=dict)
+
+    def _run(self, **kwargs: Any) -> Any:
+        website_url = kwargs.get("website_url", self.website_url)
+        if not website_url:
+            return super()._run(**kwargs)
+
+        canonical = resolve_redirects(website_url)
+        if canonical in self._scraped_this_run:
+            first_url, content = self._scraped_this_run[canonical]
+            return f"[Same article as {first_url}, already scraped in this run]\n\n{content}"
+
+        index = get_article_index()
+        content = index.get_content(canonical)
+        title = ""
+        if content is None:
+            # Concurrent scrapes of the same page share one fetch and extraction
+            (content, title), _ = get_single_flight("page_fetch").run(
+                canonical, lambda _: self._fetch_article(website_url, **kwargs)
+            )
+            if isinstance(content, str) and content.strip():
+                index.add(canonical, title=title, content=content)
+        else:
+            index.add(canonical)
+        if isinstance(content, str) and content.strip():
+            # Every scraped page becomes searchable with the Article Search tool
+            try:
+                get_vector_index().upsert(canonical, content, title=title)
+            except Exception as e:
+                logger.warning("Could not add %s to the vector index: %s", canonical, e)
+        # Pages cached before extraction existed may be raw page text; keep them within the same cap
+        if isinstance(content, str) and len(content) > MAX_DOC_TOKENS * CHARS_PER_TOKEN:
+            content = content[:MAX_DOC_TOKENS * CHARS_PER_TOKEN] + "\n\n[Article truncated]"
+        if isinstance(content, str) and content.strip():
+            # Only pages that returned content count as scraped; a failed or empty fetch may be retried
+            self._scraped_this_run[canonical] = (website_url, content)
+        return content
+
+    def _fetch_article(self, website_url: str, **kwargs: Any) -> tuple:
+        """Fetch a page and extract its article on the process pool; returns (text, title)."""
+        try:
+            _, html = get_limiter("web").call(fetch_html, website_url)
+            record = extract_in_pool(html, website_url)
+            if record["text"]:
+                return format_article(record), record["title"]
+            logger.info("No article text extracted from %s; using the plain page text", website_url)
+        except Exception as e:
+            logger.warning("Article extraction failed for %s: %s", website_url, e)
+        return get_limiter("web").call(super()._run, **kwargs), ""
+
+
+class ArticleSearchInput(BaseModel):
+    search_query: str = Field(..., description="What to look for in the article text.")
+    website_url: str = Field("", description="Optional article URL or domain to restrict the search to.")
+
+
+class ArticleSearchTool(BaseTool):
+    name: str = "Article Search"
+    description: str = (
+        "Semantic search over the text of every article scraped so far (by any run). Returns the "
+        "most relevant passages with their URLs. Give website_url to search one article (it is "
+        "scraped first if needed) or a bare domain to search that site's articles."
+    )
+    args_schema: Type[BaseModel] = ArticleSearchInput
+    max_results: int = 5
+
+    def _run(self, search_query: str, website_url: str = "") -> str:
+        index = get_vector_index()
+        url = domain = None
+        website_url = (website_url or "").strip()
+        if website_url.startswith(("http://", "https://")):
+            url = resolve_redirects(website_url)
+            if not index.contains(url):
+                CanonicalScrapeWebsiteTool()._run(website_url=website_url)
+        elif website_url:
+            domain = website_url
+        results = index.search(search_query, k=self.max_results, url=url, domain=domain)
+        if not results:
+            return "No matching passages found in the scraped articles."
+        return "\n\n".join(
+            f"[{r['score']:.2f}] {r['title'] or r['url']} ({r['url']})\n{r['text']}" for r in results
+        )
@@ -0,0 +1,342 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from canonical import canonicalize_url
+from report_store import normalize_domain
+from setup import get_db_path
+from shared_state import ThreadLocalConnection, process_singleton
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 384
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+CHUNK_CHARS = 1000
+# LSH over random hyperplanes: LSH_TABLES independent codes of LSH_BITS bits per vector
+LSH_TABLES = 8
+LSH_BITS = 12
+LSH_SEED = 7
+# Below this many vectors an exact scan is as fast as the LSH lookup
+BRUTE_FORCE_LIMIT = 50000
+GROW_ROWS = 4096
+
+
+def _feature_hashes(features: list) -> np.ndarray:
+    return np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+
+
+def embed_texts(texts: list) -> np.ndarray:
+    """
+    Embed texts with signed feature hashing of word unigrams and bigrams.
+
+    Deterministic and offline: no model download, the same text always maps to the same vector.
+    Term counts are log-scaled and every vector is L2-normalized, so dot products are cosine
+    similarities.
+
+    Returns:
+        np.ndarray: float32 matrix of shape (len(texts), EMBEDDING_DIM)
+    """
+    features, owners = [], []
+    for i, text in enumerate(texts):
+        words = TOKEN_RE.findall((text or "").lower())
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        features.extend(grams)
+        owners.extend([i] * len(grams))
+    vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    if not features:
+        return vectors
+    # Hash each distinct feature once
+    distinct = {feature: i for i, feature in enumerate(dict.fromkeys(features))}
+    inverse = np.fromiter(map(distinct.__getitem__, features), dtype=np.int64, count=len(features))
+    hashes = _feature_hashes(list(distinct))[inverse]
+    buckets = (hashes % EMBEDDING_DIM).astype(np.int64)
+    signs = np.where(hashes & np.uint32(1 << 31), -1.0, 1.0)
+    flat = np.bincount(np.asarray(owners) * EMBEDDING_DIM + buckets, weights=signs,
+                       minlength=len(texts) * EMBEDDING_DIM)
+    vectors = (np.sign(flat) * np.log1p(np.abs(flat))).reshape(len(texts), EMBEDDING_DIM).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS) -> list:
+    """Split text into chunks of about chunk_chars, on paragraph boundaries where possible."""
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        paragraph = paragraph.strip()
+        while len(paragraph) > chunk_chars:
+            cut = paragraph.rfind(" ", 0, chunk_chars)
+            cut = cut if cut > chunk_chars // 2 else chunk_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if current and len(current) + len(paragraph) + 2 > chunk_chars:
+            chunks.append(current)
+            current = ""
+        if paragraph:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class VectorIndex:
+    """
+    Persistent on-disk vector index of scraped article chunks.
+
+    Embeddings and their LSH codes live in memory-mapped files that grow in place; chunk text and
+    the URL -> rows mapping live in SQLite, which also allocates row numbers so several processes
+    can append safely. Upserting a URL whose content changed deactivates its old rows and appends
+    new ones (compact() reclaims the space). Queries scan exactly while the index is small and
+    otherwise rerank the rows that share an LSH code with the query in any table.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or get_db_path("vectors")
+        os.makedirs(self.directory, exist_ok=True)
+        self.db_path = os.path.join(self.directory, "chunks.db")
+        self._connection = ThreadLocalConnection(self.db_path, synchronous="NORMAL")
+        self._lock = threading.RLock()
+        rng = np.random.default_rng(LSH_SEED)
+        self._hyperplanes = rng.standard_normal((LSH_TABLES * LSH_BITS, EMBEDDING_DIM)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(LSH_BITS)).astype(np.uint16)
+        self._check_settings()
+        conn = self._connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    row_id INTEGER PRIMARY KEY,
+                    canonical_url TEXT NOT NULL,
+                    domain TEXT,
+                    title TEXT,
+                    chunk_no INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    active INTEGER NOT NULL DEFAULT 1
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_url ON chunks(canonical_url, active)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_domain ON chunks(domain, active)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    canonical_url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+        self._embeddings = None
+        self._codes = None
+        self._capacity = 0
+        self._active = np.zeros(0, dtype=bool)
+        # PRAGMA data_version is per connection and ignores the connection's own commits, so each thread
+        # keeps the value it last saw and this process's writes bump _generation instead
+        self._seen = threading.local()
+        self._generation = 0
+        self._loaded_generation = None
+
+    def _check_settings(self) -> None:
+        """Drop vector files written with different embedding or LSH settings."""
+        settings = {"dim": EMBEDDING_DIM, "tables": LSH_TABLES, "bits": LSH_BITS, "seed": LSH_SEED, "version": 1}
+        path = os.path.join(self.directory, "settings.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = None
+        if stored != settings:
+            if stored is not None:
+                logger.warning("Vector index settings changed; rebuilding the index")
+            for name in ("embeddings.f32", "codes.u16", "chunks.db", "chunks.db-wal", "chunks.db-shm"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(settings, f)
+
+    def _map(self, rows: int) -> None:
+        """(Re)open the memory maps with room for at least rows vectors."""
+        embeddings_path = os.path.join(self.directory, "embeddings.f32")
+        codes_path = os.path.join(self.directory, "codes.u16")
+        existing = os.path.getsize(embeddings_path) // (EMBEDDING_DIM * 4) if os.path.exists(embeddings_path) else 0
+        capacity = max(existing, rows)
+        if capacity > existing:
+            capacity = max(capacity, existing * 2, GROW_ROWS)
+        if capacity == self._capacity and self._embeddings is not None:
+            return
+        self._embeddings = self._codes = None
+        for path, row_bytes in ((embeddings_path, EMBEDDING_DIM * 4), (codes_path, LSH_TABLES * 2)):
+            with open(path, "ab") as f:
+                if f.tell() < capacity * row_bytes:
+                    f.truncate(capacity * row_bytes)
+        self._capacity = capacity
+        if capacity:
+            self._embeddings = np.memmap(embeddings_path, dtype=np.float32, mode="r+", shape=(capacity, EMBEDDING_DIM))
+            self._codes = np.memmap(codes_path, dtype=np.uint16, mode="r+", shape=(capacity, LSH_TABLES))
+
+    def _lsh_codes(self, vectors: np.ndarray) -> np.ndarray:
+        bits = (vectors @ self._hyperplanes.T > 0).reshape(len(vectors), LSH_TABLES, LSH_BITS)
+        return (bits * self._bit_weights).sum(axis=2).astype(np.uint16)
+
+    def _refresh(self) -> None:
+        """Reload the active-row mask when this process wrote or another connection (or process) committed."""
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if (version == getattr(self._seen, "version", None) and self._loaded_generation == self._generation
+                and len(self._active)):
+            return
+        rows = conn.execute("SELECT row_id FROM chunks WHERE active = 1").fetchall()
+        top = conn.execute("SELECT COALESCE(MAX(row_id), -1) FROM chunks").fetchone()[0]
+        active = np.zeros(top + 1, dtype=bool)
+        if rows:
+            active[np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))] = True
+        self._map(top + 1)
+        self._active = active
+        self._seen.version = version
+        self._loaded_generation = self._generation
+
+    def contains(self, url: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM documents WHERE canonical_url = ?", (canonicalize_url(url),)
+        ).fetchone()
+        return row is not None
+
+    def upsert(self, url: str, text: str, title: str = "") -> int:
+        """
+        Index (or re-index) one article's text by canonical URL.
+
+        Returns:
+            int: Number of chunks written (0 when the stored content is unchanged)
+        """
+        canonical = canonicalize_url(url)
+        content_hash = hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+        conn = self._connection()
+        stored = conn.execute("SELECT content_hash FROM documents WHERE canonical_url = ?", (canonical,)).fetchone()
+        if stored and stored[0] == content_hash:
+            return 0
+        chunks = chunk_text(text)
+        vectors = embed_texts(chunks)
+        codes = self._lsh_codes(vectors)
+        domain = normalize_domain(canonical)
+        with self._lock:
+            # Row numbers are allocated inside the write transaction, so concurrent writers never overlap
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                start = conn.execute("SELECT COALESCE(MAX(row_id), -1) + 1 FROM chunks").fetchone()[0]
+                self._map(start + len(chunks))
+                if chunks:
+                    self._embeddings[start:start + len(chunks)] = vectors
+                    self._codes[start:start + len(chunks)] = codes
+                    self._embeddings.flush()
+                    self._codes.flush()
+                conn.execute("UPDATE chunks SET active = 0 WHERE canonical_url = ? AND active = 1", (canonical,))
+                conn.executemany(
+                    "INSERT INTO chunks (row_id, canonical_url, domain, title, chunk_no, text) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(start + i, canonical, domain, title or "", i, chunk) for i, chunk in enumerate(chunks)],
+                )
+                conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?)", (canonical, content_hash))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._generation += 1
+        return len(chunks)
+
+    def search(self, query: str, k: int = 5, url: str = None, domain: str = None) -> list:
+        """
+        Find the chunks most similar to a query.
+
+        Args:
+            query (str): Search text
+            k (int): Number of results
+            url (str): Only search this article
+            domain (str): Only search articles from this domain
+
+        Returns:
+            list: Dicts with url, title, text and score (cosine similarity), best first
+
+        Upserts are visible to the next search on the same thread:
+
+        >>> import tempfile
+        >>> index = VectorIndex(tempfile.mkdtemp())
+        >>> index.upsert("https://a.com/x", "Cooking pasta with tomato sauce and fresh basil leaves.")
+        1
+        >>> [r["url"] for r in index.search("pasta")]
+        ['https://a.com/x']
+        >>> index.upsert("https://b.com/y", "Rockets carry satellites into orbit around the earth.")
+        1
+        >>> index.search("rockets satellites orbit", k=1)[0]["url"]
+        'https://b.com/y'
+        >>> index.upsert("https://a.com/x", "Baking sourdough bread needs a lively starter.")
+        1
+        >>> index.search("sourdough bread", k=1)[0]["text"]
+        'Baking sourdough bread needs a lively starter.'
+        """
+        vector = embed_texts([query])[0]
+        conn = self._connection()
+        with self._lock:
+            self._refresh()
+            if url or domain:
+                column, value = ("canonical_url", canonicalize_url(url)) if url else ("domain", normalize_domain(domain))
+                rows = [r[0] for r in conn.execute(f"SELECT row_id FROM chunks WHERE {column} = ? AND active = 1", (value,))]
+                candidates = np.array(rows, dtype=np.int64)
+            elif len(self._active) <= BRUTE_FORCE_LIMIT:
+                candidates = np.flatnonzero(self._active)
+            else:
+                n = len(self._active)
+                query_codes = self._lsh_codes(vector[None, :])[0]
+                matches = (self._codes[:n] == query_codes).any(axis=1) & self._active
+                candidates = np.flatnonzero(matches)
+                if len(candidates) < k:
+                    candidates = np.flatnonzero(self._active)
+            if not len(candidates):
+                return []
+            scores = self._embeddings[candidates] @ vector
+        top = np.argsort(-scores)[:k]
+        best = {int(candidates[i]): float(scores[i]) for i in top}
+        placeholders = ",".join("?" * len(best))
+        rows = conn.execute(
+            f"SELECT row_id, canonical_url, title, text FROM chunks WHERE row_id IN ({placeholders})", list(best)
+        ).fetchall()
+        results = [{"url": r[1], "title": r[2], "text": r[3], "score": round(best[r[0]], 4)} for r in rows]
+        return sorted(results, key=lambda r: r["score"], reverse=True)
+
+    def compact(self) -> int:
+        """Rewrite the vector files without inactive rows. Returns the number of rows removed."""
+        conn = self._connection()
+        with self._lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._generation += 1
+                self._refresh()
+                keep = np.flatnonzero(self._active)
+                removed = len(self._active) - len(keep)
+                if removed:
+                    embeddings = np.array(self._embeddings[keep])
+                    codes = np.array(self._codes[keep])
+                    self._embeddings[:len(keep)] = embeddings
+                    self._codes[:len(keep)] = codes
+                    self._embeddings.flush()
+                    self._codes.flush()
+                    conn.execute("DELETE FROM chunks WHERE active = 0")
+                    conn.executemany("UPDATE chunks SET row_id = ? WHERE row_id = ?",
+                                     [(new, int(old)) for new, old in enumerate(keep) if new != old])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._generation += 1
+        if removed:
+            logger.info("Compacted vector index: removed %d inactive rows", removed)
+        return removed
+
+
+@process_singleton
+def get_vector_index() -> VectorIndex:
+    """Return the process-wide vector index."""
+    return VectorIndex()